@@ -1,9 +1,12 @@
 import os
+import argparse
 import random
 import requests
 from bs4 import BeautifulSoup
 import google.generativeai as genai
 from telegram import Bot
+from telegram.request import HTTPXRequest
+import asyncio
 import schedule
 import time
 from dotenv import load_dotenv
@@ -12,18 +15,35 @@ from datetime import datetime
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from spotipy import Spotify
-from src.utils.config import init_services, logger, Config
+from src.utils.config import init_services, logger, Config, data_dir, data_path
 from src.services.spotify_service import SpotifyService
+from src.services.harvest_service import HarvestService
 from src.services.telegram_service import TelegramService
 from src.services.gemini_service import GeminiService
 from src.services.genius_service import GeniusService
+from src.services.selection_service import SelectionService
+from src.services.wikipedia_service import WikipediaService
+from src.services.enrichment_service import EnrichmentService
+from src.services.backfill_service import BackfillService, run_sharded, split_count
+from src.services.bot_service import SongBotService
+from src.services.broadcast_service import BroadcastService, SubscriberStore, TELEGRAM_MESSAGES_PER_SECOND
+from src.utils.concurrency import StageLimiter
+from src.utils.checkpoint import CheckpointStore, RunCheckpoint
+from src.utils.deadline import Deadline, DeadlineExceeded
+from src.utils.cache import Cache, DAY, HOUR
+from src.utils.profiling import PipelineProfiler
+from src.utils.hit_stats import HitStats
+from src.utils.metadata_index import MetadataIndex
+from src.utils.ledger import PERCENTILES, RunLedger, RunRecord
+from src.utils.log import configure_logging, set_run_id
+from src.utils.load_test import BotLoadTest
+from src.utils.bundle import BUNDLE_STORES, export_bundle, import_bundle
+from src.utils.coordination import Coordinator, backend_from_url
+from src.utils.stand_ins import build_offline_services
+from contextlib import nullcontext
+from functools import lru_cache
 import sys
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -40,14 +60,22 @@ SPOTIFY_CLIENT_SECRET = os.getenv('SPOTIFY_CLIENT_SECRET')
 genai.configure(api_key=GEMINI_API_KEY)
 model = genai.GenerativeModel('gemini-pro')
 
-# Initialize Telegram bot
-bot = Bot(token=TELEGRAM_BOT_TOKEN)
+@lru_cache(maxsize=None)
+def telegram_bot() -> Bot:
+    """
+    Get the Telegram bot, created on first use so offline runs need no token.
+    """
+    return Bot(token=TELEGRAM_BOT_TOKEN)
 
-# Initialize Spotify client
-sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-    client_id=SPOTIFY_CLIENT_ID,
-    client_secret=SPOTIFY_CLIENT_SECRET
-))
+@lru_cache(maxsize=None)
+def spotify_client() -> Spotify:
+    """
+    Get the Spotify client, created on first use so offline runs need no credentials.
+    """
+    return spotipy.Spotify(auth_manager=SpotifyClientCredentials(
+        client_id=SPOTIFY_CLIENT_ID,
+        client_secret=SPOTIFY_CLIENT_SECRET
+    ))
 
 def get_random_song():
     """
@@ -64,7 +92,7 @@ def get_random_song():
         genre = random.choice(genres)
         
         # Search for tracks in the selected genre
-        results = sp.search(q=f'genre:{genre}', type='track', limit=50)
+        results = spotify_client().search(q=f'genre:{genre}', type='track', limit=50)
         
         if results['tracks']['items']:
             # Select a random track from the results
@@ -79,7 +107,7 @@ def get_random_song():
             
             # Get additional track features
             track_id = track['id']
-            features = sp.audio_features(track_id)[0]
+            features = spotify_client().audio_features(track_id)[0]
             
             # Format the song information
             song_info = {
@@ -96,7 +124,7 @@ def get_random_song():
             return song_info
             
     except Exception as e:
-        logger.error(f"Error fetching song from Spotify: {e}")
+        logger.error("Error fetching song from Spotify: %s", e)
         # Fallback to a default song if Spotify API fails
         return {
             'name': 'Bohemian Rhapsody',
@@ -132,7 +160,7 @@ def get_song_info(song_info):
         
         return f"Could not find detailed information about {artist}."
     except Exception as e:
-        logger.error(f"Error fetching song info: {e}")
+        logger.error("Error fetching song info: %s", e)
         return f"Error fetching information about {song_info['name']} by {song_info['artist']}."
 
 def summarize_info(song_info, wiki_info):
@@ -175,7 +203,7 @@ def summarize_info(song_info, wiki_info):
         response = model.generate_content(prompt)
         return response.text
     except Exception as e:
-        logger.error(f"Error generating summary: {e}")
+        logger.error("Error generating summary: %s", e)
         return f"Error generating summary for {song_info['name']}."
 
 def send_to_telegram(message, spotify_url):
@@ -186,7 +214,7 @@ def send_to_telegram(message, spotify_url):
         # Add Spotify link to the message
         message += f"\n\n🎧 <a href='{spotify_url}'>Listen on Spotify</a>"
         
-        bot.send_message(
+        telegram_bot().send_message(
             chat_id=TELEGRAM_CHANNEL_ID,
             text=message,
             parse_mode='HTML',
@@ -194,55 +222,280 @@ def send_to_telegram(message, spotify_url):
         )
         logger.info("Message sent successfully to Telegram")
     except Exception as e:
-        logger.error(f"Error sending message to Telegram: {e}")
+        logger.error("Error sending message to Telegram: %s", e)
+
+# Minimum seconds of run budget a stage needs to be worth starting
+STAGE_MINIMUMS = {
+    'spotify': 5,
+    'genius': 3,
+    'gemini': 10,
+    'telegram': 3
+}
+
+class PostFailed(Exception):
+    """
+    Raised when a song that already has its summary could not be sent.
+    """
 
-def process_song(services: dict, song: dict) -> bool:
+def stage(deadline: Deadline, name: str):
+    """
+    Account a pipeline stage against the run deadline, if there is one.
+    """
+    if deadline is None:
+        return nullcontext()
+    return deadline.stage(name, STAGE_MINIMUMS.get(name, 0))
+
+def song_info(services: dict, song: dict, deadline: Deadline = None):
+    """
+    Get a song's info from Genius, enriched from Wikipedia when configured.
+    """
+    with stage(deadline, 'genius'):
+        if 'enrichment' in services:
+            return services['enrichment'].enrich(song, deadline=deadline)
+        return services['genius'].get_song_info(song['name'], song['artist'], deadline=deadline, song=song)
+
+def process_song(services: dict, song: dict, run: RunCheckpoint = None, deadline: Deadline = None,
+                 record: RunRecord = None) -> bool:
     """
     Process a single song: get info from Genius, generate summary, and send to Telegram.
+    When a run checkpoint is given, stages it already holds for this song are not repeated.
+    The run record, if given, gets the size of the summary prompt.
     Returns True if successful, False if no info found.
+    Raises:
+        DeadlineExceeded: If the run deadline leaves no time to post the song
+        PostFailed: If sending failed, so the run stops and a retry resumes this song
     """
     try:
-        # Get song info from Genius
-        genius_info = services['genius'].get_song_info(song['name'], song['artist'])
-        if not genius_info:
-            logger.warning(f"No Genius info found for {song['name']} by {song['artist']}")
-            return False
+        if run:
+            run.begin(song)
             
-        # Generate summary using Gemini
-        summary = services['gemini'].summarize_info(song, genius_info)
+        # Get song info from Genius, enriched from Wikipedia when configured
+        genius_info = run.get('genius') if run else None
+        if genius_info is None:
+            genius_info = song_info(services, song, deadline)
+            if not genius_info:
+                logger.warning("No Genius info found for %s by %s", song['name'], song['artist'])
+                return False
+            if run:
+                run.save('genius', genius_info)
+            
+        # Download the album art while the summary is generated
+        services['telegram'].prefetch_image(song.get('image_url'))
+
+        # Generate summary using Gemini, falling back to faster tiers when slow or failing
+        summary = run.get('summary') if run else None
+        if summary is None:
+            if record:
+                record.prompt_chars = services['gemini'].prompt_length(song, genius_info)
+            try:
+                with stage(deadline, 'gemini'):
+                    summary = services['gemini'].summarize_tiered(
+                        song, genius_info, deadline=deadline, reserve=STAGE_MINIMUMS['telegram']
+                    )
+            except DeadlineExceeded as e:
+                logger.warning("No budget for generation, using local summary: %s", e)
+                summary = services['gemini'].local_summary(song, genius_info)
+            if run:
+                run.save('summary', summary)
         
-        # Send to Telegram
-        services['telegram'].send_song_info(song, genius_info, summary)
+        # Send to Telegram. Trying other candidates would pay for their summaries again
+        try:
+            with stage(deadline, 'telegram'):
+                services['telegram'].send_song_info(song, genius_info, summary, deadline=deadline)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise PostFailed(f"Could not send {song['name']} by {song['artist']}: {e}") from e
+        if run:
+            run.save('sent', True)
         return True
         
+    except (DeadlineExceeded, PostFailed):
+        raise
     except Exception as e:
-        logger.error(f"Error processing song: {e}")
+        logger.error("Error processing song: %s", e)
         return False
 
-def daily_song_task(services: dict):
+def speculative_post(services: dict, candidates, run: RunCheckpoint = None, deadline: Deadline = None,
+                     record: RunRecord = None, width: int = 2, token_budget: int = 6000):
+    """
+    Look candidates up until `width` of them have Genius info, generate their summaries
+    concurrently and post the best-ranked one whose summary succeeded. Falls back to
+    the local summary of the top match if every generation fails.
+    Returns the posted song, or None if no candidate had info.
+    Raises:
+        DeadlineExceeded: If the run deadline leaves no time to post a song
+        PostFailed: If sending failed, so the run stops and a retry resumes the chosen song
+    """
+    matched = []
+    for song in candidates:
+        if record:
+            record.candidates += 1
+        try:
+            genius_info = song_info(services, song, deadline)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error("Error processing song: %s", e)
+            continue
+        if not genius_info:
+            logger.warning("No Genius info found for %s by %s", song['name'], song['artist'])
+            continue
+        matched.append((song, genius_info))
+        if len(matched) >= width:
+            break
+    if not matched:
+        return None
+
+    services['telegram'].prefetch_image(matched[0][0].get('image_url'))
+    gemini = services['gemini']
+    try:
+        with stage(deadline, 'gemini'):
+            result = gemini.summarize_speculative(matched, deadline=deadline, reserve=STAGE_MINIMUMS['telegram'],
+                                                  token_budget=token_budget)
+    except DeadlineExceeded as e:
+        logger.warning("No budget for generation, using local summary: %s", e)
+        result = None
+    index, summary = result or (0, gemini.local_summary(*matched[0]))
+    song, genius_info = matched[index]
+    if record:
+        record.prompt_chars = gemini.prompt_length(song, genius_info)
+    if run:
+        run.begin(song)
+        run.save('genius', genius_info)
+        run.save('summary', summary)
+
+    try:
+        with stage(deadline, 'telegram'):
+            services['telegram'].send_song_info(song, genius_info, summary, deadline=deadline)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise PostFailed(f"Could not send {song['name']} by {song['artist']}: {e}") from e
+    if run:
+        run.save('sent', True)
+    return song
+
+def themed_songs(services: dict, theme: str) -> list:
+    """
+    Get candidates matching a theme query from the local Genius metadata index.
+    """
+    try:
+        songs = services['index'].songs(theme, limit=50)
+    except ValueError as e:
+        logger.error("Invalid theme: %s", e)
+        return []
+    if 'selection' in services:
+        songs = services['selection'].rank(songs, limit=10)
+    logger.info("Found %s indexed songs for theme %r", len(songs), theme)
+    return songs
+
+def candidate_songs(services: dict, run: RunCheckpoint = None, deadline: Deadline = None, theme: str = None):
+    """
+    Yield songs to try in order. A song that already got past the Genius stage in an
+    earlier attempt of this run comes first, so its paid lookups are not repeated.
+    With a theme, candidates come from the local metadata index, falling back to Spotify.
+    """
+    if run and run.completed('genius'):
+        logger.info("Resuming run %s with %s", run.run_id, run.get('track')['name'])
+        yield run.get('track')
+
+    songs = themed_songs(services, theme) if theme and 'index' in services else []
+
+    # Get candidate songs from Spotify, ranked by the selection engine when available
+    if not songs:
+        with stage(deadline, 'spotify'):
+            if 'selection' in services and 'harvest' in services:
+                pool = services['harvest'].harvest(deadline=deadline)
+                songs = services['selection'].rank(pool, limit=10)
+            elif 'selection' in services:
+                songs = services['selection'].rank(services['spotify'].get_candidate_batch(deadline=deadline), limit=10)
+            else:
+                songs = services['spotify'].get_multiple_songs(deadline=deadline)
+
+    # Re-rank the remaining candidates after every lookup, so each miss informs the next pick.
+    # The selection engine weighs hit rates into its own score instead of being overridden
+    rerank = services['selection'].rank if 'selection' in services else services['spotify'].order_by_hit_rate
+    remaining = list(songs)
+    while remaining:
+        remaining = rerank(remaining)
+        yield remaining.pop(0)
+
+def cache_counts(services: dict) -> tuple:
+    """
+    Get the total hits and misses of the services' caches.
+    """
+    caches = {id(cache): cache for cache in (getattr(service, 'cache', None) for service in services.values())
+              if isinstance(cache, Cache)}
+    return (sum(cache.hits for cache in caches.values()), sum(cache.misses for cache in caches.values()))
+
+def daily_song_task(services: dict, run: RunCheckpoint = None, deadline: Deadline = None, theme: str = None,
+                    speculate: int = 1, token_budget: int = 6000):
     """
     Main task that runs daily to get a random song and send it to Telegram.
+    With `speculate` above 1, that many Genius-matched candidates are summarized at once
+    within `token_budget`, see speculative_post.
+    Every attempt is recorded in the run ledger, when the services have one.
+    Returns the run's outcome: 'posted', 'skipped' or 'no_info'.
     """
+    record = RunRecord(run.run_id if run else None)
+    hits, misses = cache_counts(services)
     try:
-        # Get multiple songs from Spotify
-        songs = services['spotify'].get_multiple_songs()
-        
+        if run and run.completed('sent'):
+            logger.info("Run %s already posted, nothing to do", run.run_id)
+            record.outcome = 'skipped'
+            return record.outcome
+            
+        candidates = candidate_songs(services, run, deadline, theme)
+        # A run resuming past the Genius stage finishes its song instead of speculating
+        if speculate > 1 and not (run and run.completed('genius')):
+            song = speculative_post(services, candidates, run, deadline, record, speculate, token_budget)
+            if song:
+                if 'selection' in services:
+                    services['selection'].record(song)
+                record.outcome = 'posted'
+                record.track = song
+                return record.outcome
+
         # Try each song until we find one with Genius info
-        for song in songs:
-            if process_song(services, song):
-                return
+        for song in candidates:
+            record.candidates += 1
+            if process_song(services, song, run, deadline, record):
+                if 'selection' in services:
+                    services['selection'].record(song)
+                record.outcome = 'posted'
+                record.track = song
+                return record.outcome
                 
         # If we get here, no songs had Genius info
+        record.outcome = 'no_info'
         error_msg = "Failed to find information for any songs after multiple attempts."
         logger.error(error_msg)
         services['telegram'].send_error_message(error_msg)
+        return record.outcome
         
     except Exception as e:
-        logger.error(f"Critical error: {e}")
+        logger.error("Critical error: %s", e)
+        record.outcome = 'deadline' if isinstance(e, DeadlineExceeded) else 'error'
+        record.error = str(e)
         sys.exit(1)
+    finally:
+        if deadline:
+            logger.info("Run budget: %s", deadline.report())
+            record.stages = dict(deadline.spent)
+        if 'ledger' in services:
+            end_hits, end_misses = cache_counts(services)
+            record.cache_hits = end_hits - hits
+            record.cache_misses = end_misses - misses
+            try:
+                services['ledger'].append(record)
+            except Exception as e:
+                logger.warning("Could not record run in the ledger: %s", e)
 
-def main():
-    # Initialize services
+def build_services() -> dict:
+    """
+    Create the service dict used by the pipeline from environment configuration.
+    """
     config = Config()
 
     # Create Spotipy client
@@ -250,27 +503,393 @@ def main():
         client_id=config.get('SPOTIFY_CLIENT_ID'),
         client_secret=config.get('SPOTIFY_CLIENT_SECRET')
     )
-    sp_client = Spotify(auth_manager=sp_auth)
+    sp_client = Spotify(auth_manager=sp_auth, requests_timeout=SpotifyService.REQUEST_TIMEOUT)
 
-    services = {
-        'spotify': SpotifyService(sp_client),
-        'genius': GeniusService(
-            access_token=config.get('GENIUS_ACCESS_TOKEN')
-        ),
+    # Local caches shared by all commands, in one SQLite file
+    cache_path = data_path('cache.sqlite3')
+
+    # Genius hit rates, recorded by Genius lookups and used to rank Spotify candidates
+    hit_stats = HitStats(data_path('hit_stats.json'))
+    # Full-text index over every Genius record fetched
+    index = MetadataIndex(data_path('index.sqlite3'))
+
+    genius = GeniusService(
+        access_token=config.get('GENIUS_ACCESS_TOKEN'),
+        cache=Cache(cache_path, 'genius', ttl=30 * DAY),
+        hit_stats=hit_stats,
+        index=index,
+        artist_cache=Cache(cache_path, 'genius_artists', ttl=GeniusService.ARTIST_TTL)
+    )
+    wikipedia = WikipediaService(cache=Cache(cache_path, 'wikipedia', ttl=30 * DAY))
+
+    spotify = SpotifyService(
+        sp_client,
+        cache=Cache(cache_path, 'spotify', ttl=6 * HOUR),
+        hit_stats=hit_stats
+    )
+
+    return {
+        'spotify': spotify,
+        'harvest': HarvestService(spotify),
+        'genius': genius,
+        'wikipedia': wikipedia,
+        'enrichment': EnrichmentService(genius, wikipedia),
         'gemini': GeminiService(
-            api_key=config.get('GOOGLE_API_KEY')
+            api_key=config.get('GOOGLE_API_KEY'),
+            cache=Cache(cache_path, 'summaries', ttl=90 * DAY)
         ),
         'telegram': TelegramService(
             bot_token=config.get('TELEGRAM_BOT_TOKEN'),
-            channel_id=config.get('TELEGRAM_CHANNEL_ID')
-        )
+            channel_id=config.get('TELEGRAM_CHANNEL_ID'),
+            file_cache=Cache(cache_path, 'telegram_files', ttl=TelegramService.FILE_TTL)
+        ),
+        'selection': SelectionService(
+            history_path=data_path('selection_history.json'),
+            hit_stats=hit_stats
+        ),
+        'index': index,
+        'ledger': RunLedger(data_path('ledger.sqlite3'))
     }
-    
-    # Run the task immediately on startup
-    daily_song_task(services)
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments. Without a command the daily post is sent.
+    """
+    parser = argparse.ArgumentParser(description="OneSongEachDay bot")
+    parser.add_argument('--run-id', default=datetime.utcnow().strftime('%Y-%m-%d'),
+                        help="Checkpoint ID of the daily run, retries with the same ID resume it")
+    parser.add_argument('--deadline', type=float, default=300,
+                        help="Seconds the daily run may take end to end")
+    parser.add_argument('--offline', action='store_true',
+                        help="Use the offline stand-ins instead of the real upstream services")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="Profile the daily run with cProfile and tracemalloc, writing reports to DIR")
+    parser.add_argument('--theme', metavar='QUERY',
+                        help="Pick the daily song from indexed songs matching QUERY, e.g. 'tags:synthwave'")
+    parser.add_argument('--speculate', type=int, default=1, metavar='N',
+                        help="Summarize the top N Genius-matched candidates at once and post the best that succeeds")
+    parser.add_argument('--speculative-tokens', type=int, default=6000,
+                        help="Estimated tokens the speculative summaries may spend together")
+    parser.add_argument('--log-format', choices=['json', 'text'], default='json',
+                        help="Log one JSON object per line, or plain text lines")
+    parser.add_argument('--coordination', metavar='URL',
+                        help="Share the work with other replicas through 'sqlite:PATH' on a shared volume, or 'local'")
+    parser.add_argument('--lease-ttl', type=float, default=60,
+                        help="Seconds a replica's lease outlives it when it stops renewing")
+    commands = parser.add_subparsers(dest='command')
+
+    backfill = commands.add_parser('backfill', help="Generate an archive of posts as JSONL")
+    backfill.add_argument('--count', type=int, required=True, help="Number of posts to generate")
+    backfill.add_argument('--output', default=data_path('backfill.jsonl'), help="Output JSONL file")
+    backfill.add_argument('--workers', type=int, default=8, help="Worker threads per process")
+    backfill.add_argument('--processes', type=int, default=1, help="Worker processes, one shard each")
+    backfill.add_argument('--genius-limit', type=int, default=4, help="Concurrent Genius calls per process")
+    backfill.add_argument('--gemini-limit', type=int, default=2, help="Concurrent Gemini calls per process")
+    backfill.add_argument('--shards', type=int, default=8,
+                          help="Shards replicas claim with --coordination, instead of --processes")
+
+    broadcast = commands.add_parser('broadcast', help="Send a run's post to every subscriber")
+    broadcast.add_argument('--concurrency', type=int, default=30, help="Sends in flight at once")
+    broadcast.add_argument('--rate', type=float, default=TELEGRAM_MESSAGES_PER_SECOND,
+                           help="Global messages per second")
+    broadcast.add_argument('--shards', type=int, default=8,
+                           help="Shards replicas claim with --coordination, all sharing one JUKA_DATA_DIR")
+
+    serve = commands.add_parser('serve', help="Answer /song commands interactively")
+    serve.add_argument('--concurrency', type=int, default=64, help="Updates handled at once")
+    serve.add_argument('--genius-limit', type=int, default=8, help="Concurrent Genius calls")
+    serve.add_argument('--gemini-limit', type=int, default=4, help="Concurrent Gemini calls")
+
+    ledger = commands.add_parser('ledger', help="Report latency percentiles and trends of past daily runs")
+    ledger.add_argument('--days', type=int, default=90, help="Only include runs of the last DAYS days")
+    ledger.add_argument('--period', choices=['day', 'week', 'month'], default='week', help="Trend granularity")
+
+    search = commands.add_parser('search', help="Search the local Genius metadata index")
+    search.add_argument('query', help="FTS5 query, e.g. 'producers:\"max martin\"' or 'tags:synthwave'")
+    search.add_argument('--limit', type=int, default=20, help="Maximum number of matches")
+
+    loadtest = commands.add_parser('loadtest', help="Ramp synthetic /song traffic against the offline stand-ins")
+    loadtest.add_argument('--rates', default='1,2,5,10,20,50',
+                          help="Comma-separated updates per second, one step each")
+    loadtest.add_argument('--step', type=float, default=10, help="Seconds each rate is held")
+    loadtest.add_argument('--max-p99', type=float, help="Stop ramping once p99 latency exceeds this many seconds")
+    loadtest.add_argument('--concurrency', type=int, default=64, help="Updates handled at once")
+    loadtest.add_argument('--genius-limit', type=int, default=8, help="Concurrent Genius calls")
+    loadtest.add_argument('--gemini-limit', type=int, default=4, help="Concurrent Gemini calls")
+    loadtest.add_argument('--latency-scale', type=float, default=1.0,
+                          help="Multiplier of the stand-ins' simulated latencies")
+    loadtest.add_argument('--cold', action='store_true', help="Run without the services' caches")
+    loadtest.add_argument('--seed', type=int, default=0, help="Seed of the latencies and the traffic")
+
+    bundle = commands.add_parser('bundle', help="Export the local stores to one archive, or import one. "
+                                                "Stop the bot before importing")
+    bundle.add_argument('action', choices=['export', 'import'])
+    bundle.add_argument('path', help="Archive file, e.g. juka-stores.tar.gz")
+    bundle.add_argument('--only', help=f"Comma-separated stores to include, of: {', '.join(BUNDLE_STORES)}")
+
+    return parser.parse_args(argv)
+
+def run_backfill(args):
+    """
+    Run a backfill in this process or sharded across worker processes.
+    """
+    factory = build_offline_services if args.offline else build_services
+    coordinator = build_coordinator(args)
+    if coordinator:
+        run_claimed_backfill(args, factory, coordinator)
+        return
+    limits = {'genius': args.genius_limit, 'gemini': args.gemini_limit}
+    if args.processes > 1:
+        completed = run_sharded(factory, args.output, args.count, args.processes, args.workers, limits)
+        logger.info("Backfill finished: %s posts across %s shards", sum(completed), len(completed))
+        return
+    backfill = BackfillService(factory(), args.output, limiter=StageLimiter(limits), workers=args.workers)
+    completed = backfill.run(args.count)
+    logger.info("Backfill finished: %s posts written to %s", completed, args.output)
+
+def build_coordinator(args):
+    """
+    Create the coordinator of the replicas, or None when this process runs alone.
+    """
+    if not args.coordination:
+        return None
+    return Coordinator(backend_from_url(args.coordination), ttl=args.lease_ttl)
+
+def run_claimed_backfill(args, factory, coordinator):
+    """
+    Claim backfill shards until every shard is done or held by another replica,
+    writing each to its own shard file.
+    """
+    limiter = StageLimiter({'genius': args.genius_limit, 'gemini': args.gemini_limit})
+    services = factory()
+    per_shard = split_count(args.count, args.shards)
+    completed = 0
+    for lease in coordinator.shards(f"backfill/{args.run_id}", args.shards):
+        backfill = BackfillService(
+            services,
+            f"{args.output}.shard{lease.shard}",
+            limiter=limiter,
+            workers=args.workers,
+            shard_index=lease.shard,
+            shard_count=args.shards
+        )
+        completed += backfill.run(per_shard[lease.shard])
+        lease.complete()
+    logger.info("Backfill finished: %s posts written by this replica", completed)
+
+def run_bot(args):
+    """
+    Serve /song commands until interrupted.
+    """
+    limiter = StageLimiter({'genius': args.genius_limit, 'gemini': args.gemini_limit})
+    subscribers = SubscriberStore(data_path('subscribers.sqlite3'))
+    bot = SongBotService(build_services(), limiter=limiter, subscribers=subscribers)
+    application = bot.build_application(Config().get('TELEGRAM_BOT_TOKEN'), args.concurrency)
+    logger.info("Serving /song commands")
+    application.run_polling()
+
+def run_broadcast(args):
+    """
+    Send the post of a completed run to every subscriber, resuming an interrupted broadcast.
+    """
+    run = CheckpointStore(data_path('checkpoints')).run(args.run_id)
+    if not run.completed('sent'):
+        logger.error("Run %s has not been posted yet, nothing to broadcast", args.run_id)
+        if args.coordination:
+            # The post, the subscribers and the progress are all read from the data directory
+            logger.error("Sharded broadcasts need JUKA_DATA_DIR (now %s) shared by every replica", data_dir())
+        sys.exit(1)
+
+    config = Config()
+    telegram = TelegramService(
+        bot_token=config.get('TELEGRAM_BOT_TOKEN'),
+        channel_id=config.get('TELEGRAM_CHANNEL_ID'),
+        file_cache=Cache(data_path('cache.sqlite3'), 'telegram_files', ttl=TelegramService.FILE_TTL)
+    )
+    text = telegram.format_song_message(run.get('track'), run.get('genius'), run.get('summary'))
+    # The daily post uploaded the album art, subscribers get it by file_id
+    photo = telegram.file_id(run.get('track').get('image_url'))
+    bot = Bot(
+        token=config.get('TELEGRAM_BOT_TOKEN'),
+        request=HTTPXRequest(connection_pool_size=args.concurrency)
+    )
+    service = BroadcastService(
+        bot,
+        SubscriberStore(data_path('subscribers.sqlite3')),
+        rate=args.rate,
+        concurrency=args.concurrency
+    )
+    os.makedirs(data_path('broadcasts'), exist_ok=True)
+    coordinator = build_coordinator(args)
+
+    async def send():
+        # One loop for every shard, since the bot's HTTP client is bound to the loop it first ran on
+        async with bot:
+            if not coordinator:
+                progress_path = os.path.join(data_path('broadcasts'), f"{args.run_id}.done")
+                await service.broadcast(text, progress_path, photo=photo)
+                return
+            # Progress is kept per shard in the shared data directory, so any replica can resume a shard
+            for lease in coordinator.shards(f"broadcast/{args.run_id}", args.shards):
+                progress_path = os.path.join(data_path('broadcasts'), f"{args.run_id}.shard{lease.shard}.done")
+                await service.broadcast(text, progress_path, photo=photo, shard=(lease.shard, args.shards))
+                lease.complete()
+
+    asyncio.run(send())
+
+def run_ledger(args):
+    """
+    Print a report of the daily runs in the ledger.
+    """
+    ledger = RunLedger(data_path('ledger.sqlite3'))
+    since = time.time() - args.days * DAY
+    summary = ledger.summary(since)
+    if not summary['runs']:
+        print(f"No runs recorded in the last {args.days} days")
+        return
+
+    def fmt(value):
+        if value is None:
+            return '-'
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+    print(f"{summary['runs']} runs in the last {args.days} days: "
+          + ', '.join(f"{count} {outcome}" for outcome, count in summary['outcomes'].items()))
+    print(f"Retries: {summary['retries']}, candidates per post: {fmt(summary['candidates_per_post'])}, "
+          f"cache hit ratio: {fmt(summary['cache_hit_ratio'])}")
+    print(f"Prompt chars: " + ', '.join(f"{name} {fmt(value)}" for name, value in summary['prompt_chars'].items()))
+    print()
+    print(f"{'latency (s)':<12}" + ''.join(f"{f'p{q}':>10}" for q in PERCENTILES))
+    for name, values in summary['latency'].items():
+        print(f"{name:<12}" + ''.join(f"{fmt(value):>10}" for value in values.values()))
+
+    trend = ledger.trend(args.period, since)
+    stages = sorted({name for row in trend for name in row['latency']} - {'total'})
+    print()
+    print(f"{args.period:<10}{'runs':>6}{'failed':>8}{'cands':>7}{'prompt':>9}{'total':>10}"
+          + ''.join(f"{name:>10}" for name in stages))
+    for row in trend:
+        print(f"{row['period']:<10}{row['runs']:>6}{row['failed']:>8}{fmt(row['candidates']):>7}"
+              f"{fmt(row['prompt_chars']):>9}{fmt(row['latency']['total']):>10}"
+              + ''.join(f"{fmt(row['latency'].get(name)):>10}" for name in stages))
+
+def run_loadtest(args):
+    """
+    Ramp synthetic /song updates through the bot's handlers on top of the offline
+    stand-ins and print throughput, latency, queue depth and memory per step.
+    """
+    services = build_offline_services(seed=args.seed, latency_scale=args.latency_scale, cached=not args.cold)
+    limiter = StageLimiter({'genius': args.genius_limit, 'gemini': args.gemini_limit})
+    bot = SongBotService(services, limiter=limiter, rng=random.Random(args.seed))
+    load_test = BotLoadTest(bot, concurrency=args.concurrency, seed=args.seed, latency_scale=args.latency_scale)
+    rates = [float(rate) for rate in args.rates.split(',')]
+    steps = load_test.ramp(rates, args.step, args.max_p99)
+
+    def fmt(value):
+        return '-' if value is None else f"{value:.2f}"
+
+    print(f"{'rate/s':>8}{'reqs':>7}{'failed':>8}{'thru/s':>8}"
+          + ''.join(f"{f'p{q} (s)':>10}" for q in PERCENTILES)
+          + f"{'queue':>8}{'max q':>7}{'flight':>8}{'KiB/req':>9}")
+    for step in steps:
+        memory = step['memory_per_request']
+        print(f"{step['rate']:>8g}{step['requests']:>7}{step['failed']:>8}{fmt(step['throughput']):>8}"
+              + ''.join(f"{fmt(value):>10}" for value in step['latency'].values())
+              + f"{step['queue_depth']['mean']:>8.2f}{step['queue_depth']['max']:>7}{step['in_flight']:>8}"
+              + f"{fmt(memory / 1024 if memory is not None else None):>9}")
+
+def run_bundle(args):
+    """
+    Export the local stores to an archive, or restore them from one.
+    """
+    stores = args.only.split(',') if args.only else None
+    try:
+        if args.action == 'export':
+            manifest = export_bundle(args.path, data_dir(), stores)
+            for name, entry in manifest['stores'].items():
+                print(f"{name:<12}{entry['size']:>12} bytes  sha256 {entry['sha256'][:16]}")
+        else:
+            restored = import_bundle(args.path, data_dir(), stores)
+            print(f"Restored {', '.join(restored)} into {data_dir()}")
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+def run_search(args):
+    """
+    Print the indexed songs matching a query.
+    """
+    index = MetadataIndex(data_path('index.sqlite3'))
+    start = time.perf_counter()
+    try:
+        matches = index.search(args.query, limit=args.limit)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    elapsed = (time.perf_counter() - start) * 1000
+    for match in matches:
+        info = match['info']
+        tags = ', '.join(info['genres'] + info['tags'])
+        print(f"{info['title']} by {info['artist']}" + (f" [{tags}]" if tags else ''))
+    print(f"{len(matches)} of {len(index)} indexed songs matched in {elapsed:.1f} ms")
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging(json_output=args.log_format == 'json')
+    # Every record of this process carries the run ID, bot updates carry their own
+    set_run_id(args.run_id if args.command in (None, 'broadcast') else f"{args.command}-{args.run_id}",
+               process=True)
+
+    if args.command == 'backfill':
+        run_backfill(args)
+        sys.exit(0)
+    if args.command == 'broadcast':
+        run_broadcast(args)
+        sys.exit(0)
+    if args.command == 'serve':
+        run_bot(args)
+        sys.exit(0)
+    if args.command == 'ledger':
+        run_ledger(args)
+        sys.exit(0)
+    if args.command == 'search':
+        run_search(args)
+        sys.exit(0)
+    if args.command == 'loadtest':
+        run_loadtest(args)
+        sys.exit(0)
+    if args.command == 'bundle':
+        run_bundle(args)
+        sys.exit(0)
+
+    # The run budget includes service initialization
+    deadline = Deadline(args.deadline)
+    profiler = PipelineProfiler(args.profile, deadline) if args.profile else nullcontext()
+    # Only the replica holding the run's leader lease posts, the others exit
+    coordinator = build_coordinator(args)
+    leader = coordinator.lead(f"daily/{args.run_id}") if coordinator else nullcontext()
+
+    with profiler, leader as lease:
+        if coordinator and lease is None:
+            logger.info("Another replica leads run %s or it is done, nothing to do", args.run_id)
+            sys.exit(0)
+
+        # Initialize services. Offline runs keep no checkpoint so they are reproducible
+        if args.offline:
+            services = build_offline_services()
+            run = None
+        else:
+            services = build_services()
+            run = CheckpointStore(data_path('checkpoints')).run(args.run_id)
+        
+        # Run the task immediately on startup, resuming today's run if it was interrupted
+        outcome = daily_song_task(services, run, deadline, args.theme, args.speculate, args.speculative_tokens)
+        # A run that found no song stays open, so another replica may retry it
+        if lease and outcome in ('posted', 'skipped'):
+            lease.complete()
     
     # Exit after running the task
     sys.exit(0)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
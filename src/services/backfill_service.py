@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.services.spotify_service import MAX_SEARCH_OFFSET
+from src.utils.concurrency import StageLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillService:
+    def __init__(self, services: Dict, output_path: str, checkpoint_path: Optional[str] = None,
+                 limiter: Optional[StageLimiter] = None, workers: int = 8,
+                 shard_index: int = 0, shard_count: int = 1, page_size: int = 50):
+        """
+        Initialize a backfill over the Spotify→Genius→Gemini pipeline.
+
+        Args:
+            services: The service dict used by daily_song_task ('spotify', 'genius', 'gemini')
+            output_path: JSONL file the generated posts are appended to
+            checkpoint_path: JSONL file recording every attempted track, defaults to output_path + '.checkpoint'
+            limiter: Per-stage concurrency limits shared by all workers
+            workers: Number of worker threads processing candidates
+            shard_index: Index of the shard handled by this process
+            shard_count: Total number of shards the Spotify search pages are split into
+            page_size: Number of tracks requested per Spotify search page
+        """
+        self.services = services
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or f"{output_path}.checkpoint"
+        self.limiter = limiter or StageLimiter()
+        self.workers = workers
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.page_size = page_size
+        self._write_lock = threading.Lock()
+        self.attempted: Set[str] = set()
+        self.completed = 0
+        # Posts to write before stopping, set by run
+        self.target: Optional[int] = None
+        self._load_checkpoint()
+
+    def _load_checkpoint(self) -> None:
+        """
+        Load already attempted tracks so an interrupted backfill resumes where it stopped.
+        Tracks that failed with an error are retried.
+        """
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash, the track will be retried
+                    continue
+                if entry.get('status') == 'error':
+                    continue
+                self.attempted.add(entry['id'])
+                if entry.get('status') == 'ok':
+                    self.completed += 1
+        logger.info("Resuming backfill: %s posts done, %s tracks attempted", self.completed, len(self.attempted))
+
+    def _pages(self) -> Iterator[Tuple[int, str]]:
+        """
+        Yield the (offset, genre) search pages of this shard. Pages are dealt out in turn,
+        so each shard fetches only its own and every shard covers all genres.
+        """
+        genres = self.services['spotify'].genres
+        pages = ((offset, genre) for offset in range(0, MAX_SEARCH_OFFSET, self.page_size) for genre in genres)
+        return islice(pages, self.shard_index, None, self.shard_count)
+
+    def _candidates(self) -> Iterator[Dict]:
+        """
+        Yield unattempted candidates from this shard's pages. A track listed under several
+        genres may come up in more than one shard.
+        """
+        spotify = self.services['spotify']
+        seen: Set[str] = set()
+        for offset, genre in self._pages():
+            try:
+                with self.limiter.stage('spotify'):
+                    songs = spotify.get_candidate_songs(limit=self.page_size, genre=genre, offset=offset)
+            except Exception as e:
+                logger.warning("Skipping %s page at offset %s: %s", genre, offset, e)
+                continue
+            for song in songs:
+                track_id = song.get('id')
+                if not track_id or track_id in seen or track_id in self.attempted:
+                    continue
+                seen.add(track_id)
+                yield song
+
+    def _process(self, song: Dict) -> str:
+        """
+        Run Genius and Gemini for one candidate and record the outcome.
+        Returns 'ok', 'miss' (no Genius info), 'error' or 'surplus' (the target was
+        reached by other workers first, the track is left for a later backfill).
+        """
+        try:
+            with self.limiter.stage('genius'):
+                genius_info = self.services['genius'].get_song_info(song['name'], song['artist'], song=song)
+            if not genius_info:
+                status = 'miss'
+            else:
+                with self.limiter.stage('gemini'):
+                    summary = self.services['gemini'].summarize_info(song, genius_info)
+                written = self._append_post({'song': song, 'genius': genius_info, 'summary': summary})
+                status = 'ok' if written else 'surplus'
+        except Exception as e:
+            logger.error("Error backfilling %s by %s: %s", song['name'], song['artist'], e)
+            status = 'error'
+        if status != 'surplus':
+            self._append(self.checkpoint_path, {'id': song['id'], 'status': status})
+        return status
+
+    def _append_post(self, record: Dict) -> bool:
+        """
+        Write a post unless the target is already reached. Returns whether it was written.
+        """
+        with self._write_lock:
+            if self.target is not None and self.completed >= self.target:
+                return False
+            self._write(self.output_path, record)
+            self.completed += 1
+        return True
+
+    def _append(self, path: str, record: Dict) -> None:
+        with self._write_lock:
+            self._write(path, record)
+
+    @staticmethod
+    def _write(path: str, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def run(self, count: int) -> int:
+        """
+        Generate posts until `count` have been written for this shard or candidates run out.
+        Workers still running once the target is reached write nothing, so the output
+        never holds more than `count` posts.
+        Returns the number of completed posts, including ones from earlier runs.
+        """
+        self.target = count
+        candidates = self._candidates()
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while self.completed < count:
+                # Never have more in flight than the posts still needed
+                while len(in_flight) < min(self.workers, count - self.completed):
+                    song = next(candidates, None)
+                    if song is None:
+                        break
+                    in_flight.add(executor.submit(self._process, song))
+                if not in_flight:
+                    logger.warning("Ran out of candidates before reaching the backfill target")
+                    break
+                _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                logger.info("Backfill progress: %s/%s", self.completed, count)
+            for future in in_flight:
+                future.cancel()
+        for name in ('genius', 'gemini'):
+            single_flight = getattr(self.services[name], 'single_flight', None)
+            if single_flight is not None:
+                logger.info("Coalesced %s calls: %s", name, single_flight.stats())
+        return self.completed
+
+
+def _run_shard(build_services: Callable[[], Dict], output_path: str, count: int,
+               shard_index: int, shard_count: int, workers: int,
+               limits: Optional[Dict[str, int]] = None) -> int:
+    """
+    Entry point of one backfill worker process.
+    """
+    service = BackfillService(
+        build_services(),
+        output_path=f"{output_path}.shard{shard_index}",
+        limiter=StageLimiter(limits),
+        workers=workers,
+        shard_index=shard_index,
+        shard_count=shard_count
+    )
+    return service.run(count)
+
+
+def split_count(count: int, shards: int) -> List[int]:
+    """
+    Split a number of posts as evenly as possible across shards.
+    """
+    return [count // shards + (1 if i < count % shards else 0) for i in range(shards)]
+
+
+def run_sharded(build_services: Callable[[], Dict], output_path: str, count: int,
+                processes: int, workers: int = 8, limits: Optional[Dict[str, int]] = None) -> List[int]:
+    """
+    Split a backfill across worker processes, each writing its own shard file.
+
+    Args:
+        build_services: Picklable top-level function creating the service dict in each process
+        output_path: Base path of the shard JSONL files
+        count: Total number of posts to generate
+        processes: Number of worker processes (and shards)
+        workers: Worker threads per process
+        limits: Maximum concurrent calls per stage name, applied in each process
+
+    Returns:
+        The number of completed posts per shard
+    """
+    per_shard = split_count(count, processes)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(_run_shard, build_services, output_path, per_shard[i], i, processes, workers, limits)
+            for i in range(processes)
+        ]
+        return [future.result() for future in futures]
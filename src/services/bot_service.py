@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import random
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application, CommandHandler, ContextTypes
+
+from src.utils.concurrency import StageLimiter
+from src.utils.log import set_run_id
+
+logger = logging.getLogger(__name__)
+
+
+class SongBotService:
+    # Ranked candidates a reply is picked from, and tried in turn until one has Genius info
+    CANDIDATES_PER_REPLY = 5
+
+    def __init__(self, services: Dict, limiter: Optional[StageLimiter] = None, subscribers=None,
+                 rng: Optional[random.Random] = None):
+        """
+        Initialize the interactive bot on top of the pipeline services.
+
+        Args:
+            services: The service dict used by daily_song_task, with caches configured
+                      so popular songs are answered without upstream calls
+            limiter: Per-stage concurrency limits shared by all requests being served
+            subscribers: SubscriberStore for /subscribe and /unsubscribe, or None to disable them
+            rng: Generator varying the answers, seeded to repeat a load test
+        """
+        self.services = services
+        self.limiter = limiter or StageLimiter()
+        self.subscribers = subscribers
+        self.random = rng or random.Random()
+
+    def build_application(self, bot_token: str, concurrent_updates: int = 64) -> Application:
+        """
+        Create the python-telegram-bot Application serving the bot's commands.
+        Updates are handled concurrently, up to `concurrent_updates` at a time.
+        """
+        application = (
+            Application.builder()
+            .token(bot_token)
+            .concurrent_updates(concurrent_updates)
+            .build()
+        )
+        application.add_handler(CommandHandler(['start', 'help'], self.handle_help))
+        application.add_handler(CommandHandler('song', self.handle_song))
+        if self.subscribers is not None:
+            application.add_handler(CommandHandler('subscribe', self.handle_subscribe))
+            application.add_handler(CommandHandler('unsubscribe', self.handle_unsubscribe))
+        return application
+
+    async def _stage(self, stage: str, func, *args, **kwargs):
+        """
+        Run a blocking service call in a worker thread under the stage's concurrency limit.
+        Queued updates wait for a slot on the event loop, so only running calls hold a thread.
+        """
+        async with self.limiter.async_stage(stage):
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    def help_text(self) -> str:
+        genres = ', '.join(self.services['spotify'].genres)
+        return f"Send /song for a random song, or /song &lt;genre&gt; with one of: {genres}"
+
+    async def handle_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        await update.effective_message.reply_text(self.help_text(), parse_mode='HTML')
+
+    async def handle_subscribe(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Opt the chat in to receiving the daily song as a direct message.
+        """
+        added = await asyncio.to_thread(self.subscribers.add, update.effective_chat.id)
+        reply = "You'll get the daily song here." if added else "You're already subscribed."
+        await update.effective_message.reply_text(reply)
+
+    async def handle_unsubscribe(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        removed = await asyncio.to_thread(self.subscribers.remove, update.effective_chat.id)
+        reply = "You won't get the daily song here anymore." if removed else "You weren't subscribed."
+        await update.effective_message.reply_text(reply)
+
+    async def handle_song(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Answer /song [genre] with a song picked by the pipeline.
+        """
+        # Each update runs in its own task, so its logs are tagged with the update ID
+        set_run_id(f"update-{update.update_id}")
+        genre = ' '.join(context.args or []).strip().lower() or None
+        if genre and genre not in self.services['spotify'].genres:
+            await update.effective_message.reply_text(self.help_text(), parse_mode='HTML')
+            return
+        try:
+            reply = await self.song_for(genre)
+        except Exception as e:
+            logger.error("Error answering /song %s: %s", genre or '', e)
+            reply = "Sorry, I couldn't find a song right now. Please try again later."
+        await update.effective_message.reply_text(reply, parse_mode='HTML')
+
+    async def song_for(self, genre: Optional[str] = None) -> str:
+        """
+        Run the Spotify→Genius→Gemini pipeline for a genre and return the formatted message.
+        """
+        spotify = self.services['spotify']
+        if 'selection' in self.services:
+            batch = await self._stage('spotify', spotify.get_candidate_batch, genre=genre)
+            songs = self.services['selection'].rank(batch, limit=self.CANDIDATES_PER_REPLY)
+        else:
+            songs = await self._stage('spotify', spotify.get_candidate_songs, genre=genre)
+            songs = songs[:self.CANDIDATES_PER_REPLY]
+
+        for song in self._shuffled(songs):
+            # Enriched from Wikipedia when configured, like the daily post
+            if 'enrichment' in self.services:
+                genius_info = await self._stage('genius', self.services['enrichment'].enrich, song)
+            else:
+                genius_info = await self._stage('genius', self.services['genius'].get_song_info,
+                                                song['name'], song['artist'], song=song)
+            if not genius_info:
+                continue
+            summary = await self._stage('gemini', self.services['gemini'].summarize_tiered, song, genius_info)
+            return self.services['telegram'].format_song_message(song, genius_info, summary, title="Your Song")
+        raise LookupError(f"No candidate with Genius info for genre {genre}")
+
+    def _shuffled(self, songs: List[Dict]) -> List[Dict]:
+        """
+        Vary the answer between the top candidates; cached pages keep this within a small, warm set.
+        """
+        return self.random.sample(songs, len(songs))
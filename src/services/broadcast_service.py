@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+from src.services.telegram_service import TelegramService
+from src.utils.concurrency import AsyncRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Telegram's global limit for bots sending to different chats
+TELEGRAM_MESSAGES_PER_SECOND = 30
+
+
+class SubscriberStore:
+    """
+    Opted-in subscriber chat IDs, kept as the integer keys of a SQLite table.
+    Every change is a single-row insert or delete, so the bot serving /subscribe and a
+    running broadcast can share the file without overwriting each other's changes.
+    """
+    # Chat IDs read per query while iterating
+    PAGE_SIZE = 1000
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        # Chats removed with save=False, deleted from the table on the next save
+        self._removed = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS subscribers (chat_id INTEGER PRIMARY KEY)')
+
+    def __len__(self) -> int:
+        with self._lock:
+            count = self._conn.execute('SELECT COUNT(*) FROM subscribers').fetchone()[0]
+            return count - len(self._removed)
+
+    def __contains__(self, chat_id: int) -> bool:
+        with self._lock:
+            if chat_id in self._removed:
+                return False
+            return self._conn.execute('SELECT 1 FROM subscribers WHERE chat_id = ?', (chat_id,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[int]:
+        """
+        Iterate over the chat IDs in order, a page at a time, so chats may be added
+        or removed while a broadcast iterates.
+        """
+        after = -(1 << 63)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT chat_id FROM subscribers WHERE chat_id >= ? ORDER BY chat_id LIMIT ?',
+                    (after, self.PAGE_SIZE)
+                ).fetchall()
+                removed = set(self._removed)
+            for (chat_id,) in rows:
+                if chat_id not in removed:
+                    yield chat_id
+            if len(rows) < self.PAGE_SIZE:
+                return
+            after = rows[-1][0] + 1
+
+    def add(self, chat_id: int) -> bool:
+        """
+        Subscribe a chat. Returns False if it was already subscribed.
+        """
+        with self._lock:
+            # A batched removal not saved yet is undone
+            if chat_id in self._removed:
+                self._removed.discard(chat_id)
+                return True
+            cursor = self._conn.execute('INSERT OR IGNORE INTO subscribers (chat_id) VALUES (?)', (chat_id,))
+            return cursor.rowcount > 0
+
+    def remove(self, chat_id: int, save: bool = True) -> bool:
+        """
+        Unsubscribe a chat. Returns False if it was not subscribed.
+        With save=False the removal is batched until the next save.
+        """
+        with self._lock:
+            if chat_id in self._removed:
+                return False
+            if not save:
+                exists = self._conn.execute('SELECT 1 FROM subscribers WHERE chat_id = ?', (chat_id,)).fetchone()
+                if exists:
+                    self._removed.add(chat_id)
+                return exists is not None
+            cursor = self._conn.execute('DELETE FROM subscribers WHERE chat_id = ?', (chat_id,))
+            return cursor.rowcount > 0
+
+    def save(self) -> None:
+        """
+        Delete the batched removals in one transaction.
+        """
+        with self._lock:
+            if not self._removed:
+                return
+            self._conn.execute('BEGIN')
+            self._conn.executemany('DELETE FROM subscribers WHERE chat_id = ?',
+                                   [(chat_id,) for chat_id in self._removed])
+            self._conn.execute('COMMIT')
+            self._removed.clear()
+
+
+class BroadcastProgress:
+    """
+    Append-only record of chats a broadcast is finished with, so a crashed broadcast
+    resumes without messaging anyone twice. Stored as raw int64 chat IDs.
+    Every mark is written through by default; with `flush_every` above 1 a crash
+    may message up to `flush_every - 1` chats again on resume.
+    """
+    def __init__(self, path: Optional[str] = None, flush_every: int = 1):
+        self.path = path
+        self.flush_every = flush_every
+        self.done = set()
+        self._pending = array('q')
+        if path and os.path.exists(path):
+            data = array('q')
+            with open(path, 'rb') as f:
+                raw = f.read()
+            # Drop a torn last record
+            data.frombytes(raw[:len(raw) - len(raw) % data.itemsize])
+            self.done.update(data)
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self.done
+
+    def mark(self, chat_id: int) -> None:
+        self.done.add(chat_id)
+        self._pending.append(chat_id)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.path or not self._pending:
+            return
+        with open(self.path, 'ab') as f:
+            f.write(self._pending.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = array('q')
+
+
+class BroadcastService:
+    def __init__(self, bot, subscribers: SubscriberStore, rate: float = TELEGRAM_MESSAGES_PER_SECOND,
+                 concurrency: int = 30, max_attempts: int = 5, flush_every: int = 1):
+        """
+        Initialize the broadcast engine.
+
+        Args:
+            bot: telegram.Bot used to send, with a connection pool of at least `concurrency`
+            subscribers: Store of opted-in chat IDs
+            rate: Global messages per second across all chats
+            concurrency: Number of sends in flight at once
+            max_attempts: Tries per chat before it is counted as failed
+            flush_every: Finished chats recorded per progress write, see BroadcastProgress
+        """
+        self.bot = bot
+        self.subscribers = subscribers
+        self.rate = rate
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.flush_every = flush_every
+
+    async def broadcast(self, text: str, progress_path: Optional[str] = None,
+                        photo: Optional[str] = None, shard: Optional[Tuple[int, int]] = None) -> Dict[str, int]:
+        """
+        Send an already rendered message to every subscriber not yet reached.
+        With the file_id of an uploaded photo, the message is sent as its caption when it fits.
+        With a shard (index, count), only the chats of that shard are sent to, so replicas
+        can split a broadcast.
+        Chats that blocked the bot or no longer exist are unsubscribed.
+        Failed chats are not recorded as done, so resuming the broadcast retries them.
+
+        Returns:
+            Counts of 'sent', 'blocked', 'failed' and 'skipped' (done before a resume) chats
+        """
+        progress = BroadcastProgress(progress_path, self.flush_every)
+        limiter = AsyncRateLimiter(self.rate)
+        counts = {'sent': 0, 'blocked': 0, 'failed': 0, 'skipped': 0}
+        started = time.monotonic()
+
+        def pending():
+            for chat_id in self.subscribers:
+                if shard and chat_id % shard[1] != shard[0]:
+                    continue
+                if chat_id in progress:
+                    counts['skipped'] += 1
+                else:
+                    yield chat_id
+
+        chats = pending()
+
+        async def worker():
+            # The shared generator is only advanced between awaits, so workers never collide
+            for chat_id in chats:
+                status = await self._deliver(chat_id, text, limiter, photo)
+                counts[status] += 1
+                if status == 'blocked':
+                    self.subscribers.remove(chat_id, save=False)
+                if status != 'failed':
+                    progress.mark(chat_id)
+
+        try:
+            await asyncio.gather(*[worker() for _ in range(self.concurrency)])
+        finally:
+            progress.flush()
+            if counts['blocked']:
+                self.subscribers.save()
+        elapsed = time.monotonic() - started
+        logger.info("Broadcast finished in %.1fs: %s", elapsed, counts)
+        return counts
+
+    async def _deliver(self, chat_id: int, text: str, limiter: AsyncRateLimiter, photo: Optional[str] = None) -> str:
+        """
+        Send to one chat, honouring RetryAfter and retrying transient errors.
+        Returns 'sent', 'blocked' or 'failed'.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await limiter.acquire()
+            try:
+                if photo and len(text) <= TelegramService.CAPTION_LIMIT:
+                    await self.bot.send_photo(chat_id=chat_id, photo=photo, caption=text, parse_mode='HTML')
+                else:
+                    await self.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+                return 'sent'
+            except RetryAfter as e:
+                retry_after = getattr(e.retry_after, 'total_seconds', lambda: e.retry_after)()
+                logger.warning("Flood control, pausing broadcast for %ss", retry_after)
+                limiter.pause(float(retry_after))
+            except Forbidden:
+                return 'blocked'
+            except BadRequest as e:
+                if 'chat not found' in str(e).lower():
+                    return 'blocked'
+                logger.error("Broadcast to %s rejected: %s", chat_id, e)
+                return 'failed'
+            except NetworkError as e:
+                logger.warning("Broadcast to %s failed (attempt %s): %s", chat_id, attempt, e)
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(min(2 ** attempt, 30))
+            except TelegramError as e:
+                logger.error("Broadcast to %s failed: %s", chat_id, e)
+                return 'failed'
+        return 'failed'
@@ -0,0 +1,112 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional, Tuple
+
+from src.utils.deadline import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Where each merged field comes from, in order of precedence. Fields not listed are Genius-only.
+FIELD_PRECEDENCE = {
+    'description': (('genius', 'description'), ('wikipedia', 'artist_bio')),
+    'artist_bio': (('wikipedia', 'artist_bio'), ('genius', 'artist_bio')),
+    'wikipedia_url': (('wikipedia', 'wikipedia_url'),),
+}
+
+# Fields that make the info good enough to stop waiting for slower sources
+DEFAULT_REQUIRED_FIELDS = ('description', 'artist_bio')
+
+
+class EnrichmentService:
+    def __init__(self, genius, wikipedia, required_fields: Tuple[str, ...] = DEFAULT_REQUIRED_FIELDS,
+                 grace: float = 1.0, workers: int = 8):
+        """
+        Initialize the enrichment stage over Genius and Wikipedia.
+
+        Args:
+            genius: GeniusService, the authoritative source: songs it does not know are skipped
+            wikipedia: WikipediaService adding the artist's background
+            required_fields: Fields after which the stage returns without waiting for other sources
+            grace: Seconds to keep waiting for the other sources once Genius has answered
+                   without filling every required field
+            workers: Threads shared by the lookups of all songs
+        """
+        self.genius = genius
+        self.wikipedia = wikipedia
+        self.required_fields = required_fields
+        self.grace = grace
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='enrichment')
+
+    @staticmethod
+    def merge(results: Dict[str, Optional[Dict]]) -> Dict:
+        """
+        Merge the sources' results, Genius fields first, then by FIELD_PRECEDENCE.
+        """
+        merged = dict(results.get('genius') or {})
+        for field, sources in FIELD_PRECEDENCE.items():
+            for source, source_field in sources:
+                value = (results.get(source) or {}).get(source_field)
+                if value:
+                    merged[field] = value
+                    break
+        return merged
+
+    def _enough(self, results: Dict[str, Optional[Dict]]) -> bool:
+        merged = self.merge(results)
+        return all(merged.get(field) for field in self.required_fields)
+
+    def enrich(self, song: Dict, deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """
+        Look a song up on Genius and Wikipedia concurrently and merge the results.
+        Returns as soon as the required fields are filled, abandoning slower lookups.
+        Returns None if Genius has no info for the song, like GeniusService.get_song_info.
+        Raises:
+            DeadlineExceeded: If the run deadline runs out before Genius answers
+        """
+        futures = {
+            self.executor.submit(self.genius.get_song_info, song['name'], song['artist'],
+                                 deadline=deadline, song=song): 'genius',
+            self.executor.submit(self.wikipedia.get_artist_info, song['artist'], deadline=deadline): 'wikipedia',
+        }
+        results: Dict[str, Optional[Dict]] = {}
+        pending = set(futures)
+        grace_until = None
+        try:
+            while pending:
+                if grace_until is not None:
+                    timeout = max(0.0, grace_until - time.monotonic())
+                else:
+                    timeout = deadline.remaining() if deadline else None
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    source = futures[future]
+                    try:
+                        results[source] = future.result()
+                    except DeadlineExceeded:
+                        if source == 'genius':
+                            raise
+                        results[source] = None
+                    except Exception as e:
+                        logger.warning("%s lookup failed for %s: %s", source, song['name'], e)
+                        results[source] = None
+                if 'genius' not in results:
+                    continue
+                if not results['genius']:
+                    return None
+                if self._enough(results):
+                    break
+                if grace_until is None:
+                    grace_until = time.monotonic() + self.grace
+        finally:
+            for future in pending:
+                # Lookups already running finish in the background and are discarded
+                future.cancel()
+
+        if 'genius' not in results:
+            raise DeadlineExceeded(f"Genius did not answer for {song['name']} within the run deadline")
+        if pending:
+            logger.info("Enriched %s without %s", song['name'], ', '.join(futures[f] for f in pending))
+        return self.merge(results)
@@ -1,24 +1,67 @@
+import asyncio
 import logging
+import threading
 import google.generativeai as genai
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+from src.utils.cache import cache_key
+from src.utils.concurrency import SingleFlight
+from src.utils.deadline import Deadline, call_with_timeout
 
 logger = logging.getLogger(__name__)
 
+# Length the description is trimmed to in the local fallback summary
+LOCAL_DESCRIPTION_LENGTH = 600
+
+# Rough prompt size of a token, used to estimate the cost of speculative generations
+CHARS_PER_TOKEN = 4
+
 class GeminiService:
-    def __init__(self, api_key: str):
+    # Seconds a single generation may take
+    REQUEST_TIMEOUT = 60
+    # Latency budget of each tier in the tiered summarizer
+    PRIMARY_TIMEOUT = 20
+    FALLBACK_TIMEOUT = 10
+
+    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash",
+                 fallback_model_name: Optional[str] = "gemini-1.5-flash-8b", cache=None):
         """
         Initialize the Gemini service with an API key.
+        
+        Args:
+            api_key: Google API key
+            model_name: Model used for summaries
+            fallback_model_name: Faster model tried when the main one is slow or failing, or None
+            cache: Cache for generated summaries, local fallback summaries are not cached
         """
+        self.cache = cache
+        # Concurrent requests for the same song's summary share one generation
+        self.single_flight = SingleFlight()
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name="gemini-1.5-flash")
-        
-    def summarize_info(self, song: Dict, genius_info: Dict) -> str:
+        self.model = genai.GenerativeModel(model_name=model_name)
+        self.fallback_model = genai.GenerativeModel(model_name=fallback_model_name) if fallback_model_name else None
+        # Event loop of the async client, started on the first speculative summary
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    def _build_prompt(self, song: Dict, genius_info: Dict) -> str:
         """
-        Generate a summary of the song information using Gemini.
+        Create a prompt that includes both song and Genius info, with the artist's
+        background when enrichment added one.
         """
-        try:
-            # Create a prompt that includes both song and Genius info
-            prompt = f"""Please provide a concise and engaging summary of this song:
+        description = genius_info.get('description', 'No description available.')
+        artist_bio = genius_info.get('artist_bio')
+        # Background from the artist's profiles, unless it already stands in for the description
+        artist_lines = [artist_bio] if artist_bio and artist_bio != description else []
+        if genius_info.get('artist_alternate_names'):
+            artist_lines.append(f"Also known as: {', '.join(genius_info['artist_alternate_names'])}")
+        if genius_info.get('artist_socials'):
+            artist_lines.append("On social media: " + ', '.join(
+                f"{network.title()} @{handle}" for network, handle in genius_info['artist_socials'].items()
+            ))
+        if genius_info.get('artist_followers'):
+            artist_lines.append(f"Followers on Genius: {genius_info['artist_followers']}")
+        about_artist = "\n\nAbout the Artist:\n" + '\n'.join(artist_lines) if artist_lines else ''
+        return f"""Please provide a concise and engaging summary of this song:
 
 Title: {song['name']}
 Artist: {song['artist']}
@@ -26,7 +69,7 @@ Album: {genius_info.get('album', 'Unknown')}
 Release Date: {genius_info.get('release_date', 'Unknown')}
 
 Additional Information:
-{genius_info.get('description', 'No description available.')}
+{description}{about_artist}
 
 Please include:
 1. A brief overview of the song's significance
@@ -36,10 +79,206 @@ Please include:
 
 Keep the summary concise and engaging, focusing on the most interesting aspects."""
 
-            # Generate the summary
-            response = self.model.generate_content(prompt)
-            return response.text
+    def prompt_length(self, song: Dict, genius_info: Dict) -> int:
+        """
+        Get the length in characters of the prompt a song's summary is generated from.
+        """
+        return len(self._build_prompt(song, genius_info))
+
+    def _generate(self, model, prompt: str, timeout: Optional[float]) -> str:
+        """
+        Generate text with a model. The client has no timeout option, so it is enforced here.
+        """
+        response = call_with_timeout(model.generate_content, timeout, prompt)
+        return response.text
+        
+    def _cached(self, song: Dict) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.get(cache_key(song['name'], song['artist']))
+
+    def _store(self, song: Dict, summary: str) -> None:
+        if self.cache is not None:
+            self.cache.set(cache_key(song['name'], song['artist']), summary)
+
+    def summarize_info(self, song: Dict, genius_info: Dict, deadline: Optional[Deadline] = None) -> str:
+        """
+        Generate a summary of the song information using Gemini.
+        With a deadline, the generation is abandoned once the remaining budget runs out.
+        """
+        try:
+            summary = self._cached(song)
+            if summary is not None:
+                return summary
+            prompt = self._build_prompt(song, genius_info)
+            timeout = deadline.timeout(cap=self.REQUEST_TIMEOUT) if deadline else None
+            key = cache_key('main', song['name'], song['artist'])
+            summary = self.single_flight.do(key, self._generate, self.model, prompt, timeout, timeout=timeout)
+            self._store(song, summary)
+            return summary
             
         except Exception as e:
-            logger.error(f"Error generating summary: {e}")
-            raise 
\ No newline at end of file
+            logger.error("Error generating summary: %s", e)
+            raise
+
+    def summarize_tiered(self, song: Dict, genius_info: Dict, deadline: Optional[Deadline] = None,
+                         reserve: float = 0.0) -> str:
+        """
+        Generate a summary within a bounded time, never raising.
+        The main model is tried first, then the faster fallback model on timeout or error,
+        and finally a local template summary built from the Genius fields.
+        
+        Args:
+            song: Spotify song info
+            genius_info: Genius song info
+            deadline: Run deadline the tiers' latency budgets are taken from
+            reserve: Seconds of the run budget to leave for the stages after this one
+        """
+        summary = self._cached(song)
+        if summary is not None:
+            return summary
+        prompt = self._build_prompt(song, genius_info)
+        tiers = [('main', self.model, self.PRIMARY_TIMEOUT), ('fallback', self.fallback_model, self.FALLBACK_TIMEOUT)]
+        for tier, model, latency_budget in tiers:
+            if model is None:
+                continue
+            try:
+                timeout = deadline.timeout(cap=latency_budget, reserve=reserve) if deadline else latency_budget
+                key = cache_key(tier, song['name'], song['artist'])
+                summary = self.single_flight.do(key, self._generate, model, prompt, timeout, timeout=timeout)
+                self._store(song, summary)
+                return summary
+            except Exception as e:
+                logger.warning("Gemini %s tier failed for %s: %s", tier, song['name'], e)
+        logger.warning("Using local summary for %s", song['name'])
+        return self.local_summary(song, genius_info)
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Get the loop running the async generations. It lives in its own thread for the
+        service's lifetime, since the async client is bound to the loop it first ran on.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='gemini-async', daemon=True).start()
+            return self._loop
+
+    async def _generate_async(self, prompt: str, max_output_tokens: int) -> str:
+        response = await self.model.generate_content_async(
+            prompt, generation_config=genai.GenerationConfig(max_output_tokens=max_output_tokens)
+        )
+        return response.text
+
+    async def _speculate(self, prompts: List[Optional[str]], cached: List[Optional[str]],
+                         max_output_tokens: int) -> Optional[Tuple[int, str]]:
+        tasks = [asyncio.ensure_future(self._generate_async(prompt, max_output_tokens)) if prompt else None
+                 for prompt in prompts]
+        try:
+            # Candidates are awaited in rank order, so a lower-ranked summary is only used
+            # once every better-ranked one has failed
+            for index, task in enumerate(tasks):
+                if cached[index] is not None:
+                    return index, cached[index]
+                if task is None:
+                    continue
+                try:
+                    return index, await task
+                except Exception as e:
+                    logger.warning("Speculative summary %s failed: %s", index + 1, e)
+            return None
+        finally:
+            for task in tasks:
+                if task is not None:
+                    task.cancel()
+
+    def summarize_speculative(self, candidates: List[Tuple[Dict, Dict]], deadline: Optional[Deadline] = None,
+                              reserve: float = 0.0, token_budget: int = 6000,
+                              max_output_tokens: int = 512) -> Optional[Tuple[int, str]]:
+        """
+        Generate summaries for several ranked candidates at once and keep the best-ranked
+        one that succeeds, cancelling the requests still in flight.
+        The top candidate is always tried. The others are only started while the estimated
+        cost of all requests (prompt tokens plus the output cap) stays within `token_budget`.
+
+        Args:
+            candidates: (song, genius_info) pairs, best first
+            deadline: Run deadline the generations' latency budget is taken from
+            reserve: Seconds of the run budget to leave for the stages after this one
+            token_budget: Estimated tokens all started requests may spend together
+            max_output_tokens: Output cap of each request
+
+        Returns:
+            The index of the chosen candidate and its summary, or None if every generation failed
+        Raises:
+            DeadlineExceeded: If the run deadline leaves no time for generation
+        """
+        cached = [self._cached(song) for song, _ in candidates]
+        prompts: List[Optional[str]] = []
+        spent = 0
+        for (song, genius_info), summary in zip(candidates, cached):
+            if summary is not None:
+                break
+            prompt = self._build_prompt(song, genius_info)
+            cost = len(prompt) // CHARS_PER_TOKEN + max_output_tokens
+            if prompts and spent + cost > token_budget:
+                break
+            prompts.append(prompt)
+            spent += cost
+        prompts += [None] * (len(candidates) - len(prompts))
+        if cached[0] is not None:
+            return 0, cached[0]
+
+        timeout = deadline.timeout(cap=self.PRIMARY_TIMEOUT, reserve=reserve) if deadline else self.PRIMARY_TIMEOUT
+        started = sum(1 for prompt in prompts if prompt)
+        future = asyncio.run_coroutine_threadsafe(self._speculate(prompts, cached, max_output_tokens),
+                                                  self._event_loop())
+        try:
+            result = future.result(timeout)
+        except Exception as e:
+            future.cancel()
+            logger.warning("Speculative summaries failed: %s", e)
+            return None
+        if result is not None:
+            index, summary = result
+            if cached[index] is None:
+                self._store(candidates[index][0], summary)
+            logger.info("Used speculative summary %s of %s, about %s tokens requested", index + 1, started, spent)
+        return result
+
+    @staticmethod
+    def local_summary(song: Dict, genius_info: Dict) -> str:
+        """
+        Build a deterministic summary from the Genius fields, without calling a model.
+        """
+        title = genius_info.get('title') or song['name']
+        artist = genius_info.get('artist') or song['artist']
+        lines = [f"{title} by {artist}"]
+        album = genius_info.get('album')
+        if album and album != 'Unknown Album':
+            lines[0] += f", from {album}"
+        release_date = genius_info.get('release_date')
+        if release_date and release_date != 'Unknown':
+            lines[0] += f" ({release_date})"
+        lines[0] += "."
+
+        credits = [
+            ('Produced by', genius_info.get('producer_artists')),
+            ('Written by', genius_info.get('writer_artists')),
+            ('Featuring', genius_info.get('featured_artists'))
+        ]
+        for label, names in credits:
+            if names:
+                lines.append(f"{label} {', '.join(names)}.")
+        if genius_info.get('genres'):
+            lines.append(f"Genres: {', '.join(genius_info['genres'])}.")
+        if genius_info.get('tags'):
+            lines.append(f"Tags: {', '.join(genius_info['tags'])}.")
+
+        description = genius_info.get('description', '').strip()
+        if len(description) > LOCAL_DESCRIPTION_LENGTH:
+            description = description[:LOCAL_DESCRIPTION_LENGTH].rsplit(' ', 1)[0] + '…'
+        if description:
+            lines.append('')
+            lines.append(description)
+        return '\n'.join(lines)
@@ -1,25 +1,172 @@
 import logging
 import requests
 from typing import Dict, Optional
+from src.utils.cache import DAY, cache_key
+from src.utils.concurrency import SingleFlight
+from src.utils.deadline import Deadline, DeadlineExceeded
+from src.utils.records import GeniusRecord
 
 logger = logging.getLogger(__name__)
 
 class GeniusService:
-    def __init__(self, access_token: str):
+    # Seconds a single Genius request may take
+    REQUEST_TIMEOUT = 10
+    # Songs without a Genius entry are remembered for a shorter time than found ones
+    MISS_TTL = DAY
+    # Artist profiles change rarely and are shared by all of an artist's songs
+    ARTIST_TTL = 180 * DAY
+
+    def __init__(self, access_token: str, session=requests, cache=None, hit_stats=None, index=None,
+                 artist_cache=None):
         """
         Initialize the Genius service with an access token.
+        The session (anything with a requests-style get) defaults to the requests module.
+        Lookups are kept in the cache, if given, including songs that were not found.
+        Outcomes of fresh lookups are recorded in hit_stats, if given.
+        Fetched records are added to the full-text index (a MetadataIndex), if given.
+        Artist profiles are kept in artist_cache, if given, for ARTIST_TTL.
         """
         self.access_token = access_token
+        self.session = session
+        self.cache = cache
+        self.artist_cache = artist_cache
+        self.hit_stats = hit_stats
+        self.index = index
+        # Concurrent lookups of the same song share one request
+        self.single_flight = SingleFlight()
         self.base_url = "https://api.genius.com"
         self.headers = {
             "Authorization": f"Bearer {access_token}",
             "User-Agent": "OneSongEachDay/1.0"
         }
 
-    def get_song_info(self, song_name: str, artist_name: str) -> Optional[Dict]:
+    def _timeout(self, deadline: Optional[Deadline]) -> float:
+        """
+        Get the timeout of the next request, bounded by the run deadline if there is one.
+        """
+        if deadline is None:
+            return self.REQUEST_TIMEOUT
+        return deadline.timeout(cap=self.REQUEST_TIMEOUT)
+
+    def get_song_info(self, song_name: str, artist_name: str, deadline: Optional[Deadline] = None,
+                      song: Optional[Dict] = None) -> Optional[Dict]:
         """
         Get song information from Genius API.
         Returns a dictionary with song information or None if not found.
+        The primary artist's profile is merged in, see get_artist_info.
+        The Spotify song, if given, attributes the outcome to its genre and popularity in the hit statistics.
+        Raises:
+            DeadlineExceeded: If the run deadline leaves no time for a request
+        """
+        info = self._song_info(song_name, artist_name, deadline, song)
+        if info and info.get('artist_id'):
+            try:
+                # Coalesced lookups share the info dict, so it is copied rather than updated
+                info = {**info, **(self.get_artist_info(info['artist_id'], deadline) or {})}
+            except DeadlineExceeded:
+                # The song itself is known, the artist's profile is optional
+                pass
+        return info
+
+    def _coalesced(self, key: str, deadline: Optional[Deadline], func, *args):
+        """
+        Share an in-flight lookup with the same key, waiting for it no longer than the run deadline allows.
+        """
+        try:
+            return self.single_flight.do(key, func, *args, timeout=deadline.remaining() if deadline else None)
+        except TimeoutError as e:
+            raise DeadlineExceeded(str(e))
+
+    def _song_info(self, song_name: str, artist_name: str, deadline: Optional[Deadline],
+                   song: Optional[Dict]) -> Optional[Dict]:
+        key = cache_key(song_name, artist_name)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if isinstance(cached, list):
+                return GeniusRecord.from_row(cached).to_dict()
+            if cached is not None:
+                # An empty dict records a song Genius does not have
+                return cached or None
+        info = self._coalesced(key, deadline, self._lookup, song_name, artist_name, deadline, song)
+        if self.cache is not None and info is not False:
+            if info:
+                self.cache.set(key, GeniusRecord.from_dict(info).to_row())
+            else:
+                self.cache.set(key, {}, ttl=self.MISS_TTL)
+        return info or None
+
+    def get_artist_info(self, artist_id: int, deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """
+        Get an artist's Genius profile, fetched once per artist and cached.
+        Returns a dict of 'artist_bio', 'artist_alternate_names', 'artist_socials' and
+        'artist_followers', ready to merge into the song info, or None if not found.
+        Raises:
+            DeadlineExceeded: If the run deadline leaves no time for a request
+        """
+        key = cache_key('artists', artist_id)
+        if self.artist_cache is not None:
+            cached = self.artist_cache.get(key)
+            if cached is not None:
+                return cached or None
+        info = self._coalesced(key, deadline, self._fetch_artist_info, artist_id, deadline)
+        if self.artist_cache is not None and info is not False:
+            self.artist_cache.set(key, info or {}, ttl=self.ARTIST_TTL if info else self.MISS_TTL)
+        return info or None
+
+    def _fetch_artist_info(self, artist_id: int, deadline: Optional[Deadline]):
+        """
+        Fetch an artist's profile.
+        Returns the artist fields, None if Genius has no such artist, or False if the lookup failed.
+        """
+        try:
+            response = self.session.get(f"{self.base_url}/artists/{artist_id}", headers=self.headers,
+                                        params={"text_format": "plain"}, timeout=self._timeout(deadline))
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+
+            artist = response.json().get("response", {}).get("artist") or {}
+            if not artist:
+                return None
+            bio = (artist.get("description") or {}).get("plain", "").strip()
+            socials = {network: artist.get(f"{network}_name")
+                       for network in ("instagram", "twitter", "facebook") if artist.get(f"{network}_name")}
+            return {
+                # Genius shows "?" for artists without a bio
+                "artist_bio": bio if bio != "?" else "",
+                "artist_alternate_names": artist.get("alternate_names") or [],
+                "artist_socials": socials,
+                "artist_followers": artist.get("followers_count")
+            }
+
+        except DeadlineExceeded:
+            raise
+        except requests.exceptions.RequestException as e:
+            logger.error("Error fetching artist info from Genius: %s", e)
+            return False
+        except Exception as e:
+            logger.error("Unexpected error in Genius service: %s", e)
+            return False
+
+    def _lookup(self, song_name: str, artist_name: str, deadline: Optional[Deadline], song: Optional[Dict]):
+        """
+        Fetch a song, record whether Genius had it and index what it had.
+        Failed lookups are not recorded.
+        """
+        info = self._fetch_song_info(song_name, artist_name, deadline)
+        if self.hit_stats is not None and song is not None and info is not False:
+            self.hit_stats.record(song, bool(info))
+        if self.index is not None and info:
+            try:
+                self.index.add(song_name, artist_name, info, song)
+            except Exception as e:
+                logger.warning("Could not index %s by %s: %s", song_name, artist_name, e)
+        return info
+
+    def _fetch_song_info(self, song_name: str, artist_name: str, deadline: Optional[Deadline]):
+        """
+        Look a song up on Genius.
+        Returns the info dict, None if Genius has no such song, or False if the lookup failed.
         """
         try:
             # Search for the song
@@ -28,14 +175,15 @@ class GeniusService:
                 "q": f"{song_name} {artist_name}"
             }
             
-            response = requests.get(search_url, headers=self.headers, params=params)
+            response = self.session.get(search_url, headers=self.headers, params=params,
+                                        timeout=self._timeout(deadline))
             response.raise_for_status()
             
             data = response.json()
             hits = data.get("response", {}).get("hits", [])
             
             if not hits:
-                logger.warning(f"No results found for {song_name} by {artist_name}")
+                logger.warning("No results found for %s by %s", song_name, artist_name)
                 return None
                 
             # Get the first hit
@@ -48,7 +196,7 @@ class GeniusService:
                 return None
                 
             song_url = f"{self.base_url}/songs/{song_id}"
-            song_response = requests.get(song_url, headers=self.headers)
+            song_response = self.session.get(song_url, headers=self.headers, timeout=self._timeout(deadline))
             song_response.raise_for_status()
             
             song_details = song_response.json().get("response", {}).get("song", {})
@@ -65,15 +213,18 @@ class GeniusService:
                 "writer_artists": [artist.get("name") for artist in song_details.get("writer_artists", [])],
                 "featured_artists": [artist.get("name") for artist in song_details.get("featured_artists", [])],
                 "genres": [genre.get("name") for genre in song_details.get("genres", [])],
-                "tags": [tag.get("name") for tag in song_details.get("tags", [])]
+                "tags": [tag.get("name") for tag in song_details.get("tags", [])],
+                "artist_id": song_details.get("primary_artist", {}).get("id")
             }
             
+        except DeadlineExceeded:
+            raise
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching song info from Genius: {e}")
-            return None
+            logger.error("Error fetching song info from Genius: %s", e)
+            return False
         except Exception as e:
-            logger.error(f"Unexpected error in Genius service: {e}")
-            return None
+            logger.error("Unexpected error in Genius service: %s", e)
+            return False
 
     def format_info(self, info: Dict) -> str:
         """
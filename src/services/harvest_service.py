@@ -0,0 +1,175 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.services.spotify_service import MAX_SEARCH_OFFSET, SpotifyService
+from src.utils.cache import cache_key
+from src.utils.deadline import Deadline
+from src.utils.records import TrackBatch
+
+logger = logging.getLogger(__name__)
+
+# A source returns full Spotify track objects and the genre to label them with
+Source = Callable[[], Tuple[List[Dict], Optional[str]]]
+
+
+class HarvestService:
+    # Seconds a harvest may take when no run deadline is tighter
+    HARVEST_TIMEOUT = 15
+
+    def __init__(self, spotify: SpotifyService, workers: int = 8, page_size: int = 50,
+                 search_pages: int = 6, categories: int = 4, new_release_albums: int = 20,
+                 top_track_artists: int = 10, country: str = 'US', rng: Optional[random.Random] = None):
+        """
+        Initialize a harvester building candidate pools from several Spotify endpoints at once.
+
+        Args:
+            spotify: SpotifyService whose client, genres, formatting and cache are used
+            workers: Requests in flight at once
+            page_size: Tracks requested per search page
+            search_pages: Genre search pages fetched, each at a random offset
+            categories: Browse categories whose top playlist is read
+            new_release_albums: New release albums whose tracks are added
+            top_track_artists: Artists found along the way whose top tracks are added
+            country: Market of the new releases and artist top tracks
+            rng: Generator of the search offsets, the Spotify service's when not given
+        """
+        self.spotify = spotify
+        self.sp = spotify.sp
+        self.workers = workers
+        self.page_size = page_size
+        self.search_pages = search_pages
+        self.categories = categories
+        self.new_release_albums = new_release_albums
+        self.top_track_artists = top_track_artists
+        self.country = country
+        self.random = rng or spotify.random
+
+    def _search(self, genre: str, offset: int) -> Tuple[List[Dict], Optional[str]]:
+        results = self.sp.search(q=f'genre:{genre}', type='track', limit=self.page_size, offset=offset)
+        return results['tracks']['items'], genre
+
+    def _new_releases(self) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Album listings only carry simplified tracks, so the full tracks are fetched by ID.
+        """
+        albums = self.sp.new_releases(country=self.country, limit=self.new_release_albums)['albums']['items']
+        album_ids = [album['id'] for album in albums]
+        track_ids = []
+        for start in range(0, len(album_ids), 20):
+            for album in self.sp.albums(album_ids[start:start + 20])['albums']:
+                track_ids.extend(track['id'] for track in (album or {}).get('tracks', {}).get('items', []))
+        tracks = []
+        for start in range(0, len(track_ids), 50):
+            tracks.extend(self.sp.tracks(track_ids[start:start + 50])['tracks'])
+        return tracks, None
+
+    def _category(self, category: Dict) -> Tuple[List[Dict], Optional[str]]:
+        playlists = self.sp.category_playlists(category['id'], limit=1)['playlists']['items']
+        if not playlists or not playlists[0]:
+            return [], None
+        items = self.sp.playlist_items(playlists[0]['id'], limit=100)['items']
+        return [item.get('track') for item in items if item], category['name'].lower()
+
+    def _artist_top_tracks(self, artist_id: str, genre: Optional[str]) -> Tuple[List[Dict], Optional[str]]:
+        return self.sp.artist_top_tracks(artist_id, country=self.country)['tracks'], genre
+
+    def _sources(self, deadline: Optional[Deadline] = None) -> List[Source]:
+        """
+        The first wave of requests. Genres are picked by observed hit rate when the
+        Spotify service tracks it.
+        """
+        sources: List[Source] = []
+        for _ in range(self.search_pages):
+            genre = self.spotify.pick_genre()
+            offset = self.random.randrange(0, MAX_SEARCH_OFFSET - self.page_size + 1, self.page_size)
+            sources.append(lambda genre=genre, offset=offset: self._search(genre, offset))
+        if self.new_release_albums:
+            sources.append(self._new_releases)
+        if self.categories:
+            try:
+                categories = self.spotify._call(self.sp.categories, country=self.country, limit=self.categories,
+                                                deadline=deadline)['categories']['items']
+            except Exception as e:
+                logger.warning("Spotify categories unavailable: %s", e)
+                categories = []
+            for category in categories:
+                sources.append(lambda category=category: self._category(category))
+        return sources
+
+    def harvest(self, pool_size: int = 200, deadline: Optional[Deadline] = None) -> TrackBatch:
+        """
+        Build a pool of up to `pool_size` distinct tracks from all sources concurrently.
+        Tracks are deduplicated by ID as results are merged, artists seen in them queue their
+        top tracks, and outstanding requests are dropped once the pool is full.
+        Pools are cached like candidate pages.
+        Raises:
+            Exception: If no source returned any track in time
+        """
+        key = cache_key('harvest', pool_size)
+        cache = self.spotify.cache
+        if cache is not None:
+            payload = cache.get(key)
+            if payload:
+                try:
+                    return TrackBatch.from_payload(payload)
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    pass
+
+        timeout = deadline.timeout(cap=self.HARVEST_TIMEOUT) if deadline else self.HARVEST_TIMEOUT
+        stop_at = time.monotonic() + timeout
+        pool: Dict[str, Dict] = {}
+        artists = set()
+        counts = {'requests': 0, 'failed': 0, 'duplicates': 0}
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='harvest')
+        # Requests run concurrently, but their results are merged in the order they were
+        # made, so the same responses always build the same pool
+        queue = [executor.submit(source) for source in self._sources(deadline)]
+        index = 0
+        try:
+            while index < len(queue) and len(pool) < pool_size:
+                future = queue[index]
+                index += 1
+                try:
+                    tracks, genre = future.result(timeout=max(0.0, stop_at - time.monotonic()))
+                except FutureTimeoutError:
+                    logger.warning("Harvest timed out with %s tracks", len(pool))
+                    break
+                except Exception as e:
+                    counts['requests'] += 1
+                    counts['failed'] += 1
+                    logger.warning("Harvest source failed: %s", e)
+                    continue
+                counts['requests'] += 1
+                for track in tracks:
+                    if len(pool) >= pool_size:
+                        break
+                    if not track or not track.get('id'):
+                        continue
+                    if track['id'] in pool:
+                        counts['duplicates'] += 1
+                        continue
+                    try:
+                        song = self.spotify._format_song_info(track)
+                    except Exception:
+                        continue
+                    song['genre'] = genre
+                    pool[track['id']] = song
+                    artist_id = (track.get('artists') or [{}])[0].get('id')
+                    if artist_id and artist_id not in artists and len(artists) < self.top_track_artists:
+                        artists.add(artist_id)
+                        queue.append(executor.submit(self._artist_top_tracks, artist_id, genre))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if not pool:
+            raise Exception("No tracks harvested from Spotify")
+        logger.info("Harvested %s tracks: %s", len(pool), counts)
+        songs = list(pool.values())
+        self.spotify._attach_features(songs, deadline)
+        batch = TrackBatch.from_dicts(songs)
+        if cache is not None:
+            cache.set(key, batch.to_payload())
+        return batch
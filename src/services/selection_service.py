@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+from datetime import date
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from src.utils.records import TrackBatch
+
+logger = logging.getLogger(__name__)
+
+# Feature columns, in matrix order
+FEATURES = ('energy', 'tempo', 'popularity', 'year')
+
+DEFAULT_TARGET = {'energy': 0.6, 'tempo': 118.0, 'popularity': 55.0, 'year': 2000.0}
+DEFAULT_WEIGHTS = {'energy': 1.0, 'tempo': 0.5, 'popularity': 1.0, 'year': 0.75}
+
+# Ranges used to scale raw feature values to [0, 1]
+TEMPO_RANGE = (60.0, 200.0)
+YEAR_RANGE = (1950.0, float(date.today().year))
+
+
+class SelectionService:
+    def __init__(self, target: Optional[Dict] = None, weights: Optional[Dict] = None,
+                 diversity_weight: float = 0.5, diversity_radius: float = 0.1,
+                 history_size: int = 30, history_path: Optional[str] = None,
+                 hit_stats=None, hit_weight: float = 0.5):
+        """
+        Initialize the selection engine with a target profile and a recent-history store.
+
+        Args:
+            target: Target values in natural units (energy 0-1, tempo BPM, popularity 0-100, year)
+            weights: Relative weight of each feature in the distance
+            diversity_weight: How strongly to penalize candidates close to recent posts
+            diversity_radius: Distance at which a recent post stops counting as similar
+            history_size: Number of recent posts kept in the history matrix
+            history_path: JSON file the history is persisted to, or None to keep it in memory
+            hit_stats: HitStats whose expected Genius hit rate is added to the score, if given
+            hit_weight: How strongly the expected hit rate counts against the profile fit
+        """
+        target = {**DEFAULT_TARGET, **(target or {})}
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.target = self._scale(np.array([[target[f] for f in FEATURES]], dtype=float))[0]
+        self.weights = np.array([weights[f] for f in FEATURES], dtype=float)
+        self.weights /= self.weights.sum()
+        self.diversity_weight = diversity_weight
+        self.diversity_radius = diversity_radius
+        self.history_size = history_size
+        self.history_path = history_path
+        self.hit_stats = hit_stats
+        self.hit_weight = hit_weight
+        self.history_ids: List[str] = []
+        self.history = np.empty((0, len(FEATURES)))
+        self._load_history()
+
+    @staticmethod
+    def _scale(matrix: np.ndarray) -> np.ndarray:
+        """
+        Scale raw feature columns to [0, 1] in place. NaN values are preserved.
+        """
+        matrix[:, 1] = (matrix[:, 1] - TEMPO_RANGE[0]) / (TEMPO_RANGE[1] - TEMPO_RANGE[0])
+        matrix[:, 2] = matrix[:, 2] / 100.0
+        matrix[:, 3] = (matrix[:, 3] - YEAR_RANGE[0]) / (YEAR_RANGE[1] - YEAR_RANGE[0])
+        return np.clip(matrix, 0.0, 1.0, out=matrix)
+
+    @staticmethod
+    def _raw_row(song: Dict) -> tuple:
+        """
+        Extract the raw feature values of a song, using NaN for anything missing.
+        """
+        features = song.get('features') or {}
+        year = str(song.get('release_date') or '')[:4]
+        return (
+            features.get('energy', np.nan),
+            features.get('tempo', np.nan),
+            song.get('popularity', np.nan),
+            float(year) if year.isdigit() else np.nan,
+        )
+
+    @staticmethod
+    def _raw_columns(batch: TrackBatch) -> np.ndarray:
+        """
+        Build the raw feature matrix straight from a batch's typed columns.
+        """
+        popularity = np.frombuffer(batch.popularity, dtype=np.int16).astype(float)
+        popularity[popularity < 0] = np.nan
+        years = [str(release_date or '')[:4] for release_date in batch.release_dates]
+        return np.column_stack([
+            np.frombuffer(batch.energy, dtype=float),
+            np.frombuffer(batch.tempo, dtype=float),
+            popularity,
+            np.array([float(year) if year.isdigit() else np.nan for year in years]),
+        ]).reshape(-1, len(FEATURES))
+
+    def feature_matrix(self, songs: Union[List[Dict], TrackBatch]) -> np.ndarray:
+        """
+        Build the scaled (n, len(FEATURES)) feature matrix for a list of songs or a TrackBatch.
+        Missing values are filled with the target so they neither help nor hurt.
+        """
+        if isinstance(songs, TrackBatch):
+            matrix = self._raw_columns(songs)
+        else:
+            matrix = np.array([self._raw_row(song) for song in songs], dtype=float).reshape(-1, len(FEATURES))
+        matrix = self._scale(matrix)
+        return np.where(np.isnan(matrix), self.target, matrix)
+
+    def score(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Score a scaled feature matrix in one vectorized pass.
+        Higher is better: closeness to the target minus similarity to recent posts.
+        """
+        fit = 1.0 - np.sqrt(((matrix - self.target) ** 2) @ self.weights)
+        if not len(self.history):
+            return fit
+        # (n, m) weighted distances between candidates and recent posts
+        diff = matrix[:, None, :] - self.history[None, :, :]
+        nearest = np.sqrt((diff ** 2) @ self.weights).min(axis=1)
+        similarity = np.exp(-(nearest / self.diversity_radius) ** 2)
+        return fit - self.diversity_weight * similarity
+
+    def hit_rates(self, songs: Union[List[Dict], TrackBatch]) -> np.ndarray:
+        """
+        Get the expected Genius hit rate of each song from its genre and popularity.
+        """
+        if isinstance(songs, TrackBatch):
+            songs = [{'genre': songs.genre(i), 'popularity': None if songs.popularity[i] < 0 else songs.popularity[i]}
+                     for i in range(len(songs))]
+        return np.array([self.hit_stats.expected(song) for song in songs], dtype=float)
+
+    def rank(self, songs: Union[List[Dict], TrackBatch], limit: Optional[int] = None) -> List[Dict]:
+        """
+        Rank candidate songs by score, dropping tracks that were posted recently.
+        With hit statistics, the weighted expected hit rate is part of the score.
+        For a TrackBatch only the kept tracks are turned into song dicts.
+        """
+        if not len(songs):
+            return []
+        scores = self.score(self.feature_matrix(songs))
+        if self.hit_stats is not None:
+            scores += self.hit_weight * self.hit_rates(songs)
+        recent = set(self.history_ids)
+        ids = songs.ids if isinstance(songs, TrackBatch) else [song.get('id') for song in songs]
+        for i, track_id in enumerate(ids):
+            if track_id and track_id in recent:
+                scores[i] = -np.inf
+        order = np.argsort(-scores, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+        if isinstance(songs, TrackBatch):
+            ranked = [songs[i].to_dict() for i in order if np.isfinite(scores[i])]
+        else:
+            ranked = [songs[i] for i in order if np.isfinite(scores[i])]
+        logger.info("Ranked %s candidates, kept %s", len(songs), len(ranked))
+        return ranked
+
+    def record(self, song: Dict) -> None:
+        """
+        Add a posted song to the recent-history matrix and persist it.
+        """
+        self.history = np.vstack([self.history, self.feature_matrix([song])])[-self.history_size:]
+        self.history_ids = (self.history_ids + [song.get('id') or ''])[-self.history_size:]
+        self._save_history()
+
+    def _load_history(self) -> None:
+        """
+        Load the recent-history matrix from disk, if a history file exists.
+        """
+        if not self.history_path or not os.path.exists(self.history_path):
+            return
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            rows = data.get('features', [])[-self.history_size:]
+            self.history = np.array(rows, dtype=float).reshape(-1, len(FEATURES))
+            self.history_ids = data.get('ids', [])[-self.history_size:]
+        except (OSError, ValueError) as e:
+            logger.warning("Could not load selection history: %s", e)
+
+    def _save_history(self) -> None:
+        """
+        Persist the recent-history matrix to disk.
+        """
+        if not self.history_path:
+            return
+        tmp_path = f"{self.history_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'ids': self.history_ids, 'features': self.history.tolist()}, f)
+        os.replace(tmp_path, self.history_path)
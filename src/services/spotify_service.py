@@ -1,12 +1,29 @@
 import random
 import logging
 from spotipy.exceptions import SpotifyException
+from src.utils.cache import cache_key
+from src.utils.deadline import call_with_timeout
+from src.utils.records import TrackBatch
 
 logger = logging.getLogger(__name__)
 
+# Spotify search does not page past this offset
+MAX_SEARCH_OFFSET = 1000
+
 class SpotifyService:
-    def __init__(self, sp_client):
+    # Seconds a single Spotify call may take when the run deadline leaves more
+    REQUEST_TIMEOUT = 10
+
+    def __init__(self, sp_client, cache=None, hit_stats=None, rng=None):
+        """
+        Initialize the Spotify service. Candidate pages are kept in the cache, if given.
+        With hit_stats, genres and candidates are weighted by their observed Genius hit rates.
+        Genres and tracks are picked with rng, a random.Random, so a seeded one repeats a run.
+        """
         self.sp = sp_client
+        self.cache = cache
+        self.hit_stats = hit_stats
+        self.random = rng or random.Random()
         self.genres = [
             'rock', 'pop', 'hip-hop', 'jazz', 'classical',
             'electronic', 'folk', 'country', 'blues', 'metal'
@@ -21,21 +38,29 @@ class SpotifyService:
         try:
             # Try a simple API call to test the connection
             logger.info("Testing Spotify connection...")
-            logger.info(f"Using client ID: {self.sp._auth_manager.client_id}")
+            logger.info("Using client ID: %s", self.sp._auth_manager.client_id)
             results = self.sp.search('test', limit=1)
             logger.info("Successfully connected to Spotify API")
         except SpotifyException as e:
             if e.http_status == 403:
-                logger.error(f"Spotify API authentication failed. Status: {e.http_status}, Message: {e.msg}")
+                logger.error("Spotify API authentication failed. Status: %s, Message: %s", e.http_status, e.msg)
                 raise Exception(f"Spotify API authentication failed. Status: {e.http_status}, Message: {e.msg}")
             else:
-                logger.error(f"Error connecting to Spotify API: {e}")
+                logger.error("Error connecting to Spotify API: %s", e)
                 raise
         except Exception as e:
-            logger.error(f"Unexpected error testing Spotify connection: {e}")
+            logger.error("Unexpected error testing Spotify connection: %s", e)
             raise
 
-    def get_random_song(self):
+    def _call(self, func, *args, deadline=None, **kwargs):
+        """
+        Make a Spotify call bounded by the run deadline. The client only has a fixed
+        timeout per request and retries on its own, so the call is abandoned instead.
+        """
+        timeout = deadline.timeout(cap=self.REQUEST_TIMEOUT) if deadline else None
+        return call_with_timeout(func, timeout, *args, **kwargs)
+
+    def get_random_song(self, deadline=None):
         """
         Get a random song from Spotify using their API.
         Raises:
@@ -43,29 +68,29 @@ class SpotifyService:
         """
         try:
             # Select a random genre
-            genre = random.choice(self.genres)
-            logger.info(f"Searching for songs in genre: {genre}")
+            genre = self.pick_genre()
+            logger.info("Searching for songs in genre: %s", genre)
             
             # Search for tracks in the selected genre
-            results = self.sp.search(q=f'genre:{genre}', type='track', limit=50)
+            results = self._call(self.sp.search, q=f'genre:{genre}', type='track', limit=50, deadline=deadline)
             
             if not results['tracks']['items']:
                 raise Exception(f"No tracks found for genre: {genre}")
             
             # Select a random track from the results
-            track = random.choice(results['tracks']['items'])
-            logger.info(f"Selected track: {track['name']} by {track['artists'][0]['name']}")
+            track = self.random.choice(results['tracks']['items'])
+            logger.info("Selected track: %s by %s", track['name'], track['artists'][0]['name'])
             
             return self._format_song_info(track)
         except SpotifyException as e:
             if e.http_status == 403:
-                logger.error(f"Spotify API authentication failed. Status: {e.http_status}, Message: {e.msg}")
+                logger.error("Spotify API authentication failed. Status: %s, Message: %s", e.http_status, e.msg)
                 raise Exception(f"Spotify API authentication failed. Status: {e.http_status}, Message: {e.msg}")
             else:
-                logger.error(f"Error fetching song from Spotify: {e}")
+                logger.error("Error fetching song from Spotify: %s", e)
                 raise
         except Exception as e:
-            logger.error(f"Error fetching song from Spotify: {e}")
+            logger.error("Error fetching song from Spotify: %s", e)
             raise
 
     def _format_song_info(self, track):
@@ -74,21 +99,107 @@ class SpotifyService:
         """
         try:
             return {
+                'id': track.get('id'),
                 'name': track['name'],
                 'artist': track['artists'][0]['name'],
                 'album': track['album']['name'],
                 'release_date': track['album']['release_date'],
                 'spotify_url': track['external_urls']['spotify'],
                 'popularity': track['popularity'],
-                'duration_ms': track['duration_ms']
+                'duration_ms': track['duration_ms'],
+                # Album art, largest first
+                'image_url': (track['album'].get('images') or [{}])[0].get('url')
             }
         except Exception as e:
-            logger.error(f"Error formatting song info: {e}")
+            logger.error("Error formatting song info: %s", e)
             raise
 
-    def get_multiple_songs(self):
+    def pick_genre(self) -> str:
+        """
+        Pick a random genre, weighted by the observed Genius hit rate when available.
+        """
+        if self.hit_stats is None:
+            return self.random.choice(self.genres)
+        weights = [self.hit_stats.genre_rate(genre) for genre in self.genres]
+        return self.random.choices(self.genres, weights=weights)[0]
+
+    def order_by_hit_rate(self, songs):
+        """
+        Order songs by their expected chance of having a Genius entry, best first.
+        The order is stable, so earlier ranking breaks ties.
+        """
+        if self.hit_stats is None:
+            return list(songs)
+        return sorted(songs, key=self.hit_stats.expected, reverse=True)
+
+    def get_candidate_songs(self, limit: int = 50, genre: str = None, offset: int = 0, deadline=None):
+        """
+        Get a page of candidate songs for a genre, with audio features attached.
+        A random genre is used when none is given.
+        Raises:
+            Exception: If there's an error fetching the songs from Spotify
+        """
+        return self.get_candidate_batch(limit=limit, genre=genre, offset=offset, deadline=deadline).to_dicts()
+
+    def get_candidate_batch(self, limit: int = 50, genre: str = None, offset: int = 0,
+                            deadline=None) -> TrackBatch:
+        """
+        Get a page of candidate songs as a columnar TrackBatch, for code holding large pools.
+        Raises:
+            Exception: If there's an error fetching the songs from Spotify
+        """
+        genre = genre or self.pick_genre()
+        key = cache_key('candidates', genre, offset, limit)
+        if self.cache is not None:
+            payload = self.cache.get(key)
+            if payload:
+                try:
+                    return TrackBatch.from_payload(payload)
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    # Written by an older version, fetch the page again
+                    pass
+        logger.info("Searching for candidate songs in genre: %s (offset %s)", genre, offset)
+
+        results = self._call(self.sp.search, q=f'genre:{genre}', type='track', limit=limit, offset=offset,
+                             deadline=deadline)
+        tracks = results['tracks']['items']
+        if not tracks:
+            raise Exception(f"No tracks found for genre: {genre}")
+
+        songs = [self._format_song_info(track) for track in tracks]
+        for song in songs:
+            song['genre'] = genre
+        self._attach_features(songs, deadline)
+        batch = TrackBatch.from_dicts(songs)
+        if self.cache is not None:
+            self.cache.set(key, batch.to_payload())
+        return batch
+
+    def _attach_features(self, songs, deadline=None):
+        """
+        Attach audio features to songs in batches of 100 (the API maximum).
+        Songs keep an empty features dict when features are unavailable or out of time.
+        """
+        for song in songs:
+            song['features'] = {}
+        ids = [song['id'] for song in songs if song.get('id')]
+        if not ids:
+            return
+        by_id = {}
+        try:
+            for start in range(0, len(ids), 100):
+                for features in self._call(self.sp.audio_features, ids[start:start + 100], deadline=deadline) or []:
+                    if features:
+                        by_id[features['id']] = features
+        except Exception as e:
+            logger.warning("Audio features unavailable, ranking without them: %s", e)
+            return
+        for song in songs:
+            song['features'] = by_id.get(song.get('id'), {})
+
+    def get_multiple_songs(self, deadline=None):
         """
         Get multiple songs from Spotify. Currently returns a list with one random song.
         """
-        song = self.get_random_song()
+        song = self.get_random_song(deadline)
         return [song] 
\ No newline at end of file
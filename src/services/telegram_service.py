@@ -1,21 +1,77 @@
 import logging
 import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import requests
 from telegram import Bot
-from telegram.error import TelegramError
-from typing import Dict
+from telegram.error import BadRequest, TelegramError
+from typing import Dict, Optional
+from src.utils.cache import DAY
 from src.utils.config import TELEGRAM_CHANNEL_ID
+from src.utils.deadline import Deadline
 
 logger = logging.getLogger(__name__)
 
 class TelegramService:
-    def __init__(self, bot_token: str, channel_id: str):
+    # Seconds a single Telegram request may take
+    REQUEST_TIMEOUT = 20
+    # Seconds downloading album art may take
+    IMAGE_TIMEOUT = 10
+    # Longest photo caption Telegram accepts
+    CAPTION_LIMIT = 1024
+    # Telegram file_ids do not expire, uploaded album art is reused for a year
+    FILE_TTL = 365 * DAY
+    # Fragments of the errors Telegram gives for a file_id it no longer accepts
+    FILE_ID_ERRORS = ('file identifier', 'file_id')
+    # Errors showing a photo was not posted, so the text may be sent on its own
+    PHOTO_ERRORS = (BadRequest, requests.RequestException, FutureTimeoutError)
+
+    def __init__(self, bot_token: str, channel_id: str, file_cache=None, session=requests):
         """
         Initialize the Telegram service with bot token and channel ID.
+        Uploaded photos are remembered in the file cache, if given, as image URL → Telegram file_id,
+        so later posts of the same image reference it instead of uploading it again.
+        The session (anything with a requests-style get) downloads the images.
         """
         self.bot = Bot(token=bot_token)
         self.channel_id = channel_id
-        
-    async def _send_message(self, text: str) -> None:
+        self.file_cache = file_cache
+        self.session = session
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='telegram-images')
+        self._prefetched: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Get the loop running the sends. It lives in its own thread for the service's
+        lifetime, since the bot's HTTP client is bound to the loop it first ran on.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='telegram-async', daemon=True).start()
+            return self._loop
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._event_loop()).result()
+
+    def _timeouts(self, deadline: Optional[Deadline]) -> Dict:
+        """
+        Get the request timeouts bounded by the run deadline, or none to use the bot's defaults.
+        """
+        if deadline is None:
+            return {}
+        timeout = deadline.timeout(cap=self.REQUEST_TIMEOUT)
+        return {
+            'connect_timeout': timeout,
+            'pool_timeout': timeout,
+            'read_timeout': timeout,
+            'write_timeout': timeout
+        }
+
+    async def _send_message(self, text: str, deadline: Optional[Deadline] = None) -> None:
         """
         Send a message to the Telegram channel.
         """
@@ -23,18 +79,95 @@ class TelegramService:
             await self.bot.send_message(
                 chat_id=self.channel_id,
                 text=text,
-                parse_mode='HTML'
+                parse_mode='HTML',
+                **self._timeouts(deadline)
             )
             logger.info("Message sent successfully to Telegram")
         except TelegramError as e:
-            logger.error(f"Error sending message to Telegram: {e}")
+            logger.error("Error sending message to Telegram: %s", e)
             raise
-            
-    def send_message(self, text: str) -> None:
+
+    def file_id(self, image_url: Optional[str]) -> Optional[str]:
+        """
+        Get the Telegram file_id of an already uploaded image, if known.
+        """
+        if not image_url or self.file_cache is None:
+            return None
+        return self.file_cache.get(image_url)
+
+    def prefetch_image(self, image_url: Optional[str]) -> None:
+        """
+        Start downloading an image in the background, unless it was uploaded before.
+        Call it before slow stages so the bytes are ready when the post is sent.
+        """
+        if not image_url or self.file_id(image_url):
+            return
+        with self._lock:
+            if image_url not in self._prefetched:
+                self._prefetched[image_url] = self._executor.submit(self._download, image_url)
+
+    def _download(self, image_url: str) -> bytes:
+        response = self.session.get(image_url, timeout=self.IMAGE_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+
+    def _image_bytes(self, image_url: str, deadline: Optional[Deadline]) -> bytes:
+        """
+        Get an image's bytes, from its prefetch if one was started.
+        """
+        with self._lock:
+            future = self._prefetched.pop(image_url, None)
+        if future is None:
+            future = self._executor.submit(self._download, image_url)
+        timeout = deadline.timeout(cap=self.IMAGE_TIMEOUT) if deadline else self.IMAGE_TIMEOUT
+        return future.result(timeout=timeout)
+
+    async def _send_photo(self, image_url: str, caption: Optional[str], deadline: Optional[Deadline] = None) -> None:
+        """
+        Send a photo to the Telegram channel, by file_id when the image was uploaded before.
+        """
+        timeouts = self._timeouts(deadline)
+        file_id = self.file_id(image_url)
+        if file_id:
+            try:
+                await self.bot.send_photo(chat_id=self.channel_id, photo=file_id, caption=caption,
+                                          parse_mode='HTML', **timeouts)
+                logger.info("Photo sent to Telegram by file_id")
+                return
+            except BadRequest as e:
+                # Other rejections, such as of the caption, would fail the upload just the same
+                if not any(fragment in str(e).lower() for fragment in self.FILE_ID_ERRORS):
+                    raise
+                logger.warning("Cached file_id rejected, uploading the image again: %s", e)
+                self.file_cache.delete(image_url)
+        photo = await asyncio.to_thread(self._image_bytes, image_url, deadline)
+        message = await self.bot.send_photo(chat_id=self.channel_id, photo=photo, caption=caption,
+                                            parse_mode='HTML', **self._timeouts(deadline))
+        if self.file_cache is not None and message.photo:
+            # The largest size comes last
+            self.file_cache.set(image_url, message.photo[-1].file_id)
+        logger.info("Photo uploaded to Telegram")
+
+    async def _send_post(self, text: str, image_url: str, deadline: Optional[Deadline] = None) -> None:
+        """
+        Send a post with its image. Text too long for a caption follows the photo as a message.
+        When the image cannot be downloaded or Telegram rejects it, only the text is sent.
+        Other errors, such as a timeout after which the photo may have arrived, are raised.
+        """
+        fits = len(text) <= self.CAPTION_LIMIT
+        try:
+            await self._send_photo(image_url, text if fits else None, deadline)
+            if fits:
+                return
+        except self.PHOTO_ERRORS as e:
+            logger.warning("Could not send album art, posting text only: %s", e)
+        await self._send_message(text, deadline)
+
+    def send_message(self, text: str, deadline: Optional[Deadline] = None) -> None:
         """
         Send a message to the Telegram channel synchronously.
         """
-        asyncio.run(self._send_message(text))
+        self._run(self._send_message(text, deadline))
         
     def send_error_message(self, error_message: str) -> None:
         """
@@ -43,12 +176,11 @@ class TelegramService:
         message = f"❌ Error in Daily Song Bot:\n\n{error_message}"
         self.send_message(message)
         
-    def send_song_info(self, song: Dict, genius_info: Dict, summary: str) -> None:
+    def format_song_message(self, song: Dict, genius_info: Dict, summary: str, title: str = "Today's Song") -> str:
         """
-        Send song information to the Telegram channel.
+        Format the message with song info and summary.
         """
-        # Format the message with song info and summary
-        message = f"""🎵 <b>Today's Song</b>
+        return f"""🎵 <b>{title}</b>
 
 <b>{song['name']}</b> by <b>{song['artist']}</b>
 
@@ -59,4 +191,12 @@ class TelegramService:
 🔗 <a href="{genius_info.get('genius_url', '')}">View on Genius</a>
 🎧 <a href="{song.get('spotify_url', '')}">Listen on Spotify</a>"""
 
-        self.send_message(message) 
\ No newline at end of file
+    def send_song_info(self, song: Dict, genius_info: Dict, summary: str, deadline: Optional[Deadline] = None) -> None:
+        """
+        Send song information to the Telegram channel, with the album art when the song has one.
+        """
+        message = self.format_song_message(song, genius_info, summary)
+        if song.get('image_url'):
+            self._run(self._send_post(message, song['image_url'], deadline))
+        else:
+            self.send_message(message, deadline)
@@ -0,0 +1,79 @@
+import logging
+import re
+from typing import Dict, Optional
+from urllib.parse import quote
+
+import requests
+from bs4 import BeautifulSoup
+
+from src.utils.cache import DAY, cache_key
+from src.utils.deadline import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+class WikipediaService:
+    # Seconds a single Wikipedia request may take
+    REQUEST_TIMEOUT = 5
+    # Artists without an article are remembered for a shorter time than found ones
+    MISS_TTL = DAY
+
+    def __init__(self, session=requests, cache=None):
+        """
+        Initialize the Wikipedia service.
+        The session (anything with a requests-style get) defaults to the requests module.
+        Lookups are kept in the cache, if given, including artists that were not found.
+        """
+        self.session = session
+        self.cache = cache
+        self.base_url = "https://en.wikipedia.org/wiki"
+        self.headers = {"User-Agent": "OneSongEachDay/1.0"}
+
+    def get_artist_info(self, artist_name: str, deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """
+        Get the lead paragraph of an artist's Wikipedia article.
+        Returns a dict with 'artist_bio' and 'wikipedia_url', or None if not found or on error.
+        Raises:
+            DeadlineExceeded: If the run deadline leaves no time for a request
+        """
+        key = cache_key(artist_name)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached or None
+        info = self._fetch_artist_info(artist_name, deadline)
+        if self.cache is not None and info is not False:
+            self.cache.set(key, info or {}, ttl=None if info else self.MISS_TTL)
+        return info or None
+
+    def _fetch_artist_info(self, artist_name: str, deadline: Optional[Deadline]):
+        """
+        Scrape the first non-empty paragraph of the artist's article.
+        Returns the info dict, None if there is no article, or False if the lookup failed.
+        """
+        try:
+            url = f"{self.base_url}/{quote(artist_name.replace(' ', '_'))}"
+            timeout = deadline.timeout(cap=self.REQUEST_TIMEOUT) if deadline else self.REQUEST_TIMEOUT
+            response = self.session.get(url, headers=self.headers, timeout=timeout)
+            if response.status_code == 404:
+                logger.warning("No Wikipedia article found for %s", artist_name)
+                return None
+            response.raise_for_status()
+
+            soup = BeautifulSoup(response.text, 'html.parser')
+            content = soup.find('div', {'class': 'mw-parser-output'})
+            if content:
+                for paragraph in content.find_all('p'):
+                    # Drop citation markers like [1]
+                    text = re.sub(r'\[\d+\]', '', paragraph.text).strip()
+                    if text:
+                        return {'artist_bio': text, 'wikipedia_url': url}
+            return None
+
+        except DeadlineExceeded:
+            raise
+        except requests.exceptions.RequestException as e:
+            logger.error("Error fetching artist info from Wikipedia: %s", e)
+            return False
+        except Exception as e:
+            logger.error("Unexpected error in Wikipedia service: %s", e)
+            return False
@@ -0,0 +1,186 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Version of the bundle layout, bumped when it changes
+BUNDLE_VERSION = 1
+
+# Local stores a bundle carries: name -> (file in the data directory, whether it is a SQLite database).
+# Run checkpoints and broadcast progress belong to the node that made them and are left out.
+BUNDLE_STORES = {
+    # Spotify pages, Genius songs and artists, Wikipedia, summaries and Telegram file_ids
+    'cache': ('cache.sqlite3', True),
+    'index': ('index.sqlite3', True),
+    'ledger': ('ledger.sqlite3', True),
+    'hit_stats': ('hit_stats.json', False),
+    'selection': ('selection_history.json', False),
+    'subscribers': ('subscribers.sqlite3', True),
+}
+
+MANIFEST = 'manifest.json'
+
+
+def _select(stores: Optional[Iterable[str]]) -> List[str]:
+    if stores is None:
+        return list(BUNDLE_STORES)
+    names = list(stores)
+    unknown = [name for name in names if name not in BUNDLE_STORES]
+    if unknown:
+        raise ValueError(f"Unknown stores: {', '.join(unknown)}")
+    return names
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _snapshot(source: str, target: str) -> None:
+    """
+    Copy a SQLite database consistently while it may be in use, including its WAL,
+    leaving out expired cache entries.
+    """
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target, isolation_level=None)
+    try:
+        src.backup(dst)
+        if dst.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cache'").fetchone():
+            dst.execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+        # A self-contained file, without a WAL that would have to travel with it
+        dst.execute('PRAGMA journal_mode=DELETE')
+        dst.execute('VACUUM')
+    finally:
+        dst.close()
+        src.close()
+
+
+def export_bundle(path: str, data_dir: str, stores: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Write the local stores to a gzipped tar archive with a manifest of their checksums.
+    Stores that do not exist yet are skipped. The archive is written next to `path`
+    and renamed into place, so a failed export leaves no partial archive.
+
+    Args:
+        path: Archive file to write
+        data_dir: Directory holding the stores
+        stores: Names from BUNDLE_STORES to include, all by default
+
+    Returns:
+        The manifest: version, creation time and per store its file, size and SHA-256
+    """
+    manifest = {'version': BUNDLE_VERSION, 'created': time.time(), 'stores': {}}
+    with tempfile.TemporaryDirectory() as staging:
+        for name in _select(stores):
+            filename, is_database = BUNDLE_STORES[name]
+            source = os.path.join(data_dir, filename)
+            if not os.path.exists(source):
+                continue
+            copy = os.path.join(staging, filename)
+            if is_database:
+                _snapshot(source, copy)
+            else:
+                shutil.copyfile(source, copy)
+            manifest['stores'][name] = {'file': filename, 'size': os.path.getsize(copy), 'sha256': _sha256(copy)}
+
+        tmp_path = f"{path}.tmp"
+        with tarfile.open(tmp_path, 'w:gz') as tar:
+            data = json.dumps(manifest, indent=2).encode('utf-8')
+            info = tarfile.TarInfo(MANIFEST)
+            info.size = len(data)
+            info.mtime = int(manifest['created'])
+            tar.addfile(info, io.BytesIO(data))
+            for entry in manifest['stores'].values():
+                tar.add(os.path.join(staging, entry['file']), arcname=f"stores/{entry['file']}")
+        os.replace(tmp_path, path)
+    logger.info("Exported %s to %s", ', '.join(manifest['stores']) or 'nothing', path)
+    return manifest
+
+
+def read_manifest(path: str) -> Dict:
+    """
+    Read a bundle's manifest.
+    Raises:
+        ValueError: If the file is not a bundle or was written by an incompatible version
+    """
+    try:
+        with tarfile.open(path, 'r:*') as tar:
+            manifest = json.load(tar.extractfile(MANIFEST))
+    except (tarfile.TarError, KeyError, ValueError) as e:
+        raise ValueError(f"Not a cache bundle: {path} ({e})")
+    if manifest.get('version') != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported bundle version: {manifest.get('version')}")
+    return manifest
+
+
+def import_bundle(path: str, data_dir: str, stores: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Restore stores from a bundle, replacing the local ones. Every selected store is
+    extracted and checked against its checksum before any is replaced, and each is
+    then swapped in with an atomic rename. Stores must not be open in a running bot.
+
+    Args:
+        path: Archive written by export_bundle
+        data_dir: Directory holding the stores
+        stores: Names of the stores to restore, all the bundle has by default
+
+    Returns:
+        The names of the restored stores
+    Raises:
+        ValueError: If the bundle is unreadable, incompatible, lacks a requested store
+                    or a store does not match its checksum. Nothing is replaced then.
+    """
+    manifest = read_manifest(path)
+    names = list(manifest['stores']) if stores is None else _select(stores)
+    missing = [name for name in names if name not in manifest['stores']]
+    if missing:
+        raise ValueError(f"Stores not in bundle: {', '.join(missing)}")
+
+    os.makedirs(data_dir, exist_ok=True)
+    staged: Dict[str, str] = {}
+    try:
+        with tarfile.open(path, 'r:*') as tar:
+            for name in names:
+                entry = manifest['stores'][name]
+                # Only known file names are written, whatever the archive claims
+                if name not in BUNDLE_STORES or entry['file'] != BUNDLE_STORES[name][0]:
+                    raise ValueError(f"Unexpected store in bundle: {name}")
+                tmp_path = staged[name] = os.path.join(data_dir, f".{entry['file']}.import")
+                try:
+                    member = tar.extractfile(f"stores/{entry['file']}")
+                except KeyError:
+                    raise ValueError(f"Store {name} is listed but missing from the bundle")
+                digest = hashlib.sha256()
+                with open(tmp_path, 'wb') as f:
+                    for chunk in iter(lambda: member.read(1 << 16), b''):
+                        digest.update(chunk)
+                        f.write(chunk)
+                if digest.hexdigest() != entry['sha256']:
+                    raise ValueError(f"Checksum mismatch for store {name}")
+
+        for name, tmp_path in list(staged.items()):
+            target = os.path.join(data_dir, BUNDLE_STORES[name][0])
+            # A leftover WAL would be replayed into the restored database
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(target + suffix):
+                    os.remove(target + suffix)
+            os.replace(tmp_path, target)
+            del staged[name]
+    finally:
+        for tmp_path in staged.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    logger.info("Imported %s from %s", ', '.join(names) or 'nothing', path)
+    return names
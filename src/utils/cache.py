@@ -0,0 +1,96 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Common TTLs in seconds
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+def cache_key(*parts: Any) -> str:
+    """
+    Build a normalized cache key, so lookups that differ only in case or spacing share an entry.
+    """
+    return '|'.join(re.sub(r'\s+', ' ', str(part)).strip().lower() for part in parts)
+
+
+class Cache:
+    """
+    Persistent key-value cache with per-entry TTL, backed by a SQLite file.
+    Several caches can share one file under different namespaces. Values must be JSON-serializable.
+    """
+    def __init__(self, path: str, namespace: str, ttl: float = DAY):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite database file, or ':memory:'
+            namespace: Name separating this cache's entries from others in the same file
+            ttl: Default time to live of an entry in seconds
+        """
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL, '
+            'PRIMARY KEY (namespace, key))'
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get a cached value, or default if it is missing or expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires FROM cache WHERE namespace = ? AND key = ?',
+                (self.namespace, key)
+            ).fetchone()
+            if row is None or row[1] < time.time():
+                self.misses += 1
+                return default
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, replacing any existing entry.
+        """
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)',
+                (self.namespace, key, data, expires)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (self.namespace, key))
+
+    def prune(self) -> int:
+        """
+        Remove expired entries of this namespace. Returns the number removed.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM cache WHERE namespace = ? AND expires < ?', (self.namespace, time.time())
+            )
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM cache WHERE namespace = ?', (self.namespace,)
+            ).fetchone()[0]
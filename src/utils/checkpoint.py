@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import re
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in the order they complete
+STAGES = ('track', 'genius', 'summary', 'sent')
+
+
+class RunCheckpoint:
+    """
+    Stage results of a single pipeline run, persisted after every completed stage.
+    """
+    def __init__(self, run_id: str, path: str):
+        self.run_id = run_id
+        self.path = path
+        self.stages: Dict[str, Any] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.stages = json.load(f)
+                logger.info("Resuming run %s after stage: %s", run_id, self.last_stage())
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable checkpoint for run %s: %s", run_id, e)
+
+    def get(self, stage: str, default: Any = None) -> Any:
+        """
+        Get the saved result of a stage, or default if the stage has not completed.
+        """
+        return self.stages.get(stage, default)
+
+    def completed(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def last_stage(self) -> str:
+        """
+        Get the name of the last completed stage, or None for a fresh run.
+        """
+        done = [stage for stage in STAGES if stage in self.stages]
+        return done[-1] if done else None
+
+    def save(self, stage: str, value: Any) -> None:
+        """
+        Record a stage result. Saving the same stage again overwrites it.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+        self.stages[stage] = value
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.stages, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def begin(self, song: Dict) -> None:
+        """
+        Mark the song this run is working on. Results of later stages are kept only
+        if they belong to the same song, so switching candidates starts them over.
+        """
+        track = self.stages.get('track')
+        if track and self._song_key(track) == self._song_key(song):
+            return
+        self.stages = {}
+        self.save('track', song)
+
+    @staticmethod
+    def _song_key(song: Dict) -> tuple:
+        return (song.get('id'), song.get('name'), song.get('artist'))
+
+
+class CheckpointStore:
+    """
+    Directory of run checkpoints, one JSON file per run ID.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def run(self, run_id: str) -> RunCheckpoint:
+        """
+        Open the checkpoint of a run, creating an empty one if it does not exist.
+        """
+        filename = re.sub(r'[^A-Za-z0-9_.-]', '_', run_id)
+        return RunCheckpoint(run_id, os.path.join(self.directory, f"{filename}.json"))
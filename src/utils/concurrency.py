@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+from weakref import WeakKeyDictionary
+
+from src.utils.deadline import DeadlineExceeded
+
+# Default number of concurrent calls allowed per pipeline stage
+DEFAULT_STAGE_LIMITS = {
+    'spotify': 2,
+    'genius': 4,
+    'gemini': 2,
+    'telegram': 1
+}
+
+class StageLimiter:
+    """
+    Caps how many calls may be in flight at once for each pipeline stage.
+    """
+    def __init__(self, limits: Optional[Dict[str, int]] = None, default: int = 4):
+        """
+        Initialize the limiter.
+        
+        Args:
+            limits: Maximum concurrent calls per stage name
+            default: Limit used for stages that are not listed
+        """
+        self.limits = {**DEFAULT_STAGE_LIMITS, **(limits or {})}
+        self.default = default
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        # Per event loop, since asyncio semaphores belong to the loop they are used on
+        self._async_semaphores = WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _semaphore(self, name: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if name not in self._semaphores:
+                self._semaphores[name] = threading.BoundedSemaphore(self.limits.get(name, self.default))
+            return self._semaphores[name]
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Hold one of the stage's slots for the duration of the block.
+        """
+        semaphore = self._semaphore(name)
+        with semaphore:
+            yield
+
+    @asynccontextmanager
+    async def async_stage(self, name: str):
+        """
+        Hold one of the stage's slots for the duration of the block, waiting on the event loop
+        instead of in a thread. Async slots are counted apart from the threaded ones.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._async_semaphores.setdefault(loop, {})
+            if name not in semaphores:
+                semaphores[name] = asyncio.Semaphore(self.limits.get(name, self.default))
+            semaphore = semaphores[name]
+        async with semaphore:
+            yield
+
+class AsyncRateLimiter:
+    """
+    Paces async callers to a global rate, for APIs with a per-second message limit.
+    """
+    def __init__(self, rate: float, clock=time.monotonic):
+        """
+        Initialize the limiter.
+        
+        Args:
+            rate: Maximum calls per second across all callers
+            clock: Monotonic clock, replaceable in tests
+        """
+        self.interval = 1.0 / rate
+        self.clock = clock
+        self._next = clock()
+        self._paused_until = 0.0
+
+    async def acquire(self) -> None:
+        """
+        Wait for the next free slot. Slots are claimed without awaiting, so no lock is needed.
+        A caller whose slot falls inside a pause started while it waited claims a new one.
+        """
+        while True:
+            now = self.clock()
+            slot = max(self._next, now, self._paused_until)
+            self._next = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            if self.clock() >= self._paused_until:
+                return
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every caller for `seconds`, e.g. after the API asked to retry later.
+        """
+        self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the call,
+    callers arriving while it is in flight wait for it and share its result or error.
+    """
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.saved = 0
+
+    def do(self, key: str, func, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Run func(*args, **kwargs) unless a call with the same key is already in flight.
+        A caller waiting for another's call gives up after its own `timeout` seconds with
+        TimeoutError. If the call it waited for ran out of its caller's run deadline, it
+        makes the call itself rather than sharing that error.
+        """
+        expires = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.calls += 1
+                else:
+                    self.saved += 1
+            if leader:
+                break
+            wait = max(0.0, expires - time.monotonic()) if expires is not None else None
+            if not flight.done.wait(wait):
+                raise TimeoutError(f"Gave up waiting for in-flight call {key} after {timeout:.1f}s")
+            if isinstance(flight.error, DeadlineExceeded):
+                # Nothing was shared, the caller is counted again by the attempt it makes next
+                with self._lock:
+                    self.saved -= 1
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = func(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the number of calls made and the number saved by sharing an in-flight call.
+        Every caller counts once, as a call or as saved.
+        """
+        with self._lock:
+            return {'calls': self.calls, 'saved': self.saved, 'in_flight': len(self._flights)}
@@ -9,11 +9,6 @@ from telegram import Bot
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 class Config:
@@ -52,6 +47,24 @@ GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 SPOTIFY_CLIENT_ID = os.getenv('SPOTIFY_CLIENT_ID')
 SPOTIFY_CLIENT_SECRET = os.getenv('SPOTIFY_CLIENT_SECRET')
 
+# Directory holding the bot's local stores (history, caches, checkpoints)
+DATA_DIR = os.getenv('JUKA_DATA_DIR', '.juka')
+
+def data_dir() -> str:
+    """
+    Get the data directory, creating it on first use.
+    """
+    path = os.getenv('JUKA_DATA_DIR', DATA_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def data_path(name: str) -> str:
+    """
+    Get the path of a local store file inside the data directory.
+    The directory is created on first use.
+    """
+    return os.path.join(data_dir(), name)
+
 def init_services():
     """
     Initialize all required services with proper error handling.
@@ -71,7 +84,7 @@ def init_services():
         services['spotify'] = sp
         logger.info("Spotify client initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize Spotify client: {e}")
+        logger.error("Failed to initialize Spotify client: %s", e)
         raise
     
     # Initialize Gemini
@@ -84,7 +97,7 @@ def init_services():
         services['gemini'] = model
         logger.info("Gemini model initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize Gemini model: {e}")
+        logger.error("Failed to initialize Gemini model: %s", e)
         raise
     
     # Initialize Telegram bot
@@ -96,7 +109,7 @@ def init_services():
         services['telegram'] = bot
         logger.info("Telegram bot initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize Telegram bot: {e}")
+        logger.error("Failed to initialize Telegram bot: %s", e)
         raise
     
     return services 
\ No newline at end of file
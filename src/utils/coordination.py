@@ -0,0 +1,314 @@
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseBackend(ABC):
+    """
+    Storage of named leases shared by the replicas. A lease is granted to one owner
+    until it expires or is released, and a completed lease is never granted again.
+    Every grant gets a higher token, so a holder that lost its lease cannot renew it.
+    """
+    @abstractmethod
+    def acquire(self, name: str, owner: str, ttl: float) -> Optional[int]:
+        """
+        Take the lease for `ttl` seconds. Returns its token, or None if another owner
+        holds it or it is completed.
+        """
+
+    @abstractmethod
+    def renew(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        """
+        Extend a held lease by `ttl` seconds from now. Returns False if it was lost.
+        """
+
+    @abstractmethod
+    def release(self, name: str, owner: str, token: int) -> None:
+        """
+        Give up a held lease so another owner can take it straight away.
+        """
+
+    @abstractmethod
+    def complete(self, name: str, owner: str, token: int) -> bool:
+        """
+        Mark the work behind a held lease as done. Returns False if the lease was lost.
+        """
+
+    @abstractmethod
+    def state(self, name: str) -> Optional[Dict]:
+        """
+        Get the lease's owner, token, expiry and whether it is done, or None if it was never taken.
+        """
+
+
+def _grantable(row: Optional[tuple], owner: str, now: float) -> bool:
+    # Rows are (owner, token, expires, done)
+    if row is None:
+        return True
+    return not row[3] and (row[0] == owner or row[2] <= now)
+
+
+class LocalLeaseBackend(LeaseBackend):
+    """
+    In-process stand-in for a shared backend, for single-host runs and tests.
+    """
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._leases: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, name: str, owner: str, ttl: float) -> Optional[int]:
+        with self._lock:
+            now = self.clock()
+            row = self._leases.get(name)
+            if not _grantable(row, owner, now):
+                return None
+            token = (row[1] if row else 0) + 1
+            self._leases[name] = [owner, token, now + ttl, False]
+            return token
+
+    def _held(self, name: str, owner: str, token: int) -> Optional[list]:
+        row = self._leases.get(name)
+        if row is None or row[0] != owner or row[1] != token or row[3]:
+            return None
+        return row
+
+    def renew(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        with self._lock:
+            row = self._held(name, owner, token)
+            if row is not None:
+                row[2] = self.clock() + ttl
+            return row is not None
+
+    def release(self, name: str, owner: str, token: int) -> None:
+        with self._lock:
+            row = self._held(name, owner, token)
+            if row is not None:
+                row[2] = 0.0
+
+    def complete(self, name: str, owner: str, token: int) -> bool:
+        with self._lock:
+            row = self._held(name, owner, token)
+            if row is not None:
+                row[3] = True
+            return row is not None
+
+    def state(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._leases.get(name)
+        if row is None:
+            return None
+        return {'owner': row[0], 'token': row[1], 'expires': row[2], 'done': bool(row[3])}
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """
+    Leases in a SQLite file every replica can open, e.g. on a shared volume.
+    Expiry uses wall-clock time, so replicas' clocks must agree to well within the TTL.
+    """
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        """
+        Initialize the backend.
+
+        Args:
+            path: SQLite database file shared by the replicas
+            clock: Wall clock, replaceable in tests
+        """
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        # The default rollback journal rather than WAL, which needs memory shared between hosts
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS leases ('
+            'name TEXT PRIMARY KEY, owner TEXT NOT NULL, token INTEGER NOT NULL, '
+            'expires REAL NOT NULL, done INTEGER NOT NULL DEFAULT 0)'
+        )
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            # Take the write lock up front, so two replicas cannot both see a lease as free
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def acquire(self, name: str, owner: str, ttl: float) -> Optional[int]:
+        with self._transaction() as conn:
+            now = self.clock()
+            row = conn.execute('SELECT owner, token, expires, done FROM leases WHERE name = ?', (name,)).fetchone()
+            if not _grantable(row, owner, now):
+                return None
+            token = (row[1] if row else 0) + 1
+            conn.execute('INSERT OR REPLACE INTO leases (name, owner, token, expires, done) VALUES (?, ?, ?, ?, 0)',
+                         (name, owner, token, now + ttl))
+            return token
+
+    def _update(self, assignment: str, values: tuple, name: str, owner: str, token: int) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f'UPDATE leases SET {assignment} WHERE name = ? AND owner = ? AND token = ? AND done = 0',
+                values + (name, owner, token)
+            )
+            return cursor.rowcount == 1
+
+    def renew(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        return self._update('expires = ?', (self.clock() + ttl,), name, owner, token)
+
+    def release(self, name: str, owner: str, token: int) -> None:
+        self._update('expires = 0', (), name, owner, token)
+
+    def complete(self, name: str, owner: str, token: int) -> bool:
+        return self._update('done = 1', (), name, owner, token)
+
+    def state(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT owner, token, expires, done FROM leases WHERE name = ?', (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'owner': row[0], 'token': row[1], 'expires': row[2], 'done': bool(row[3])}
+
+
+def backend_from_url(url: str) -> LeaseBackend:
+    """
+    Create a backend from 'sqlite:PATH' or 'local'.
+    Raises:
+        ValueError: If the URL names no known backend
+    """
+    if url == 'local':
+        return LocalLeaseBackend()
+    if url.startswith('sqlite:'):
+        return SQLiteLeaseBackend(url[len('sqlite:'):])
+    raise ValueError(f"Unknown coordination backend: {url}")
+
+
+class Lease:
+    """
+    A lease held by this process, kept alive by the coordinator while in use.
+    """
+    def __init__(self, coordinator: 'Coordinator', name: str, token: int, shard: Optional[int] = None):
+        self.coordinator = coordinator
+        self.name = name
+        self.token = token
+        self.shard = shard
+        self.completed = False
+        self.lost = False
+
+    @property
+    def held(self) -> bool:
+        return not self.lost and not self.completed
+
+    def complete(self) -> bool:
+        """
+        Mark the leased work as done, so no replica takes it again.
+        Returns False if the lease had been lost to another replica.
+        """
+        self.completed = self.coordinator.backend.complete(self.name, self.coordinator.owner, self.token)
+        if not self.completed:
+            self.lost = True
+            logger.warning("Lease %s was lost before its work was marked done", self.name)
+        return self.completed
+
+    def release(self) -> None:
+        if self.held:
+            self.coordinator.backend.release(self.name, self.coordinator.owner, self.token)
+
+
+class Coordinator:
+    """
+    Leases over a shared backend: a leader lease per unit of work that must happen
+    once, and claimable shards for bulk jobs split across replicas.
+    """
+    def __init__(self, backend: LeaseBackend, owner: Optional[str] = None, ttl: float = 60.0):
+        """
+        Initialize the coordinator.
+
+        Args:
+            backend: Lease storage shared by the replicas
+            owner: Name of this replica, unique per process by default
+            ttl: Seconds a lease outlives its holder; held leases are renewed every third of it
+        """
+        self.backend = backend
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl = ttl
+
+    def acquire(self, name: str, shard: Optional[int] = None) -> Optional[Lease]:
+        token = self.backend.acquire(name, self.owner, self.ttl)
+        return Lease(self, name, token, shard) if token is not None else None
+
+    @contextmanager
+    def _kept_alive(self, lease: Lease):
+        """
+        Renew the lease in a background thread for the duration of the block, then
+        release it unless its work was completed.
+        """
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.ttl / 3):
+                if not lease.held:
+                    return
+                if not self.backend.renew(lease.name, self.owner, lease.token, self.ttl):
+                    lease.lost = True
+                    logger.warning("Lost lease %s to another replica", lease.name)
+                    return
+
+        thread = threading.Thread(target=heartbeat, name=f"lease-{lease.name}", daemon=True)
+        thread.start()
+        try:
+            yield lease
+        finally:
+            stop.set()
+            thread.join()
+            lease.release()
+
+    @contextmanager
+    def lead(self, name: str) -> Iterator[Optional[Lease]]:
+        """
+        Hold the leader lease of `name` for the block, or get None if another replica
+        holds it or its work is done. Call complete() on the lease once the work is done;
+        otherwise it is released on exit and another replica may take over.
+        """
+        lease = self.acquire(name)
+        if lease is None:
+            yield None
+            return
+        with self._kept_alive(lease):
+            yield lease
+
+    def shards(self, job: str, count: int) -> Iterator[Lease]:
+        """
+        Claim shards 0..count-1 of a job one at a time, until every shard is done or held
+        by another replica. Complete each shard's lease once its work is done; a shard
+        that is not completed is released for another replica to retry, and this one
+        stops claiming.
+        """
+        while True:
+            # Start at a random shard, so replicas starting together rarely contend
+            start = random.randrange(count)
+            for index in [(start + i) % count for i in range(count)]:
+                lease = self.acquire(f"{job}/shard-{index}", shard=index)
+                if lease is not None:
+                    break
+            else:
+                return
+            with self._kept_alive(lease):
+                yield lease
+            if not lease.completed:
+                return
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when the run budget is too small to start or finish a call.
+    """
+
+
+class Deadline:
+    """
+    Run-level time budget shared by every stage of the pipeline.
+    """
+    def __init__(self, budget: float, clock: Callable[[], float] = time.monotonic,
+                 cpu_clock: Callable[[], float] = time.thread_time):
+        """
+        Initialize the deadline.
+
+        Args:
+            budget: Total seconds the run may take
+            clock: Monotonic clock, replaceable in tests
+            cpu_clock: CPU time clock of the calling thread, used to split stage time into CPU and waiting
+        """
+        self.budget = budget
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.started = clock()
+        self.expires = self.started + budget
+        self.spent: Dict[str, float] = {}
+        self.cpu: Dict[str, float] = {}
+
+    def remaining(self) -> float:
+        """
+        Get the seconds left in the budget, never negative.
+        """
+        return max(0.0, self.expires - self.clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None, minimum: float = 0.5, reserve: float = 0.0) -> float:
+        """
+        Get the timeout for a single call from the remaining budget.
+
+        Args:
+            cap: Upper bound for the timeout, regardless of how much budget is left
+            minimum: Smallest timeout worth attempting the call with
+            reserve: Seconds kept back for the stages that still follow
+
+        Raises:
+            DeadlineExceeded: If less than `minimum` seconds remain
+        """
+        remaining = self.remaining() - reserve
+        if remaining < minimum:
+            raise DeadlineExceeded(f"{remaining:.1f}s left, call needs at least {minimum:.1f}s")
+        return min(remaining, cap) if cap is not None else remaining
+
+    @contextmanager
+    def stage(self, name: str, minimum: float = 0.0):
+        """
+        Account the time spent in a stage. The stage is refused up front when
+        less than `minimum` seconds remain.
+
+        Raises:
+            DeadlineExceeded: If the remaining budget is below `minimum`
+        """
+        remaining = self.remaining()
+        if remaining < minimum:
+            raise DeadlineExceeded(f"Skipping {name}: {remaining:.1f}s left, needs {minimum:.1f}s")
+        start = self.clock()
+        cpu_start = self.cpu_clock()
+        try:
+            yield self
+        finally:
+            self.spent[name] = self.spent.get(name, 0.0) + self.clock() - start
+            self.cpu[name] = self.cpu.get(name, 0.0) + self.cpu_clock() - cpu_start
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the budget consumed per stage and overall.
+        """
+        return {
+            'budget': self.budget,
+            'elapsed': round(self.clock() - self.started, 3),
+            'remaining': round(self.remaining(), 3),
+            'stages': {name: round(seconds, 3) for name, seconds in self.spent.items()}
+        }
+
+    def stage_breakdown(self) -> Dict[str, Dict[str, float]]:
+        """
+        Split each stage's time into CPU time of the calling thread and time spent
+        blocked (network I/O, or waiting on a worker thread doing it).
+        """
+        return {
+            name: {
+                'wall': round(seconds, 4),
+                'cpu': round(self.cpu.get(name, 0.0), 4),
+                'blocked': round(max(0.0, seconds - self.cpu.get(name, 0.0)), 4)
+            }
+            for name, seconds in self.spent.items()
+        }
+
+
+def call_with_timeout(func: Callable, timeout: Optional[float], *args, **kwargs) -> Any:
+    """
+    Call a blocking function that has no timeout of its own, giving up after `timeout` seconds.
+    The call runs in a daemon thread, so a hung call is abandoned rather than joined at exit.
+
+    Raises:
+        DeadlineExceeded: If the call does not finish in time
+    """
+    if timeout is None:
+        return func(*args, **kwargs)
+    outcome = {}
+    done = threading.Event()
+
+    def target():
+        try:
+            outcome['result'] = func(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=target, daemon=True).start()
+    if not done.wait(timeout):
+        raise DeadlineExceeded(f"Call did not finish within {timeout:.1f}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
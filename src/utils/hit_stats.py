@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Width of the Spotify popularity buckets (popularity is 0-100)
+POPULARITY_BUCKET_SIZE = 20
+
+
+class HitStats:
+    """
+    Observed Genius hit rates per genre and per Spotify popularity bucket, persisted as JSON.
+    Rates are smoothed with a uniform prior, so unseen groups start at 50% and are still tried.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.genres: Dict[str, list] = {}
+        self.popularity: Dict[str, list] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.genres = data.get('genres', {})
+                self.popularity = data.get('popularity', {})
+            except (OSError, ValueError) as e:
+                logger.warning("Could not load Genius hit statistics: %s", e)
+
+    @staticmethod
+    def popularity_bucket(song: Dict) -> str:
+        popularity = song.get('popularity')
+        if popularity is None:
+            return 'unknown'
+        start = min(int(popularity) // POPULARITY_BUCKET_SIZE * POPULARITY_BUCKET_SIZE, 100 - POPULARITY_BUCKET_SIZE)
+        return f"{start}-{start + POPULARITY_BUCKET_SIZE - 1}"
+
+    @staticmethod
+    def _rate(counts: Optional[list]) -> float:
+        hits, attempts = counts or (0, 0)
+        return (hits + 1) / (attempts + 2)
+
+    def record(self, song: Dict, hit: bool) -> None:
+        """
+        Record the outcome of a Genius lookup for a Spotify song.
+        """
+        with self._lock:
+            for table, key in ((self.genres, song.get('genre') or 'unknown'),
+                               (self.popularity, self.popularity_bucket(song))):
+                counts = table.setdefault(key, [0, 0])
+                counts[0] += int(hit)
+                counts[1] += 1
+            self._save()
+
+    def genre_rate(self, genre: str) -> float:
+        with self._lock:
+            return self._rate(self.genres.get(genre))
+
+    def overall_rate(self) -> float:
+        with self._lock:
+            return self._overall_rate()
+
+    def _overall_rate(self) -> float:
+        hits = sum(counts[0] for counts in self.genres.values())
+        attempts = sum(counts[1] for counts in self.genres.values())
+        return self._rate((hits, attempts))
+
+    def expected(self, song: Dict) -> float:
+        """
+        Estimate the chance that Genius has a song, combining its genre's and its
+        popularity bucket's rates as independent evidence relative to the overall rate.
+        """
+        with self._lock:
+            genre = self._rate(self.genres.get(song.get('genre') or 'unknown'))
+            bucket = self._rate(self.popularity.get(self.popularity_bucket(song)))
+            overall = self._overall_rate()
+        return min(1.0, genre * bucket / overall)
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'genres': self.genres, 'popularity': self.popularity}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,165 @@
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of a daily run
+OUTCOMES = ('posted', 'skipped', 'no_info', 'deadline', 'error')
+
+# Percentiles reported by the ledger CLI
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """
+    Get the q-th percentile of values by linear interpolation, or None if there are none.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low, high = math.floor(position), math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class RunRecord:
+    """
+    What happened in one attempt of a daily run, filled in as the run progresses.
+    """
+    __slots__ = ('run_id', 'started', 'outcome', 'track', 'candidates', 'stages',
+                 'cache_hits', 'cache_misses', 'prompt_chars', 'error')
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        self.started = time.time()
+        self.outcome = 'error'
+        self.track: Optional[Dict] = None
+        self.candidates = 0
+        self.stages: Dict[str, float] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.prompt_chars: Optional[int] = None
+        self.error: Optional[str] = None
+
+
+class RunLedger:
+    """
+    Append-only history of daily runs in a SQLite file, one compact row per run attempt.
+    """
+    def __init__(self, path: str):
+        """
+        Initialize the ledger.
+
+        Args:
+            path: SQLite database file, or ':memory:'
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS runs ('
+            'id INTEGER PRIMARY KEY, run_id TEXT NOT NULL, attempt INTEGER NOT NULL, '
+            'started REAL NOT NULL, duration REAL NOT NULL, outcome TEXT NOT NULL, '
+            'track_id TEXT, track TEXT, candidates INTEGER NOT NULL, stages TEXT NOT NULL, '
+            'cache_hits INTEGER NOT NULL, cache_misses INTEGER NOT NULL, prompt_chars INTEGER, error TEXT)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS runs_started ON runs (started)')
+
+    def append(self, record: RunRecord) -> None:
+        """
+        Store a finished run attempt. Attempts are numbered per run ID, so resumed runs show as retries.
+        """
+        track = record.track or {}
+        title = f"{track['name']} by {track['artist']}" if track else None
+        with self._lock:
+            attempt = self._conn.execute(
+                'SELECT COUNT(*) FROM runs WHERE run_id = ?', (record.run_id,)
+            ).fetchone()[0] + 1
+            self._conn.execute(
+                'INSERT INTO runs (run_id, attempt, started, duration, outcome, track_id, track, candidates, '
+                'stages, cache_hits, cache_misses, prompt_chars, error) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (record.run_id, attempt, record.started, time.time() - record.started, record.outcome,
+                 track.get('id'), title, record.candidates,
+                 json.dumps({name: round(seconds, 3) for name, seconds in record.stages.items()}),
+                 record.cache_hits, record.cache_misses, record.prompt_chars, record.error)
+            )
+
+    def runs(self, since: Optional[float] = None) -> List[Dict]:
+        """
+        Get run attempts started after `since` (a UNIX timestamp), oldest first.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT * FROM runs WHERE started >= ? ORDER BY started', (since or 0,)
+            )
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        runs = [dict(zip(columns, row)) for row in rows]
+        for run in runs:
+            run['stages'] = json.loads(run['stages'])
+        return runs
+
+    @staticmethod
+    def _latencies(runs: List[Dict]) -> Dict[str, List[float]]:
+        latencies = {'total': [run['duration'] for run in runs]}
+        for run in runs:
+            for name, seconds in run['stages'].items():
+                latencies.setdefault(name, []).append(seconds)
+        return latencies
+
+    def summary(self, since: Optional[float] = None) -> Dict:
+        """
+        Summarize run attempts: outcomes, retries, candidates per hit, cache hit ratio,
+        prompt size and latency percentiles overall and per stage.
+        """
+        runs = self.runs(since)
+        posted = [run for run in runs if run['outcome'] == 'posted']
+        hits = sum(run['cache_hits'] for run in runs)
+        lookups = hits + sum(run['cache_misses'] for run in runs)
+        prompts = [run['prompt_chars'] for run in runs if run['prompt_chars']]
+        return {
+            'runs': len(runs),
+            'outcomes': {outcome: sum(1 for run in runs if run['outcome'] == outcome)
+                         for outcome in OUTCOMES if any(run['outcome'] == outcome for run in runs)},
+            'retries': sum(1 for run in runs if run['attempt'] > 1),
+            'candidates_per_post': round(sum(run['candidates'] for run in posted) / len(posted), 2) if posted else None,
+            'cache_hit_ratio': round(hits / lookups, 3) if lookups else None,
+            'prompt_chars': {f'p{q}': percentile(prompts, q) for q in PERCENTILES},
+            'latency': {
+                name: {f'p{q}': round(percentile(values, q), 3) for q in PERCENTILES}
+                for name, values in self._latencies(runs).items() if values
+            },
+        }
+
+    def trend(self, period: str = 'week', since: Optional[float] = None) -> List[Dict]:
+        """
+        Get median latencies, prompt size and candidates per period ('day', 'week' or 'month').
+        """
+        formats = {'day': '%Y-%m-%d', 'week': '%G-W%V', 'month': '%Y-%m'}
+        if period not in formats:
+            raise ValueError(f"Unknown period: {period}")
+        groups: Dict[str, List[Dict]] = {}
+        for run in self.runs(since):
+            key = datetime.fromtimestamp(run['started'], timezone.utc).strftime(formats[period])
+            groups.setdefault(key, []).append(run)
+        trend = []
+        for key, runs in groups.items():
+            latencies = self._latencies(runs)
+            prompts = [run['prompt_chars'] for run in runs if run['prompt_chars']]
+            trend.append({
+                'period': key,
+                'runs': len(runs),
+                'failed': sum(1 for run in runs if run['outcome'] not in ('posted', 'skipped')),
+                'candidates': round(sum(run['candidates'] for run in runs) / len(runs), 2),
+                'prompt_chars': percentile(prompts, 50),
+                'latency': {name: round(percentile(values, 50), 3) for name, values in latencies.items()},
+            })
+        return trend
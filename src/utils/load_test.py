@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import random
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence
+
+from src.utils.ledger import PERCENTILES, percentile
+from src.utils.stand_ins import DEFAULT_LATENCIES, LatencyModel, OfflineMessage, offline_update
+
+logger = logging.getLogger(__name__)
+
+
+class BotLoadTest:
+    """
+    Load generator feeding synthetic /song updates into a bot's handlers at increasing
+    rates. Updates arrive as a Poisson process and wait for one of `concurrency` slots,
+    like the Application's concurrent_updates, so queueing shows up in the latencies.
+    """
+    def __init__(self, bot, concurrency: int = 64, seed: int = 0, latency_scale: float = 1.0,
+                 genre_share: float = 0.5, sample_interval: float = 0.05, trace_memory: bool = True):
+        """
+        Initialize the load test.
+
+        Args:
+            bot: SongBotService, usually on top of build_offline_services
+            concurrency: Updates handled at once, the rest wait in the queue
+            seed: Seed of the arrivals, the genres asked for and the reply latency
+            latency_scale: Multiplier of the reply latency, 0 for no waiting at all
+            genre_share: Fraction of updates asking for a genre instead of any song
+            sample_interval: Seconds between queue depth samples
+            trace_memory: Measure memory with tracemalloc, which slows allocations down
+        """
+        self.bot = bot
+        self.concurrency = concurrency
+        self.genre_share = genre_share
+        self.sample_interval = sample_interval
+        self.trace_memory = trace_memory
+        self._random = random.Random(seed)
+        self._reply_latency = LatencyModel(DEFAULT_LATENCIES['telegram'], seed=seed, scale=latency_scale)
+        self._next_update_id = 0
+        self._waiting = 0
+        self._active = 0
+
+    def _args(self) -> List[str]:
+        if self._random.random() < self.genre_share:
+            return [self._random.choice(self.bot.services['spotify'].genres)]
+        return []
+
+    async def _handle(self, slots: asyncio.Semaphore, latencies: List[float], failures: List[int]) -> None:
+        self._next_update_id += 1
+        message = OfflineMessage(self._reply_latency, chat_id=self._next_update_id)
+        update, context = offline_update(self._next_update_id, message, self._args())
+        arrived = time.monotonic()
+        self._waiting += 1
+        try:
+            async with slots:
+                self._waiting -= 1
+                self._active += 1
+                try:
+                    await self.bot.handle_song(update, context)
+                finally:
+                    self._active -= 1
+        except Exception as e:
+            logger.warning("Update %s failed: %s", update.update_id, e)
+        latencies.append(time.monotonic() - arrived)
+        # The bot answers failures with an apology rather than raising
+        if not message.replies or message.replies[-1].startswith("Sorry"):
+            failures.append(update.update_id)
+
+    async def _sample(self, samples: List[tuple]) -> None:
+        while True:
+            samples.append((self._waiting, self._active))
+            await asyncio.sleep(self.sample_interval)
+
+    async def _step(self, rate: float, duration: float) -> Dict:
+        slots = asyncio.Semaphore(self.concurrency)
+        latencies: List[float] = []
+        failures: List[int] = []
+        samples: List[tuple] = []
+        baseline = 0
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        sampler = asyncio.ensure_future(self._sample(samples))
+        tasks = []
+        start = time.monotonic()
+        arrival = start + self._random.expovariate(rate)
+        while arrival < start + duration:
+            await asyncio.sleep(max(0.0, arrival - time.monotonic()))
+            tasks.append(asyncio.ensure_future(self._handle(slots, latencies, failures)))
+            arrival += self._random.expovariate(rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+        sampler.cancel()
+
+        peak_active = max((active for _, active in samples), default=0)
+        memory = None
+        if self.trace_memory and peak_active:
+            memory = (tracemalloc.get_traced_memory()[1] - baseline) / peak_active
+        depths = [waiting for waiting, _ in samples]
+        return {
+            'rate': rate,
+            'requests': len(tasks),
+            'failed': len(failures),
+            'throughput': round(len(tasks) / elapsed, 2) if elapsed else None,
+            'latency': {f'p{q}': percentile(latencies, q) for q in PERCENTILES},
+            'queue_depth': {'mean': round(sum(depths) / len(depths), 2) if depths else 0,
+                            'max': max(depths, default=0)},
+            'in_flight': peak_active,
+            # Includes anything the step left allocated, such as warmed caches
+            'memory_per_request': memory,
+        }
+
+    async def _ramp(self, rates: Sequence[float], step_seconds: float, max_p99: Optional[float]) -> List[Dict]:
+        steps = []
+        for rate in rates:
+            step = await self._step(rate, step_seconds)
+            steps.append(step)
+            p99 = step['latency']['p99']
+            logger.info("Load step at %s/s: %s requests, p99 %s s, queue max %s",
+                        rate, step['requests'], p99, step['queue_depth']['max'])
+            if max_p99 is not None and p99 is not None and p99 > max_p99:
+                break
+        return steps
+
+    def ramp(self, rates: Sequence[float], step_seconds: float = 10.0,
+             max_p99: Optional[float] = None) -> List[Dict]:
+        """
+        Send updates at each rate (per second) in turn for `step_seconds`, waiting for
+        every update of a step to be answered before the next. Stops after the first
+        step whose p99 latency exceeds `max_p99` seconds, if given.
+
+        Returns:
+            Per step: the rate, requests, failed replies, throughput, latency percentiles,
+            queue depth, peak updates in flight and traced memory per update in flight
+        """
+        started = self.trace_memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            return asyncio.run(self._ramp(rates, step_seconds, max_p99))
+        finally:
+            if started:
+                tracemalloc.stop()
@@ -0,0 +1,151 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, TextIO
+
+# Attributes every LogRecord has, anything else was passed with `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'run_id'}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(run_id)s] %(message)s'
+
+# Run ID of the current task. Set per update by the bot; asyncio tasks and
+# asyncio.to_thread copy it, plain thread pools fall back to the process-wide ID.
+current_run_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('run_id', default=None)
+_process_run_id: Optional[str] = None
+
+_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+_settings: dict = {}
+
+
+def set_run_id(run_id: Optional[str], process: bool = False) -> contextvars.Token:
+    """
+    Tag the log records of the current context with a run ID.
+
+    Args:
+        run_id: Correlation ID, e.g. the daily run ID or a bot update ID
+        process: Also make it the default of every thread in the process, including
+                 pool workers that do not inherit the context
+    """
+    global _process_run_id
+    if process:
+        _process_run_id = run_id
+    return current_run_id.set(run_id)
+
+
+def get_run_id() -> Optional[str]:
+    return current_run_id.get() or _process_run_id
+
+
+class RunIdFilter(logging.Filter):
+    """
+    Stamp records with the run ID of the thread that logged them. It runs on the
+    QueueHandler, since the listener thread does not see the caller's context.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'run_id'):
+            record.run_id = get_run_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line with the timestamp, level, logger, run ID, thread,
+    message, exception and any fields passed with `extra=`.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'run_id': getattr(record, 'run_id', None),
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queue records as they are. The stock QueueHandler formats the message in the
+    calling thread; here arguments are merged in the listener thread instead, so
+    a log call on the hot path costs one record and one queue put. Arguments must
+    therefore not be mutated after logging them.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Tracebacks reference frames of the calling thread, render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: int = logging.INFO, json_output: bool = True,
+                      stream: Optional[TextIO] = None) -> QueueListener:
+    """
+    Route all logging through a queue drained by a background thread writing to
+    `stream` (stderr by default). Replaces the root handlers, so it is safe to call
+    again, e.g. to change the format. The listener is stopped at exit, flushing
+    queued records.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        _settings.update(level=level, json_output=json_output, stream=stream)
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        handler = _DeferredQueueHandler(records)
+        handler.addFilter(RunIdFilter())
+
+        root = logging.getLogger()
+        for old in root.handlers[:]:
+            root.removeHandler(old)
+        root.addHandler(handler)
+        root.setLevel(level)
+
+        _listener = QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        return _listener
+
+
+def shutdown_logging() -> None:
+    """
+    Stop the listener after it has written every queued record.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_in_child() -> None:
+    # A forked worker inherits the queue handler but not the listener thread
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging(**_settings)
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_in_child)
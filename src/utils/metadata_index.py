@@ -0,0 +1,145 @@
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from src.utils.cache import cache_key
+from src.utils.records import GeniusRecord, Track
+
+logger = logging.getLogger(__name__)
+
+# Indexed columns, usable as column filters in queries, e.g. 'producers:"max martin"'
+INDEX_COLUMNS = ('title', 'artist', 'producers', 'writers', 'featured', 'genres', 'tags', 'description')
+
+
+def phrase(text: str) -> str:
+    """
+    Quote text as an FTS5 phrase, so user input is matched literally.
+    """
+    return '"' + text.replace('"', '""') + '"'
+
+
+class MetadataIndex:
+    """
+    Local SQLite FTS5 full-text index over fetched Genius metadata, for finding songs
+    by credits, genres or tags without new Genius searches.
+    """
+    def __init__(self, path: str):
+        """
+        Initialize the index.
+
+        Args:
+            path: SQLite database file, or ':memory:'
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS records ('
+            'id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, song TEXT, info TEXT NOT NULL)'
+        )
+        self._conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5("
+            f"{', '.join(INDEX_COLUMNS)}, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def add(self, song_name: str, artist_name: str, info: Dict, song: Optional[Dict] = None) -> None:
+        """
+        Index a Genius record, replacing an earlier one of the same song.
+        The Spotify song, if given, is stored so queries can return playable tracks.
+        """
+        record = GeniusRecord.from_dict(info)
+        values = (
+            record.title,
+            record.artist,
+            ' | '.join(record.producer_artists),
+            ' | '.join(record.writer_artists),
+            ' | '.join(record.featured_artists),
+            ' | '.join(record.genres),
+            ' | '.join(record.tags),
+            record.description,
+        )
+        key = cache_key(song_name, artist_name)
+        song_row = json.dumps(Track.from_dict(song).to_row(), ensure_ascii=False) if song else None
+        info_row = json.dumps(record.to_row(), ensure_ascii=False)
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                row = self._conn.execute('SELECT id, song FROM records WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    rowid = self._conn.execute(
+                        'INSERT INTO records (key, song, info) VALUES (?, ?, ?)', (key, song_row, info_row)
+                    ).lastrowid
+                else:
+                    rowid = row[0]
+                    # Keep a known Spotify track when re-indexed without one
+                    self._conn.execute(
+                        'UPDATE records SET song = ?, info = ? WHERE id = ?', (song_row or row[1], info_row, rowid)
+                    )
+                    self._conn.execute('DELETE FROM records_fts WHERE rowid = ?', (rowid,))
+                self._conn.execute(
+                    f"INSERT INTO records_fts (rowid, {', '.join(INDEX_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' * len(INDEX_COLUMNS))})",
+                    (rowid, *values)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Run an FTS5 query, best matches first.
+        Column filters select fields, e.g. 'tags:synthwave' or 'producers:"max martin"'.
+
+        Returns:
+            Dicts with the Genius 'info', the Spotify 'song' (None if unknown) and the bm25 'rank'
+        Raises:
+            ValueError: If the query is not valid FTS5 syntax
+        """
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT records.song, records.info, bm25(records_fts) AS rank '
+                    'FROM records_fts JOIN records ON records.id = records_fts.rowid '
+                    'WHERE records_fts MATCH ? ORDER BY rank LIMIT ?',
+                    (query, limit)
+                ).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid index query {query!r}: {e}")
+        return [
+            {
+                'song': Track.from_row(json.loads(song)).to_dict() if song else None,
+                'info': GeniusRecord.from_row(json.loads(info)).to_dict(),
+                'rank': rank,
+            }
+            for song, info, rank in rows
+        ]
+
+    def find(self, text: Optional[str] = None, limit: int = 20, **fields: str) -> List[Dict]:
+        """
+        Search with literal phrases instead of FTS5 syntax, all of which must match.
+        For example find(producers='Max Martin', tags='synthwave').
+        Raises:
+            ValueError: If a field is not an indexed column
+        """
+        terms = [phrase(text)] if text else []
+        for field, value in fields.items():
+            if field not in INDEX_COLUMNS:
+                raise ValueError(f"Unknown index field: {field}")
+            terms.append(f"{field}:{phrase(value)}")
+        if not terms:
+            return []
+        return self.search(' AND '.join(terms), limit=limit)
+
+    def songs(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Get the Spotify songs matching a query, for selecting themed posts from the index.
+        """
+        return [match['song'] for match in self.search(query, limit=limit) if match['song']]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
@@ -0,0 +1,148 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, Optional
+
+from src.utils.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Before 3.12 cProfile only sees the thread that enabled it, so other threads get their own profile
+PROFILE_THREADS = sys.version_info < (3, 12)
+
+# Module path fragments of CPU-bound work worth calling out in the summary
+CPU_HOTSPOTS = {
+    'html_parsing': ('bs4', 'html/parser'),
+    'json_decoding': ('json/decoder', 'json/__init__.py:loads', 'simplejson/decoder', 'simplejson/__init__.py:loads'),
+    'prompt_building': ('_build_prompt', 'local_summary'),
+    'message_formatting': ('send_song_info', 'format_info'),
+    'selection': ('selection_service',)
+}
+
+
+class PipelineProfiler:
+    """
+    Context manager profiling a pipeline run with cProfile and tracemalloc.
+
+    On exit it writes to the output directory:
+        profile.pstats   raw cProfile data, for pstats or snakeviz
+        profile.txt      top functions by cumulative and by own time
+        allocations.txt  top allocation sites still alive after the run
+        summary.json     wall, CPU and blocked time, per stage and per hotspot
+    """
+    def __init__(self, output_dir: str, deadline: Optional[Deadline] = None, top: int = 30,
+                 traceback_depth: int = 10):
+        """
+        Args:
+            output_dir: Directory the reports are written to
+            deadline: Run deadline whose stage accounting splits CPU from blocked time
+            top: Number of entries in the text reports
+            traceback_depth: Frames kept per allocation by tracemalloc
+        """
+        self.output_dir = output_dir
+        self.deadline = deadline
+        self.top = top
+        self.traceback_depth = traceback_depth
+        self.profile = cProfile.Profile()
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+
+    def _profile_thread(self, frame, event, arg) -> None:
+        # Installed with threading.setprofile, so it runs once in each thread started during the run
+        profile = cProfile.Profile()
+        with self._lock:
+            self._thread_profiles.append(profile)
+        profile.enable()
+
+    def stats(self, stream=None) -> pstats.Stats:
+        """
+        Get the profile of the run, including threads it started.
+        """
+        with self._lock:
+            profiles = [self.profile] + self._thread_profiles
+        return pstats.Stats(*profiles, stream=stream)
+
+    def __enter__(self) -> 'PipelineProfiler':
+        os.makedirs(self.output_dir, exist_ok=True)
+        tracemalloc.start(self.traceback_depth)
+        self._baseline = tracemalloc.take_snapshot()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        if PROFILE_THREADS:
+            threading.setprofile(self._profile_thread)
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.profile.disable()
+        if PROFILE_THREADS:
+            threading.setprofile(None)
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.process_time() - self._cpu_start
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        try:
+            self._write_reports(wall, cpu, peak, snapshot)
+            logger.info("Profile written to %s", self.output_dir)
+        except OSError as e:
+            logger.error("Could not write profile: %s", e)
+        # Never swallow the run's own exceptions, including SystemExit
+        return False
+
+    def _write_reports(self, wall: float, cpu: float, peak: int, snapshot: tracemalloc.Snapshot) -> None:
+        self.stats().dump_stats(os.path.join(self.output_dir, 'profile.pstats'))
+
+        with open(os.path.join(self.output_dir, 'profile.txt'), 'w', encoding='utf-8') as f:
+            for sort_key in ('cumulative', 'tottime'):
+                stream = io.StringIO()
+                self.stats(stream).sort_stats(sort_key).print_stats(self.top)
+                f.write(f"==== Sorted by {sort_key} ====\n{stream.getvalue()}\n")
+
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')
+        ])
+        allocations = snapshot.compare_to(self._baseline, 'lineno')[:self.top]
+        with open(os.path.join(self.output_dir, 'allocations.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n\n")
+            for stat in allocations:
+                f.write(f"{stat}\n")
+
+        summary = {
+            'wall_seconds': round(wall, 4),
+            'cpu_seconds': round(cpu, 4),
+            'blocked_seconds': round(max(0.0, wall - cpu), 4),
+            'peak_memory_bytes': peak,
+            'stages': self.deadline.stage_breakdown() if self.deadline else {},
+            'cpu_hotspots': self.cpu_hotspots()
+        }
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+    def cpu_hotspots(self) -> Dict[str, Dict]:
+        """
+        Sum the own time of profiled functions per hotspot category. These functions do
+        no I/O, so their own time is CPU time. Threads started during the run are covered too.
+        """
+        stats = self.stats().stats
+        hotspots = {name: {'seconds': 0.0, 'calls': 0, 'functions': []} for name in CPU_HOTSPOTS}
+        for (filename, _, function), (_, calls, own_time, _, _) in stats.items():
+            location = f"{filename.replace(os.sep, '/')}:{function}"
+            for name, patterns in CPU_HOTSPOTS.items():
+                if any(pattern in location for pattern in patterns):
+                    hotspots[name]['seconds'] += own_time
+                    hotspots[name]['calls'] += calls
+                    hotspots[name]['functions'].append(function)
+                    break
+        for hotspot in hotspots.values():
+            hotspot['seconds'] = round(hotspot['seconds'], 5)
+            hotspot['functions'] = sorted(set(hotspot['functions']))[:10]
+        return hotspots
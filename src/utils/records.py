@@ -0,0 +1,291 @@
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+# Audio features kept on a track, the ones the selection engine uses
+TRACK_FEATURES = ('energy', 'tempo')
+
+# Version of the columnar cache payload, bumped when its layout changes
+BATCH_VERSION = 2
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _intern_all(values: Optional[Iterable[str]]) -> tuple:
+    return tuple(_intern(value) for value in values or () if value)
+
+
+class Track:
+    """
+    A Spotify track. Artist and genre strings are interned, since a large candidate
+    pool repeats the same few hundred of them.
+    """
+    __slots__ = ('id', 'name', 'artist', 'album', 'release_date', 'spotify_url',
+                 'popularity', 'duration_ms', 'genre', 'energy', 'tempo', 'image_url')
+
+    def __init__(self, id: Optional[str], name: str, artist: str, album: str = '', release_date: str = '',
+                 spotify_url: str = '', popularity: Optional[int] = None, duration_ms: int = 0,
+                 genre: Optional[str] = None, energy: Optional[float] = None, tempo: Optional[float] = None,
+                 image_url: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.artist = _intern(artist)
+        self.album = album
+        self.release_date = release_date
+        self.spotify_url = spotify_url
+        self.popularity = popularity
+        self.duration_ms = duration_ms
+        self.genre = _intern(genre)
+        self.energy = energy
+        self.tempo = tempo
+        self.image_url = image_url
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Track) and self.to_row() == other.to_row()
+
+    def __repr__(self) -> str:
+        return f"Track({self.name!r} by {self.artist!r})"
+
+    @classmethod
+    def from_dict(cls, song: Dict) -> 'Track':
+        """
+        Build a track from the song dict used through the pipeline.
+        """
+        features = song.get('features') or {}
+        return cls(
+            id=song.get('id'),
+            name=song['name'],
+            artist=song['artist'],
+            album=song.get('album', ''),
+            release_date=song.get('release_date', ''),
+            spotify_url=song.get('spotify_url', ''),
+            popularity=song.get('popularity'),
+            duration_ms=song.get('duration_ms', 0),
+            genre=song.get('genre'),
+            energy=features.get('energy'),
+            tempo=features.get('tempo'),
+            image_url=song.get('image_url'),
+        )
+
+    def to_dict(self) -> Dict:
+        """
+        Convert back to the song dict used through the pipeline.
+        """
+        return {
+            'id': self.id,
+            'name': self.name,
+            'artist': self.artist,
+            'album': self.album,
+            'release_date': self.release_date,
+            'spotify_url': self.spotify_url,
+            'popularity': self.popularity,
+            'duration_ms': self.duration_ms,
+            'genre': self.genre,
+            'features': {f: getattr(self, f) for f in TRACK_FEATURES if getattr(self, f) is not None},
+            'image_url': self.image_url,
+        }
+
+    def to_row(self) -> list:
+        """
+        Serialize to a JSON-ready list in slot order, a fraction of the size of a dict.
+        """
+        return [getattr(self, slot) for slot in self.__slots__]
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> 'Track':
+        return cls(*row)
+
+
+class GeniusRecord:
+    """
+    The Genius metadata of a song. Credit, genre and tag names are interned tuples.
+    """
+    __slots__ = ('title', 'artist', 'album', 'release_date', 'genius_url', 'description',
+                 'producer_artists', 'writer_artists', 'featured_artists', 'genres', 'tags', 'artist_id')
+
+    def __init__(self, title: str, artist: str, album: str = 'Unknown Album', release_date: str = 'Unknown',
+                 genius_url: str = '', description: str = '', producer_artists: Iterable[str] = (),
+                 writer_artists: Iterable[str] = (), featured_artists: Iterable[str] = (),
+                 genres: Iterable[str] = (), tags: Iterable[str] = (), artist_id: Optional[int] = None):
+        self.title = title
+        self.artist = _intern(artist)
+        self.album = album
+        self.release_date = release_date
+        self.genius_url = genius_url
+        self.description = description
+        self.producer_artists = _intern_all(producer_artists)
+        self.writer_artists = _intern_all(writer_artists)
+        self.featured_artists = _intern_all(featured_artists)
+        self.genres = _intern_all(genres)
+        self.tags = _intern_all(tags)
+        self.artist_id = artist_id
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, GeniusRecord) and self.to_row() == other.to_row()
+
+    def __repr__(self) -> str:
+        return f"GeniusRecord({self.title!r} by {self.artist!r})"
+
+    @classmethod
+    def from_dict(cls, info: Dict) -> 'GeniusRecord':
+        """
+        Build a record from the dict returned by GeniusService.get_song_info.
+        """
+        return cls(**{slot: info[slot] for slot in cls.__slots__ if slot in info})
+
+    def to_dict(self) -> Dict:
+        info = {slot: getattr(self, slot) for slot in self.__slots__}
+        for slot in ('producer_artists', 'writer_artists', 'featured_artists', 'genres', 'tags'):
+            info[slot] = list(info[slot])
+        return info
+
+    def to_row(self) -> list:
+        """
+        Serialize to a JSON-ready list in slot order.
+        """
+        return [list(value) if isinstance(value, tuple) else value
+                for value in (getattr(self, slot) for slot in self.__slots__)]
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> 'GeniusRecord':
+        return cls(*row)
+
+
+class TrackBatch:
+    """
+    Columnar container for many tracks. Numbers live in typed arrays and artists and
+    genres are stored once in a table and referenced by index, so a batch costs a few
+    dozen bytes per track on top of its distinct strings.
+    """
+    def __init__(self):
+        self.ids: List[Optional[str]] = []
+        self.names: List[str] = []
+        self.albums: List[str] = []
+        self.release_dates: List[str] = []
+        self.spotify_urls: List[str] = []
+        self.image_urls: List[Optional[str]] = []
+        self.artist_codes = array('I')
+        self.genre_codes = array('I')
+        # Missing popularity is -1 and missing features are NaN
+        self.popularity = array('h')
+        self.duration_ms = array('q')
+        self.energy = array('d')
+        self.tempo = array('d')
+        self._strings: List[Optional[str]] = [None]
+        self._codes: Dict[Optional[str], int] = {None: 0}
+
+    def _code(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._strings)
+            self._strings.append(_intern(value))
+        return code
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, track: Track) -> None:
+        self.ids.append(track.id)
+        self.names.append(track.name)
+        self.albums.append(track.album)
+        self.release_dates.append(track.release_date)
+        self.spotify_urls.append(track.spotify_url)
+        self.image_urls.append(track.image_url)
+        self.artist_codes.append(self._code(track.artist))
+        self.genre_codes.append(self._code(track.genre))
+        self.popularity.append(-1 if track.popularity is None else track.popularity)
+        self.duration_ms.append(track.duration_ms or 0)
+        self.energy.append(math.nan if track.energy is None else track.energy)
+        self.tempo.append(math.nan if track.tempo is None else track.tempo)
+
+    def extend(self, tracks: Iterable[Track]) -> None:
+        for track in tracks:
+            self.append(track)
+
+    def __getitem__(self, index: int) -> Track:
+        popularity = self.popularity[index]
+        energy = self.energy[index]
+        tempo = self.tempo[index]
+        return Track(
+            id=self.ids[index],
+            name=self.names[index],
+            artist=self._strings[self.artist_codes[index]],
+            album=self.albums[index],
+            release_date=self.release_dates[index],
+            spotify_url=self.spotify_urls[index],
+            popularity=None if popularity < 0 else popularity,
+            duration_ms=self.duration_ms[index],
+            genre=self._strings[self.genre_codes[index]],
+            energy=None if math.isnan(energy) else energy,
+            tempo=None if math.isnan(tempo) else tempo,
+            image_url=self.image_urls[index],
+        )
+
+    def __iter__(self) -> Iterator[Track]:
+        return (self[i] for i in range(len(self)))
+
+    def artist(self, index: int) -> Optional[str]:
+        return self._strings[self.artist_codes[index]]
+
+    def genre(self, index: int) -> Optional[str]:
+        return self._strings[self.genre_codes[index]]
+
+    @classmethod
+    def from_dicts(cls, songs: Iterable[Dict]) -> 'TrackBatch':
+        batch = cls()
+        batch.extend(Track.from_dict(song) for song in songs)
+        return batch
+
+    def to_dicts(self) -> List[Dict]:
+        return [track.to_dict() for track in self]
+
+    def to_payload(self) -> Dict:
+        """
+        Serialize to a JSON-ready dict of columns for the caches.
+        """
+        return {
+            'version': BATCH_VERSION,
+            'strings': self._strings,
+            'ids': self.ids,
+            'names': self.names,
+            'albums': self.albums,
+            'release_dates': self.release_dates,
+            'spotify_urls': self.spotify_urls,
+            'image_urls': self.image_urls,
+            'artist_codes': self.artist_codes.tolist(),
+            'genre_codes': self.genre_codes.tolist(),
+            'popularity': self.popularity.tolist(),
+            'duration_ms': self.duration_ms.tolist(),
+            # JSON has no NaN, missing features are stored as null
+            'energy': [None if math.isnan(value) else value for value in self.energy],
+            'tempo': [None if math.isnan(value) else value for value in self.tempo],
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict) -> 'TrackBatch':
+        """
+        Load a batch serialized with to_payload.
+        Raises:
+            ValueError: If the payload was written by an incompatible version
+        """
+        if payload.get('version') != BATCH_VERSION:
+            raise ValueError(f"Unsupported track batch version: {payload.get('version')}")
+        batch = cls()
+        batch._strings = [_intern(value) for value in payload['strings']]
+        batch._codes = {value: code for code, value in enumerate(batch._strings)}
+        batch.ids = payload['ids']
+        batch.names = payload['names']
+        batch.albums = payload['albums']
+        batch.release_dates = payload['release_dates']
+        batch.spotify_urls = payload['spotify_urls']
+        batch.image_urls = payload['image_urls']
+        batch.artist_codes = array('I', payload['artist_codes'])
+        batch.genre_codes = array('I', payload['genre_codes'])
+        batch.popularity = array('h', payload['popularity'])
+        batch.duration_ms = array('q', payload['duration_ms'])
+        batch.energy = array('d', (math.nan if value is None else value for value in payload['energy']))
+        batch.tempo = array('d', (math.nan if value is None else value for value in payload['tempo']))
+        return batch
@@ -0,0 +1,403 @@
+"""
+Offline stand-ins for Spotify, Genius, Wikipedia, Gemini and Telegram.
+
+They return deterministic payloads after a seeded, simulated latency, so runs can
+be profiled reproducibly without credentials or network access. The real service
+classes sit on top of them, so their own parsing and formatting code still runs.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Dict, Optional
+from urllib.parse import unquote
+from src.services.enrichment_service import EnrichmentService
+from src.services.gemini_service import GeminiService
+from src.services.genius_service import GeniusService
+from src.services.harvest_service import HarvestService
+from src.services.selection_service import SelectionService
+from src.services.spotify_service import SpotifyService
+from src.services.telegram_service import TelegramService
+from src.services.wikipedia_service import WikipediaService
+from src.utils.cache import Cache
+
+# Median latency in seconds of each upstream
+DEFAULT_LATENCIES = {
+    'spotify': 0.15,
+    'genius': 0.12,
+    'gemini': 1.2,
+    'telegram': 0.08,
+    'wikipedia': 0.1
+}
+
+ARTISTS = [
+    'The Offline Band', 'Stand-In Quartet', 'Cache Money', 'Null Pointer Sisters',
+    'Deterministic Drums', 'Seeded Soul', 'Mock Orchestra', 'Latency Kings'
+]
+WORDS = (
+    'the song was recorded in a single night and became a staple of late night radio '
+    'its producers layered guitars synths and strings over a steady groove while the lyrics '
+    'reflect on distance memory and the cities the band toured before the album was released'
+).split()
+
+
+def _stable_hash(value: str) -> int:
+    return zlib.crc32(value.encode('utf-8'))
+
+
+class LatencyModel:
+    """
+    Lognormal latency distribution around a median, seeded for reproducibility.
+    """
+    def __init__(self, median: float, sigma: float = 0.4, seed: int = 0, scale: float = 1.0):
+        """
+        Args:
+            median: Median latency in seconds
+            sigma: Spread of the underlying normal distribution, larger means a longer tail
+            seed: Seed of the random generator
+            scale: Multiplier applied to every sample, 0 disables waiting
+        """
+        self.median = median
+        self.sigma = sigma
+        self.scale = scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            return self.median * self._random.lognormvariate(0.0, self.sigma) * self.scale
+
+    def wait(self) -> None:
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self) -> None:
+        delay = self.sample()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class OfflineSpotifyClient:
+    """
+    Stand-in for spotipy.Spotify generating a deterministic catalog per genre.
+    """
+    def __init__(self, latency: LatencyModel, catalog_size: int = 1000):
+        self.latency = latency
+        self.catalog_size = catalog_size
+        self._auth_manager = SimpleNamespace(client_id='offline')
+        # Every track handed out, so tracks() can look them up by ID
+        self._tracks: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _track(self, genre: str, index: int) -> Dict:
+        seed = _stable_hash(f"{genre}:{index}")
+        track_id = f"{seed:08x}{index:06d}"[:22]
+        artist_index = seed % len(ARTISTS)
+        year = 1960 + seed % 64
+        track = {
+            'id': track_id,
+            'name': f"{genre.title()} Song {index}",
+            'artists': [{'id': f"artist{artist_index}", 'name': ARTISTS[artist_index]}],
+            'album': {
+                'name': f"{genre.title()} Album {index // 10}",
+                'release_date': f"{year}-01-01"
+            },
+            'external_urls': {'spotify': f"https://open.spotify.com/track/{track_id}"},
+            'popularity': seed % 101,
+            'duration_ms': 120000 + seed % 240000
+        }
+        with self._lock:
+            self._tracks[track_id] = track
+        return track
+
+    def search(self, q: str, limit: int = 10, offset: int = 0, type: str = 'track', **kwargs) -> Dict:
+        self.latency.wait()
+        genre = q.split('genre:', 1)[1] if 'genre:' in q else 'test'
+        end = min(offset + limit, self.catalog_size)
+        return {'tracks': {'items': [self._track(genre, i) for i in range(offset, end)]}}
+
+    def tracks(self, tracks, **kwargs) -> Dict:
+        self.latency.wait()
+        with self._lock:
+            return {'tracks': [self._tracks.get(track_id) for track_id in tracks]}
+
+    def new_releases(self, limit: int = 20, offset: int = 0, **kwargs) -> Dict:
+        self.latency.wait()
+        return {'albums': {'items': [{'id': f"release{i}"} for i in range(offset, offset + limit)]}}
+
+    def albums(self, albums, **kwargs) -> Dict:
+        self.latency.wait()
+        return {'albums': [{
+            'id': album_id,
+            # Album listings carry simplified tracks, without album or popularity
+            'tracks': {'items': [{'id': self._track('new', int(album_id[7:]) * 10 + i)['id']} for i in range(10)]}
+        } for album_id in albums]}
+
+    def categories(self, limit: int = 20, **kwargs) -> Dict:
+        self.latency.wait()
+        genres = ['party', 'chill', 'focus', 'workout', 'romance', 'decades'][:limit]
+        return {'categories': {'items': [{'id': genre, 'name': genre.title()} for genre in genres]}}
+
+    def category_playlists(self, category_id: str, limit: int = 20, **kwargs) -> Dict:
+        self.latency.wait()
+        return {'playlists': {'items': [{'id': f"{category_id}:{i}"} for i in range(limit)]}}
+
+    def playlist_items(self, playlist_id: str, limit: int = 100, offset: int = 0, **kwargs) -> Dict:
+        self.latency.wait()
+        category, number = playlist_id.split(':')
+        start = int(number) * 50 + offset
+        return {'items': [{'track': self._track(category, i)} for i in range(start, start + min(limit, 50))]}
+
+    def artist_top_tracks(self, artist_id: str, country: str = 'US') -> Dict:
+        self.latency.wait()
+        return {'tracks': [self._track(artist_id, i) for i in range(10)]}
+
+    def audio_features(self, tracks) -> list:
+        self.latency.wait()
+        ids = [tracks] if isinstance(tracks, str) else tracks
+        return [{
+            'id': track_id,
+            'energy': (_stable_hash(track_id) % 1000) / 1000,
+            'danceability': (_stable_hash(track_id + 'd') % 1000) / 1000,
+            'tempo': 60 + _stable_hash(track_id + 't') % 140
+        } for track_id in ids]
+
+
+class OfflineResponse:
+    """
+    Stand-in for requests.Response carrying a JSON body.
+    """
+    def __init__(self, payload: Dict, status_code: int = 200):
+        self.status_code = status_code
+        self.text = json.dumps(payload)
+
+    def json(self) -> Dict:
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        return None
+
+
+class OfflineGeniusSession:
+    """
+    Stand-in for the requests module as used by GeniusService.
+    A deterministic share of searches has no hits.
+    """
+    def __init__(self, latency: LatencyModel, hit_rate: float = 0.8):
+        self.latency = latency
+        self.hit_rate = hit_rate
+        self._songs: Dict[int, str] = {}
+
+    def get(self, url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None,
+            timeout: Optional[float] = None) -> OfflineResponse:
+        self.latency.wait()
+        if url.endswith('/search'):
+            return OfflineResponse(self._search(params['q']))
+        path = url.rsplit('/', 2)
+        if path[-2] == 'songs':
+            return OfflineResponse(self._song(int(path[-1])))
+        if path[-2] == 'artists' and int(path[-1]) < len(ARTISTS):
+            return OfflineResponse(self._artist(int(path[-1])))
+        return OfflineResponse({'response': {}}, status_code=404)
+
+    def _search(self, query: str) -> Dict:
+        song_id = _stable_hash(query)
+        if song_id % 100 >= self.hit_rate * 100:
+            return {'response': {'hits': []}}
+        self._songs[song_id] = query
+        return {'response': {'hits': [{'result': {'id': song_id, 'title': query}}]}}
+
+    def _song(self, song_id: int) -> Dict:
+        query = self._songs.get(song_id, f"Song {song_id}")
+        artist = ARTISTS[song_id % len(ARTISTS)]
+        rng = random.Random(song_id)
+        description = ' '.join(rng.choice(WORDS) for _ in range(150 + song_id % 150))
+        return {'response': {'song': {
+            'title': query,
+            'primary_artist': {'id': song_id % len(ARTISTS), 'name': artist},
+            'album': {'name': f"{artist} Collection"},
+            'release_date_for_display': f"January 1, {1960 + song_id % 64}",
+            'url': f"https://genius.com/songs/{song_id}",
+            'description': {'plain': description},
+            'producer_artists': [{'name': rng.choice(ARTISTS)}],
+            'writer_artists': [{'name': rng.choice(ARTISTS)} for _ in range(2)],
+            'featured_artists': [],
+            'genres': [{'name': rng.choice(['Rock', 'Pop', 'Jazz', 'Electronic'])}],
+            'tags': [{'name': rng.choice(['Classic', 'Synthwave', 'Ballad', 'Live'])}]
+        }}}
+
+    @staticmethod
+    def _artist(artist_id: int) -> Dict:
+        name = ARTISTS[artist_id]
+        rng = random.Random(artist_id)
+        return {'response': {'artist': {
+            'id': artist_id,
+            'name': name,
+            'alternate_names': [name.replace('The ', '')] if name.startswith('The ') else [],
+            'description': {'plain': ' '.join(rng.choice(WORDS) for _ in range(60))},
+            'instagram_name': name.lower().replace(' ', ''),
+            'twitter_name': None,
+            'facebook_name': None,
+            'followers_count': rng.randrange(10000)
+        }}}
+
+
+class OfflinePage:
+    """
+    Stand-in for requests.Response carrying an HTML page.
+    """
+    def __init__(self, text: str, status_code: int = 200):
+        self.status_code = status_code
+        self.text = text
+
+    def raise_for_status(self) -> None:
+        return None
+
+
+class OfflineWikipediaSession:
+    """
+    Stand-in for the requests module as used by WikipediaService. Articles are shaped
+    like Wikipedia's, with navigation, an infobox and cited paragraphs, so parsing
+    them costs about what parsing the real ones does. A deterministic share of
+    artists has no article.
+    """
+    def __init__(self, latency: LatencyModel, hit_rate: float = 0.75, paragraphs: int = 12):
+        self.latency = latency
+        self.hit_rate = hit_rate
+        self.paragraphs = paragraphs
+
+    def get(self, url: str, headers: Optional[Dict] = None, timeout: Optional[float] = None) -> OfflinePage:
+        self.latency.wait()
+        artist = unquote(url.rsplit('/', 1)[-1]).replace('_', ' ')
+        if _stable_hash(artist) % 100 >= self.hit_rate * 100:
+            return OfflinePage("<html><body><p>Wikipedia does not have an article with this exact name.</p></body></html>",
+                               status_code=404)
+        return OfflinePage(self._article(artist))
+
+    def _article(self, artist: str) -> str:
+        rng = random.Random(artist)
+        navigation = ''.join(f'<li><a href="/wiki/Section_{i}">Section {i}</a></li>' for i in range(30))
+        infobox = ''.join(f'<tr><th scope="row">{label}</th><td>{rng.choice(WORDS)} {rng.choice(WORDS)}</td></tr>'
+                          for label in ('Origin', 'Genres', 'Years active', 'Labels', 'Members'))
+        paragraphs = ''.join(
+            '<p>' + ' '.join(
+                f'<a href="/wiki/{word}">{word}</a>' if rng.random() < 0.1 else word
+                for word in (rng.choice(WORDS) for _ in range(80))
+            ) + f'<sup class="reference"><a href="#cite_note-{i}">[{i}]</a></sup></p>'
+            for i in range(1, self.paragraphs + 1)
+        )
+        return (f'<html><head><title>{artist} - Wikipedia</title></head><body>'
+                f'<nav><ul>{navigation}</ul></nav>'
+                f'<div id="content"><h1>{artist}</h1><div class="mw-parser-output">'
+                f'<table class="infobox">{infobox}</table>'
+                f'<p class="mw-empty-elt"></p>'
+                f'<p><b>{artist}</b> is a band whose {rng.choice(WORDS)} {rng.choice(WORDS)} '
+                f'shaped its records.</p>{paragraphs}'
+                f'</div></div></body></html>')
+
+
+class OfflineGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel returning a summary derived from the prompt.
+    """
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    def generate_content(self, prompt: str, **kwargs) -> SimpleNamespace:
+        self.latency.wait()
+        return self._response(prompt)
+
+    async def generate_content_async(self, prompt: str, **kwargs) -> SimpleNamespace:
+        await self.latency.wait_async()
+        return self._response(prompt)
+
+    @staticmethod
+    def _response(prompt: str) -> SimpleNamespace:
+        title = prompt.split('Title: ', 1)[-1].split('\n', 1)[0]
+        return SimpleNamespace(text=f"An offline summary of {title}.")
+
+
+class OfflineBot:
+    """
+    Stand-in for telegram.Bot that records sent messages.
+    """
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.sent = []
+
+    async def send_message(self, chat_id, text: str, **kwargs) -> SimpleNamespace:
+        await self.latency.wait_async()
+        self.sent.append((chat_id, text))
+        return SimpleNamespace(message_id=len(self.sent), chat_id=chat_id)
+
+
+class OfflineMessage:
+    """
+    Stand-in for the telegram.Message of an incoming command, recording replies.
+    """
+    def __init__(self, latency: LatencyModel, chat_id: int = 0):
+        self.latency = latency
+        self.chat_id = chat_id
+        self.replies = []
+
+    async def reply_text(self, text: str, **kwargs) -> SimpleNamespace:
+        await self.latency.wait_async()
+        self.replies.append(text)
+        return SimpleNamespace(message_id=len(self.replies), chat_id=self.chat_id)
+
+
+def offline_update(update_id: int, message: OfflineMessage, args=()) -> tuple:
+    """
+    Build the (update, context) pair a command handler is called with.
+    """
+    update = SimpleNamespace(update_id=update_id, effective_message=message,
+                             effective_chat=SimpleNamespace(id=message.chat_id))
+    return update, SimpleNamespace(args=list(args))
+
+
+def build_offline_services(seed: int = 0, latency_scale: float = 1.0,
+                           latencies: Optional[Dict[str, float]] = None, cached: bool = False) -> Dict:
+    """
+    Create the pipeline's service dict on top of the offline stand-ins.
+
+    Args:
+        seed: Seed of the simulated latencies and of the genre, offset and track picks
+        latency_scale: Multiplier applied to all latencies, 0 for no waiting at all
+        latencies: Median latency per upstream, overriding DEFAULT_LATENCIES
+        cached: Give the services in-memory caches, as the real ones have
+    """
+    medians = {**DEFAULT_LATENCIES, **(latencies or {})}
+    latency = {
+        name: LatencyModel(median, seed=seed + i, scale=latency_scale)
+        for i, (name, median) in enumerate(sorted(medians.items()))
+    }
+
+    def cache(namespace):
+        return Cache(':memory:', namespace) if cached else None
+
+    gemini = GeminiService(api_key='offline', cache=cache('summaries'))
+    gemini.model = OfflineGenerativeModel(latency['gemini'])
+    gemini.fallback_model = OfflineGenerativeModel(latency['gemini'])
+    telegram = TelegramService(bot_token='offline', channel_id='offline')
+    telegram.bot = OfflineBot(latency['telegram'])
+
+    spotify = SpotifyService(OfflineSpotifyClient(latency['spotify']), cache=cache('spotify'),
+                             rng=random.Random(seed))
+    genius = GeniusService(access_token='offline', session=OfflineGeniusSession(latency['genius']),
+                           cache=cache('genius'), artist_cache=cache('genius_artists'))
+    wikipedia = WikipediaService(session=OfflineWikipediaSession(latency['wikipedia']), cache=cache('wikipedia'))
+
+    return {
+        'spotify': spotify,
+        'harvest': HarvestService(spotify),
+        'genius': genius,
+        'wikipedia': wikipedia,
+        'enrichment': EnrichmentService(genius, wikipedia),
+        'gemini': gemini,
+        'telegram': telegram,
+        'selection': SelectionService()
+    }
@@ -0,0 +1,100 @@
+import json
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+from src.services import backfill_service
+from src.services.backfill_service import BackfillService, run_sharded
+
+def make_songs(genre, offset, count=3):
+    return [{
+        'id': f'{genre}-{offset + i}',
+        'name': f'Song {offset + i}',
+        'artist': 'Test Artist',
+        'genre': genre
+    } for i in range(count)]
+
+@pytest.fixture
+def services():
+    spotify = Mock()
+    spotify.genres = ['rock', 'jazz']
+    spotify.get_candidate_songs.side_effect = lambda limit, genre, offset: make_songs(genre, offset)
+    genius = Mock()
+    genius.get_song_info.return_value = {'title': 'Test Song', 'description': 'Test description'}
+    gemini = Mock()
+    gemini.summarize_info.return_value = "Test summary"
+    return {'spotify': spotify, 'genius': genius, 'gemini': gemini}
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def test_run_writes_requested_posts(services, tmp_path):
+    output = str(tmp_path / 'backfill.jsonl')
+    
+    completed = BackfillService(services, output, workers=2).run(5)
+    
+    assert completed == 5
+    records = read_jsonl(output)
+    assert len(records) == 5
+    assert records[0]['summary'] == "Test summary"
+    assert len({record['song']['id'] for record in records}) == 5
+
+def test_run_skips_misses_and_errors(services, tmp_path):
+    output = str(tmp_path / 'backfill.jsonl')
+    services['genius'].get_song_info.side_effect = [None, Exception("API Error")] + [{'title': 'x'}] * 10
+    
+    completed = BackfillService(services, output, workers=1).run(2)
+    
+    assert completed == 2
+    statuses = [entry['status'] for entry in read_jsonl(output + '.checkpoint')]
+    assert statuses == ['miss', 'error', 'ok', 'ok']
+
+def test_run_resumes_from_checkpoint(services, tmp_path):
+    output = str(tmp_path / 'backfill.jsonl')
+    BackfillService(services, output, workers=1).run(2)
+    services['genius'].get_song_info.reset_mock()
+    
+    completed = BackfillService(services, output, workers=1).run(4)
+    
+    assert completed == 4
+    assert services['genius'].get_song_info.call_count == 2
+    assert len({record['song']['id'] for record in read_jsonl(output)}) == 4
+
+def test_shards_do_not_overlap(services, tmp_path):
+    ids = []
+    for shard in range(2):
+        output = str(tmp_path / f'shard{shard}.jsonl')
+        BackfillService(services, output, workers=1, shard_index=shard, shard_count=2).run(3)
+        ids.extend(record['song']['id'] for record in read_jsonl(output))
+    
+    assert len(ids) == len(set(ids)) == 6
+
+def test_shards_fetch_separate_pages(services, tmp_path):
+    pages = []
+    for shard in range(2):
+        services['spotify'].get_candidate_songs.reset_mock()
+        BackfillService(services, str(tmp_path / f'shard{shard}.jsonl'), workers=1,
+                        shard_index=shard, shard_count=2).run(3)
+        pages.append({(call.kwargs['genre'], call.kwargs['offset'])
+                      for call in services['spotify'].get_candidate_songs.call_args_list})
+    
+    assert pages == [{('rock', 0)}, {('jazz', 0)}]
+
+def test_posts_past_the_target_are_not_written(services, tmp_path):
+    output = str(tmp_path / 'backfill.jsonl')
+    backfill = BackfillService(services, output, workers=1)
+    backfill.target = 1
+    
+    assert [backfill._process(song) for song in make_songs('rock', 0, 2)] == ['ok', 'surplus']
+    assert len(read_jsonl(output)) == 1
+    assert [entry['id'] for entry in read_jsonl(output + '.checkpoint')] == ['rock-0']
+
+def test_run_sharded_passes_stage_limits(monkeypatch, tmp_path):
+    limits = []
+    monkeypatch.setattr(backfill_service, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(BackfillService, 'run', lambda self, count: limits.append(self.limiter.limits) or count)
+
+    completed = run_sharded(dict, str(tmp_path / 'backfill.jsonl'), 5, 2, limits={'genius': 1, 'gemini': 3})
+
+    assert completed == [3, 2]
+    assert [(shard['genius'], shard['gemini']) for shard in limits] == [(1, 3), (1, 3)]
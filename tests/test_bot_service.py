@@ -0,0 +1,81 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.services.bot_service import SongBotService
+from src.services.broadcast_service import SubscriberStore
+from src.utils.stand_ins import build_offline_services
+
+@pytest.fixture
+def services():
+    return build_offline_services(latency_scale=0, cached=True)
+
+@pytest.fixture
+def bot_service(services):
+    return SongBotService(services)
+
+def make_update():
+    update = Mock()
+    update.effective_message.reply_text = AsyncMock()
+    return update
+
+@pytest.mark.asyncio
+async def test_song_for_genre(bot_service):
+    reply = await bot_service.song_for('jazz')
+    
+    assert "Your Song" in reply
+    assert "Jazz Song" in reply
+    assert "An offline summary of" in reply
+
+@pytest.mark.asyncio
+async def test_popular_genre_is_answered_from_cache(bot_service, services):
+    bot_service._shuffled = lambda songs: songs
+    first = await bot_service.song_for('rock')
+    services['spotify'].sp.search = Mock()
+    services['genius'].session.get = Mock()
+    services['gemini'].model.generate_content = Mock()
+    
+    second = await bot_service.song_for('rock')
+    
+    assert second == first
+    services['spotify'].sp.search.assert_not_called()
+    services['genius'].session.get.assert_not_called()
+    services['gemini'].model.generate_content.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_handle_song_unknown_genre(bot_service):
+    update = make_update()
+    context = Mock(args=['polka'])
+    
+    await bot_service.handle_song(update, context)
+    
+    reply = update.effective_message.reply_text.call_args[0][0]
+    assert "rock" in reply
+
+@pytest.mark.asyncio
+async def test_handle_song_error_reply(bot_service, services):
+    services['spotify'].get_candidate_batch = Mock(side_effect=Exception("API Error"))
+    update = make_update()
+    context = Mock(args=['rock'])
+    
+    await bot_service.handle_song(update, context)
+    
+    reply = update.effective_message.reply_text.call_args[0][0]
+    assert "Sorry" in reply
+
+def test_build_application(bot_service):
+    application = bot_service.build_application("123:test_token")
+    
+    commands = {command for handlers in application.handlers.values() for handler in handlers for command in handler.commands}
+    assert {'song', 'start', 'help'} <= commands
+
+@pytest.mark.asyncio
+async def test_subscribe_and_unsubscribe(services):
+    subscribers = SubscriberStore()
+    bot_service = SongBotService(services, subscribers=subscribers)
+    update = make_update()
+    update.effective_chat.id = 42
+    
+    await bot_service.handle_subscribe(update, Mock())
+    assert 42 in subscribers
+    
+    await bot_service.handle_unsubscribe(update, Mock())
+    assert 42 not in subscribers
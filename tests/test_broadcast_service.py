@@ -0,0 +1,137 @@
+import os
+import time
+import pytest
+from unittest.mock import AsyncMock
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError, TimedOut
+from src.services.broadcast_service import BroadcastProgress, BroadcastService, SubscriberStore
+
+@pytest.fixture
+def subscribers(tmp_path):
+    store = SubscriberStore(str(tmp_path / 'subscribers.sqlite3'))
+    for chat_id in range(1, 11):
+        store.add(chat_id)
+    return store
+
+@pytest.fixture
+def bot():
+    bot = AsyncMock()
+    bot.send_message.return_value = None
+    return bot
+
+def sent_chats(bot):
+    return [call.kwargs['chat_id'] for call in bot.send_message.call_args_list]
+
+def test_subscriber_store_is_persistent(subscribers):
+    assert not subscribers.add(5)
+    assert subscribers.remove(5)
+    assert 5 not in subscribers
+    assert 6 in subscribers
+    
+    reloaded = SubscriberStore(subscribers.path)
+    reloaded.PAGE_SIZE = 4
+    
+    assert list(reloaded) == [1, 2, 3, 4, 6, 7, 8, 9, 10]
+    assert len(reloaded) == 9
+
+def test_subscriber_store_keeps_changes_of_other_processes(subscribers):
+    # The bot serving /subscribe and a broadcast removing blocked chats open the file separately
+    serving = SubscriberStore(subscribers.path)
+    subscribers.remove(2, save=False)
+    serving.add(11)
+    subscribers.save()
+    serving.add(12)
+    
+    assert list(SubscriberStore(subscribers.path)) == [1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+
+@pytest.mark.asyncio
+async def test_broadcast_sends_to_everyone(subscribers, bot):
+    service = BroadcastService(bot, subscribers, rate=1000, concurrency=4)
+    
+    counts = await service.broadcast("Test message")
+    
+    assert counts == {'sent': 10, 'blocked': 0, 'failed': 0, 'skipped': 0}
+    assert sorted(sent_chats(bot)) == list(range(1, 11))
+    assert bot.send_message.call_args.kwargs['text'] == "Test message"
+
+@pytest.mark.asyncio
+async def test_broadcast_respects_rate(subscribers, bot):
+    service = BroadcastService(bot, subscribers, rate=50, concurrency=10)
+    
+    start = time.monotonic()
+    await service.broadcast("Test message")
+    
+    assert time.monotonic() - start >= 9 / 50 - 0.01
+
+@pytest.mark.asyncio
+async def test_broadcast_handles_errors(subscribers, bot):
+    def send(chat_id, text, parse_mode):
+        if chat_id == 2:
+            raise Forbidden("bot was blocked by the user")
+        if chat_id == 3:
+            raise BadRequest("Chat not found")
+        if chat_id == 4 and not send.retried:
+            send.retried = True
+            raise RetryAfter(0)
+        if chat_id == 5:
+            raise BadRequest("Message is too long")
+        if chat_id == 6:
+            raise TelegramError("Unexpected error")
+    send.retried = False
+    bot.send_message.side_effect = send
+    service = BroadcastService(bot, subscribers, rate=1000, concurrency=2)
+    
+    counts = await service.broadcast("Test message")
+    
+    assert counts == {'sent': 6, 'blocked': 2, 'failed': 2, 'skipped': 0}
+    assert 2 not in SubscriberStore(subscribers.path)
+    assert 3 not in subscribers
+
+@pytest.mark.asyncio
+async def test_broadcast_resumes_from_progress(subscribers, bot, tmp_path):
+    progress_path = str(tmp_path / 'run.done')
+    calls = []
+    
+    def send(chat_id, text, parse_mode):
+        calls.append(chat_id)
+        if chat_id == 8:
+            raise TimedOut()
+    bot.send_message.side_effect = send
+    service = BroadcastService(bot, subscribers, rate=1000, concurrency=1, max_attempts=1)
+    first = await service.broadcast("Test message", progress_path)
+    bot.send_message.side_effect = None
+    bot.send_message.reset_mock()
+    
+    second = await service.broadcast("Test message", progress_path)
+    
+    assert first['failed'] == 1
+    assert second == {'sent': 1, 'blocked': 0, 'failed': 0, 'skipped': 9}
+    assert sent_chats(bot) == [8]
+
+def test_progress_is_written_on_every_mark(tmp_path):
+    progress_path = str(tmp_path / 'run.done')
+    progress = BroadcastProgress(progress_path)
+    
+    progress.mark(1)
+    progress.mark(2)
+    
+    assert 2 in BroadcastProgress(progress_path)
+    assert os.path.getsize(progress_path) == 2 * 8
+
+@pytest.mark.asyncio
+async def test_broadcast_sends_photo_by_file_id(subscribers, bot):
+    service = BroadcastService(bot, subscribers, rate=1000, concurrency=4)
+    
+    counts = await service.broadcast("Test message", photo="file-123")
+    
+    assert counts['sent'] == 10
+    bot.send_message.assert_not_called()
+    assert {call.kwargs['photo'] for call in bot.send_photo.call_args_list} == {"file-123"}
+
+@pytest.mark.asyncio
+async def test_broadcast_shards_split_subscribers(subscribers, bot):
+    service = BroadcastService(bot, subscribers, rate=1000, concurrency=4)
+
+    for index in range(3):
+        await service.broadcast("Test message", shard=(index, 3))
+
+    assert sorted(sent_chats(bot)) == list(range(1, 11))
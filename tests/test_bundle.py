@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import tarfile
+import pytest
+from src.utils.bundle import BUNDLE_VERSION, export_bundle, import_bundle, read_manifest
+from src.utils.cache import Cache
+from src.utils.ledger import RunLedger, RunRecord
+
+@pytest.fixture
+def source(tmp_path):
+    data_dir = str(tmp_path / 'source')
+    os.makedirs(data_dir)
+    cache = Cache(os.path.join(data_dir, 'cache.sqlite3'), 'genius')
+    cache.set('test song|test artist', {'title': 'Test Song'})
+    cache.set('old song|test artist', {'title': 'Old Song'}, ttl=-1)
+    RunLedger(os.path.join(data_dir, 'ledger.sqlite3')).append(RunRecord('2024-01-01'))
+    with open(os.path.join(data_dir, 'hit_stats.json'), 'w') as f:
+        json.dump({'genres': {'jazz': [1, 2]}, 'popularity': {}}, f)
+    # The connections stay open, the export must not need them closed
+    return data_dir, cache
+
+def rewrite(path, change):
+    """
+    Rebuild a bundle with change(name, data) applied to each member's bytes.
+    """
+    with tarfile.open(path, 'r:gz') as tar:
+        members = [(member.name, tar.extractfile(member).read()) for member in tar.getmembers()]
+    with tarfile.open(path, 'w:gz') as tar:
+        for name, data in members:
+            data = change(name, data)
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+def test_round_trip(source, tmp_path):
+    data_dir, _ = source
+    bundle = str(tmp_path / 'stores.tar.gz')
+    target = str(tmp_path / 'target')
+
+    manifest = export_bundle(bundle, data_dir)
+    restored = import_bundle(bundle, target)
+
+    assert sorted(manifest['stores']) == ['cache', 'hit_stats', 'ledger']
+    assert sorted(restored) == ['cache', 'hit_stats', 'ledger']
+    cache = Cache(os.path.join(target, 'cache.sqlite3'), 'genius')
+    assert cache.get('test song|test artist') == {'title': 'Test Song'}
+    # Expired entries are left behind
+    assert len(cache) == 1
+    assert len(RunLedger(os.path.join(target, 'ledger.sqlite3')).runs()) == 1
+    with open(os.path.join(target, 'hit_stats.json')) as f:
+        assert json.load(f)['genres'] == {'jazz': [1, 2]}
+    assert not os.path.exists(bundle + '.tmp')
+
+def test_partial_import(source, tmp_path):
+    data_dir, _ = source
+    bundle = str(tmp_path / 'stores.tar.gz')
+    target = str(tmp_path / 'target')
+    export_bundle(bundle, data_dir)
+
+    assert import_bundle(bundle, target, ['ledger']) == ['ledger']
+    assert os.listdir(target) == ['ledger.sqlite3']
+    with pytest.raises(ValueError):
+        import_bundle(bundle, target, ['subscribers'])
+    with pytest.raises(ValueError):
+        import_bundle(bundle, target, ['lyrics'])
+
+def test_import_replaces_database_and_its_wal(source, tmp_path):
+    data_dir, _ = source
+    bundle = str(tmp_path / 'stores.tar.gz')
+    export_bundle(bundle, data_dir, ['cache'])
+    target = str(tmp_path / 'target')
+    os.makedirs(target)
+    stale = Cache(os.path.join(target, 'cache.sqlite3'), 'genius')
+    stale.set('stale song|test artist', {'title': 'Stale'})
+    assert os.path.exists(os.path.join(target, 'cache.sqlite3-wal'))
+
+    import_bundle(bundle, target)
+
+    cache = Cache(os.path.join(target, 'cache.sqlite3'), 'genius')
+    assert cache.get('stale song|test artist') is None
+    assert cache.get('test song|test artist') == {'title': 'Test Song'}
+
+def test_checksum_mismatch_replaces_nothing(source, tmp_path):
+    data_dir, _ = source
+    bundle = str(tmp_path / 'stores.tar.gz')
+    export_bundle(bundle, data_dir)
+    rewrite(bundle, lambda name, data: data.replace(b'jazz', b'rock') if name == 'stores/hit_stats.json' else data)
+    target = str(tmp_path / 'target')
+    os.makedirs(target)
+    RunLedger(os.path.join(target, 'ledger.sqlite3'))
+
+    with pytest.raises(ValueError, match='hit_stats'):
+        import_bundle(bundle, target)
+
+    assert not [name for name in os.listdir(target) if name.endswith('.import')]
+    assert not os.path.exists(os.path.join(target, 'hit_stats.json'))
+    assert RunLedger(os.path.join(target, 'ledger.sqlite3')).runs() == []
+
+def test_incompatible_bundle(source, tmp_path):
+    data_dir, _ = source
+    bundle = str(tmp_path / 'stores.tar.gz')
+    export_bundle(bundle, data_dir)
+    rewrite(bundle, lambda name, data: json.dumps({**json.loads(data), 'version': BUNDLE_VERSION + 1}).encode()
+            if name == 'manifest.json' else data)
+
+    with pytest.raises(ValueError, match='version'):
+        read_manifest(bundle)
+    with open(bundle, 'wb') as f:
+        f.write(b'not a bundle')
+    with pytest.raises(ValueError):
+        import_bundle(bundle, str(tmp_path / 'target'))
@@ -0,0 +1,33 @@
+import pytest
+from src.utils.cache import Cache, cache_key
+
+@pytest.fixture
+def cache(tmp_path):
+    return Cache(str(tmp_path / 'cache.sqlite3'), 'test')
+
+def test_cache_key_is_normalized():
+    assert cache_key('  Test   Song ', 'TEST Artist') == cache_key('test song', 'test artist')
+
+def test_set_and_get(cache):
+    cache.set('key', {'title': 'Test Song', 'tags': ['Classic']})
+    
+    assert cache.get('key') == {'title': 'Test Song', 'tags': ['Classic']}
+    assert cache.get('missing', 'default') == 'default'
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+def test_expired_entries(cache):
+    cache.set('key', 'value', ttl=-1)
+    
+    assert cache.get('key') is None
+    assert cache.prune() == 1
+    assert len(cache) == 0
+
+def test_namespaces_share_a_file(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    genius = Cache(path, 'genius')
+    summaries = Cache(path, 'summaries')
+    genius.set('key', 'genius value')
+    
+    assert summaries.get('key') is None
+    assert Cache(path, 'genius').get('key') == 'genius value'
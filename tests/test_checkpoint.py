@@ -0,0 +1,111 @@
+import pytest
+from unittest.mock import Mock
+from src.utils.checkpoint import CheckpointStore
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / 'checkpoints'))
+
+@pytest.fixture
+def main_module():
+    # main configures its clients at import time, so import it once the env is mocked
+    import main
+    return main
+
+@pytest.fixture
+def services():
+    genius = Mock()
+    genius.get_song_info.return_value = {'title': 'Test Song', 'description': 'Test description'}
+    gemini = Mock()
+    gemini.summarize_tiered.return_value = "Test summary"
+    return {'genius': genius, 'gemini': gemini, 'telegram': Mock()}
+
+song = {'id': '123', 'name': 'Test Song', 'artist': 'Test Artist'}
+
+def test_save_and_reload(store):
+    run = store.run('2024-01-01')
+    run.begin(song)
+    run.save('genius', {'title': 'Test Song'})
+    
+    reloaded = store.run('2024-01-01')
+    
+    assert reloaded.get('track') == song
+    assert reloaded.get('genius') == {'title': 'Test Song'}
+    assert reloaded.last_stage() == 'genius'
+    assert not reloaded.completed('summary')
+
+def test_begin_with_other_song_resets_stages(store):
+    run = store.run('run')
+    run.begin(song)
+    run.save('genius', {'title': 'Test Song'})
+    
+    run.begin({'id': '456', 'name': 'Other Song', 'artist': 'Test Artist'})
+    
+    assert run.get('track')['id'] == '456'
+    assert not run.completed('genius')
+
+def test_unknown_stage(store):
+    with pytest.raises(ValueError):
+        store.run('run').save('lyrics', 'la la')
+
+def test_process_song_resumes_after_send_failure(main_module, services, store):
+    services['telegram'].send_song_info.side_effect = [Exception("Telegram down"), None]
+    
+    with pytest.raises(main_module.PostFailed):
+        main_module.process_song(services, song, store.run('run'))
+    assert main_module.process_song(services, song, store.run('run'))
+    
+    assert services['genius'].get_song_info.call_count == 1
+    assert services['gemini'].summarize_tiered.call_count == 1
+    assert store.run('run').completed('sent')
+
+def test_daily_song_task_stops_when_send_fails(main_module, services, store):
+    services['telegram'].send_song_info.side_effect = [Exception("Telegram down"), None]
+    services['spotify'] = Mock()
+    services['spotify'].get_multiple_songs.return_value = [song, {**song, 'id': '456'}]
+    services['spotify'].order_by_hit_rate.side_effect = lambda songs: songs
+    
+    with pytest.raises(SystemExit):
+        main_module.daily_song_task(services, store.run('run'))
+    
+    assert services['gemini'].summarize_tiered.call_count == 1
+    services['telegram'].send_error_message.assert_not_called()
+    run = store.run('run')
+    assert run.get('track')['id'] == '123'
+    assert run.get('summary') == "Test summary"
+    
+    assert main_module.daily_song_task(services, run) == 'posted'
+    
+    assert services['genius'].get_song_info.call_count == 1
+    assert services['gemini'].summarize_tiered.call_count == 1
+    assert services['telegram'].send_song_info.call_args[0][0]['id'] == '123'
+
+def test_daily_song_task_skips_sent_run(main_module, services, store):
+    run = store.run('run')
+    run.begin(song)
+    run.save('sent', True)
+    services['spotify'] = Mock()
+    
+    assert main_module.daily_song_task(services, run) == 'skipped'
+    
+    services['spotify'].get_multiple_songs.assert_not_called()
+    services['telegram'].send_song_info.assert_not_called()
+
+def test_daily_song_task_speculates_over_matched_candidates(main_module, services, store):
+    other = {'id': '456', 'name': 'Other Song', 'artist': 'Test Artist'}
+    services['genius'].get_song_info.side_effect = [None, {'title': 'Test Song'}, {'title': 'Other Song'}]
+    services['gemini'].summarize_speculative.return_value = (1, "Other summary")
+    services['spotify'] = Mock()
+    services['spotify'].get_multiple_songs.return_value = [{**song, 'id': '000'}, song, other]
+    services['spotify'].order_by_hit_rate.side_effect = lambda songs: songs
+    run = store.run('run')
+    
+    assert main_module.daily_song_task(services, run, speculate=2) == 'posted'
+    
+    candidates = services['gemini'].summarize_speculative.call_args[0][0]
+    assert [candidate['id'] for candidate, _ in candidates] == ['123', '456']
+    services['telegram'].send_song_info.assert_called_once()
+    assert services['telegram'].send_song_info.call_args[0][:3] == (other, {'title': 'Other Song'}, "Other summary")
+    assert run.get('track') == other
+    assert run.completed('sent')
+    services['gemini'].summarize_tiered.assert_not_called()
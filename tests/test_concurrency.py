@@ -0,0 +1,186 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import pytest
+from src.utils.concurrency import AsyncRateLimiter, SingleFlight, StageLimiter
+from src.utils.deadline import DeadlineExceeded
+
+def test_stage_limit_is_enforced():
+    limiter = StageLimiter({'genius': 2})
+    active = []
+    peak = []
+    lock = threading.Lock()
+    
+    def call():
+        with limiter.stage('genius'):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: call(), range(16)))
+    
+    assert max(peak) == 2
+
+def test_unknown_stage_uses_default():
+    limiter = StageLimiter(default=3)
+    
+    with limiter.stage('wikipedia'):
+        pass
+    
+    assert limiter._semaphores['wikipedia']._initial_value == 3
+
+@pytest.mark.asyncio
+async def test_async_stage_limit_is_enforced():
+    limiter = StageLimiter({'genius': 2})
+    active = []
+    peak = []
+    
+    async def call():
+        async with limiter.async_stage('genius'):
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+    
+    await asyncio.gather(*[call() for _ in range(8)])
+    
+    assert max(peak) == 2
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+@pytest.mark.asyncio
+async def test_rate_limiter_paces_callers(monkeypatch):
+    clock = FakeClock()
+    sleeps = []
+    
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+    monkeypatch.setattr(asyncio, 'sleep', fake_sleep)
+    limiter = AsyncRateLimiter(10, clock=clock)
+    
+    for _ in range(3):
+        await limiter.acquire()
+    
+    assert sleeps == pytest.approx([0.1, 0.1])
+
+@pytest.mark.asyncio
+async def test_rate_limiter_pause(monkeypatch):
+    clock = FakeClock()
+    
+    async def fake_sleep(seconds):
+        clock.now += seconds
+    monkeypatch.setattr(asyncio, 'sleep', fake_sleep)
+    limiter = AsyncRateLimiter(10, clock=clock)
+    
+    limiter.pause(5)
+    await limiter.acquire()
+    
+    assert clock.now == pytest.approx(5)
+
+def test_single_flight_shares_in_flight_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    
+    def slow_lookup(value):
+        calls.append(value)
+        started.set()
+        release.wait()
+        return value * 2
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(flight.do, 'key', slow_lookup, 21)
+        started.wait()
+        followers = [executor.submit(flight.do, 'key', slow_lookup, 21) for _ in range(3)]
+        while flight.stats()['saved'] < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result()] + [future.result() for future in followers]
+    
+    assert results == [42] * 4
+    assert calls == [21]
+    assert flight.stats() == {'calls': 1, 'saved': 3, 'in_flight': 0}
+
+def test_single_flight_propagates_errors():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    
+    def failing_lookup():
+        started.set()
+        release.wait()
+        raise ValueError("API Error")
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, 'key', failing_lookup)
+        started.wait()
+        follower = executor.submit(flight.do, 'key', failing_lookup)
+        while flight.stats()['saved'] < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+    
+    # The failed call is not remembered, the next caller retries
+    assert flight.do('key', lambda: 'ok') == 'ok'
+
+def test_single_flight_different_keys_do_not_wait():
+    flight = SingleFlight()
+    
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.stats()['saved'] == 0
+
+def test_single_flight_follower_waits_only_its_timeout():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    
+    def slow_lookup():
+        started.set()
+        release.wait()
+        return 'slow'
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(flight.do, 'key', slow_lookup)
+        started.wait()
+        with pytest.raises(TimeoutError):
+            flight.do('key', slow_lookup, timeout=0.05)
+        release.set()
+        assert leader.result() == 'slow'
+
+def test_single_flight_follower_retries_after_leader_deadline():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    
+    def out_of_budget():
+        started.set()
+        release.wait()
+        raise DeadlineExceeded("leader ran out of time")
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, 'key', out_of_budget)
+        started.wait()
+        follower = executor.submit(flight.do, 'key', lambda: 'own call', timeout=5)
+        while flight.stats()['saved'] < 1:
+            time.sleep(0.001)
+        release.set()
+        with pytest.raises(DeadlineExceeded):
+            leader.result()
+        assert follower.result() == 'own call'
+    
+    assert flight.stats() == {'calls': 2, 'saved': 0, 'in_flight': 0}
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.utils.coordination import Coordinator, LocalLeaseBackend, SQLiteLeaseBackend, backend_from_url
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture(params=['local', 'sqlite'])
+def backend(request, tmp_path, clock):
+    if request.param == 'local':
+        return LocalLeaseBackend(clock=clock)
+    return SQLiteLeaseBackend(str(tmp_path / 'leases.sqlite3'), clock=clock)
+
+def test_lease_is_exclusive_until_it_expires(backend, clock):
+    token = backend.acquire('daily/run', 'a', ttl=60)
+
+    assert token is not None
+    assert backend.acquire('daily/run', 'b', ttl=60) is None
+    # The holder may take it again without losing it
+    assert backend.acquire('daily/run', 'a', ttl=60) == token + 1
+    clock.now += 61
+    assert backend.acquire('daily/run', 'b', ttl=60) == token + 2
+    assert backend.state('daily/run')['owner'] == 'b'
+
+def test_stale_holder_cannot_renew_or_complete(backend, clock):
+    token = backend.acquire('daily/run', 'a', ttl=60)
+    clock.now += 61
+    backend.acquire('daily/run', 'b', ttl=60)
+
+    assert not backend.renew('daily/run', 'a', token, ttl=60)
+    assert not backend.complete('daily/run', 'a', token)
+    backend.release('daily/run', 'a', token)
+    assert backend.acquire('daily/run', 'c', ttl=60) is None
+
+def test_completed_lease_is_never_granted_again(backend, clock):
+    token = backend.acquire('daily/run', 'a', ttl=60)
+    assert backend.complete('daily/run', 'a', token)
+    clock.now += 3600
+
+    assert backend.acquire('daily/run', 'b', ttl=60) is None
+    assert backend.acquire('daily/run', 'a', ttl=60) is None
+    assert backend.state('daily/run')['done']
+
+def test_released_lease_is_free(backend):
+    token = backend.acquire('daily/run', 'a', ttl=60)
+    backend.release('daily/run', 'a', token)
+
+    assert backend.acquire('daily/run', 'b', ttl=60) is not None
+
+def test_sqlite_leases_are_shared_between_connections(tmp_path):
+    path = str(tmp_path / 'leases.sqlite3')
+    first = Coordinator(SQLiteLeaseBackend(path), owner='a')
+    second = Coordinator(backend_from_url(f"sqlite:{path}"), owner='b')
+
+    with first.lead('daily/run') as lease:
+        assert lease is not None
+        with second.lead('daily/run') as other:
+            assert other is None
+        lease.complete()
+    with second.lead('daily/run') as other:
+        assert other is None
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        backend_from_url('redis://localhost')
+
+def test_lead_releases_unfinished_work(backend):
+    first = Coordinator(backend, owner='a')
+    second = Coordinator(backend, owner='b')
+
+    with pytest.raises(RuntimeError):
+        with first.lead('daily/run') as lease:
+            raise RuntimeError("crashed")
+    with second.lead('daily/run') as lease:
+        assert lease is not None
+
+def test_heartbeat_keeps_lease_alive():
+    backend = LocalLeaseBackend()
+    first = Coordinator(backend, owner='a', ttl=0.3)
+
+    with first.lead('daily/run') as lease:
+        time.sleep(0.6)
+        assert lease.held
+        assert backend.acquire('daily/run', 'b', ttl=0.3) is None
+        assert lease.complete()
+
+def test_shards_are_claimed_once_across_replicas(backend):
+    replicas = [Coordinator(backend, owner=name) for name in 'ab']
+    claimed = []
+
+    def work(coordinator):
+        for lease in coordinator.shards('backfill/run', 8):
+            claimed.append((coordinator.owner, lease.shard))
+            lease.complete()
+
+    threads = [threading.Thread(target=work, args=(coordinator,)) for coordinator in replicas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(shard for _, shard in claimed) == list(range(8))
+    # A finished job has nothing left to claim
+    assert list(replicas[0].shards('backfill/run', 8)) == []
+
+def test_unfinished_shard_stops_claiming(backend):
+    coordinator = Coordinator(backend, owner='a')
+
+    leases = list(coordinator.shards('broadcast/run', 4))
+
+    assert len(leases) == 1
+    assert not backend.state(f"broadcast/run/shard-{leases[0].shard}")['done']
+    assert len(list(Coordinator(backend, owner='b').shards('broadcast/run', 4))) == 1
+
+def test_broadcast_shards_share_one_event_loop(monkeypatch, tmp_path):
+    import main
+    from src.services.broadcast_service import SubscriberStore
+    from src.utils.checkpoint import CheckpointStore
+    monkeypatch.setenv('JUKA_DATA_DIR', str(tmp_path))
+    run = CheckpointStore(str(tmp_path / 'checkpoints')).run('run')
+    run.begin({'id': '123', 'name': 'Test Song', 'artist': 'Test Artist'})
+    run.save('genius', {'title': 'Test Song'})
+    run.save('summary', "Test summary")
+    run.save('sent', True)
+    subscribers = SubscriberStore(str(tmp_path / 'subscribers.sqlite3'))
+    for chat_id in range(1, 7):
+        subscribers.add(chat_id)
+    sends = []
+
+    class Bot:
+        def __init__(self, **kwargs):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+        async def send_message(self, chat_id, text, parse_mode):
+            sends.append((chat_id, asyncio.get_running_loop()))
+
+    monkeypatch.setattr(main, 'Bot', Bot)
+    args = main.parse_args(['--coordination', 'local', '--run-id', 'run', 'broadcast', '--shards', '3'])
+
+    main.run_broadcast(args)
+
+    assert sorted(chat_id for chat_id, _ in sends) == list(range(1, 7))
+    assert len({loop for _, loop in sends}) == 1
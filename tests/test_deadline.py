@@ -0,0 +1,67 @@
+import time
+import pytest
+from src.utils.deadline import Deadline, DeadlineExceeded, call_with_timeout
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_timeout_is_capped_by_remaining_budget(clock):
+    deadline = Deadline(30, clock=clock)
+    
+    assert deadline.timeout(cap=10) == 10
+    clock.now = 25
+    assert deadline.timeout(cap=10) == 5
+    assert deadline.timeout() == 5
+
+def test_timeout_refused_below_minimum(clock):
+    deadline = Deadline(30, clock=clock)
+    clock.now = 29.9
+    
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(minimum=0.5)
+
+def test_stage_accounts_time(clock):
+    deadline = Deadline(30, clock=clock)
+    
+    with deadline.stage('genius'):
+        clock.now = 2
+    with deadline.stage('genius'):
+        clock.now = 3
+    
+    report = deadline.report()
+    assert report['stages'] == {'genius': 3}
+    assert report['remaining'] == 27
+
+def test_stage_refused_without_budget(clock):
+    deadline = Deadline(30, clock=clock)
+    clock.now = 25
+    
+    with pytest.raises(DeadlineExceeded):
+        with deadline.stage('gemini', minimum=10):
+            pass
+    assert 'gemini' not in deadline.spent
+
+def test_call_with_timeout_returns_result():
+    assert call_with_timeout(lambda x: x * 2, 1.0, 21) == 42
+
+def test_call_with_timeout_propagates_errors():
+    def fail():
+        raise ValueError("API Error")
+    
+    with pytest.raises(ValueError):
+        call_with_timeout(fail, 1.0)
+
+def test_call_with_timeout_abandons_hung_call():
+    start = time.perf_counter()
+    
+    with pytest.raises(DeadlineExceeded):
+        call_with_timeout(time.sleep, 0.05, 5)
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,119 @@
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from src.services.enrichment_service import EnrichmentService
+from src.utils.deadline import Deadline, DeadlineExceeded
+
+song = {'id': '123', 'name': 'Test Song', 'artist': 'Test Artist'}
+genius_info = {'title': 'Test Song', 'album': 'Test Album', 'description': 'Genius description'}
+wikipedia_info = {'artist_bio': 'Test Artist is a band.', 'wikipedia_url': 'https://en.wikipedia.org/wiki/Test_Artist'}
+
+def make_service(genius_result=genius_info, wikipedia_result=wikipedia_info, **kwargs):
+    genius = Mock()
+    wikipedia = Mock()
+    if callable(genius_result):
+        genius.get_song_info.side_effect = genius_result
+    else:
+        genius.get_song_info.return_value = genius_result
+    if callable(wikipedia_result):
+        wikipedia.get_artist_info.side_effect = wikipedia_result
+    else:
+        wikipedia.get_artist_info.return_value = wikipedia_result
+    return EnrichmentService(genius, wikipedia, **kwargs)
+
+def test_merges_both_sources():
+    info = make_service().enrich(song)
+    
+    assert info == {**genius_info, **wikipedia_info}
+
+def test_genius_description_takes_precedence():
+    info = make_service().enrich(song)
+    
+    assert info['description'] == 'Genius description'
+
+def test_wikipedia_fills_missing_description():
+    info = make_service(genius_result={**genius_info, 'description': ''}).enrich(song)
+    
+    assert info['description'] == wikipedia_info['artist_bio']
+
+def test_artist_bios_by_precedence():
+    genius_result = {**genius_info, 'artist_bio': 'Genius artist bio.'}
+    
+    assert EnrichmentService.merge({'genius': genius_result, 'wikipedia': wikipedia_info})['artist_bio'] == \
+        wikipedia_info['artist_bio']
+    assert EnrichmentService.merge({'genius': genius_result, 'wikipedia': None})['artist_bio'] == 'Genius artist bio.'
+
+def test_genius_miss_skips_song():
+    assert make_service(genius_result=None).enrich(song) is None
+
+def test_slow_source_is_abandoned():
+    release = threading.Event()
+    
+    def slow_wikipedia(*args, **kwargs):
+        release.wait(5)
+        return wikipedia_info
+    service = make_service(wikipedia_result=slow_wikipedia, grace=0.05)
+    
+    start = time.perf_counter()
+    info = service.enrich(song)
+    elapsed = time.perf_counter() - start
+    release.set()
+    
+    assert info == genius_info
+    assert elapsed < 1
+
+def test_returns_without_grace_when_required_fields_filled():
+    release = threading.Event()
+    
+    def slow_wikipedia(*args, **kwargs):
+        release.wait(5)
+        return wikipedia_info
+    service = make_service(wikipedia_result=slow_wikipedia, required_fields=('description',), grace=5)
+    
+    start = time.perf_counter()
+    info = service.enrich(song)
+    elapsed = time.perf_counter() - start
+    release.set()
+    
+    assert info == genius_info
+    assert elapsed < 1
+
+def test_sources_run_concurrently():
+    def slow(result):
+        def lookup(*args, **kwargs):
+            time.sleep(0.2)
+            return result
+        return lookup
+    service = make_service(genius_result=slow(genius_info), wikipedia_result=slow(wikipedia_info))
+    
+    start = time.perf_counter()
+    info = service.enrich(song)
+    
+    assert info == {**genius_info, **wikipedia_info}
+    assert time.perf_counter() - start < 0.35
+
+def test_wikipedia_failure_is_ignored():
+    def failing(*args, **kwargs):
+        raise Exception("API Error")
+    
+    assert make_service(wikipedia_result=failing).enrich(song) == genius_info
+
+def test_genius_deadline_exceeded():
+    def out_of_time(*args, **kwargs):
+        raise DeadlineExceeded("No time left")
+    
+    with pytest.raises(DeadlineExceeded):
+        make_service(genius_result=out_of_time).enrich(song, deadline=Deadline(10))
+
+def test_deadline_bounds_the_wait():
+    release = threading.Event()
+    
+    def hanging(*args, **kwargs):
+        release.wait(5)
+        return genius_info
+    service = make_service(genius_result=hanging)
+    
+    with pytest.raises(DeadlineExceeded):
+        service.enrich(song, deadline=Deadline(0.1))
+    release.set()
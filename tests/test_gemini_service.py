@@ -1,6 +1,10 @@
+import asyncio
 import pytest
 from unittest.mock import Mock, patch
+import time
+from src.utils.cache import Cache, cache_key
 from src.services.gemini_service import GeminiService
+from src.utils.deadline import Deadline, DeadlineExceeded
 
 @pytest.fixture
 def gemini_service():
@@ -76,4 +80,154 @@ def test_summarize_info_missing_data(gemini_service):
     assert song['name'] in call_args
     assert song['artist'] in call_args
     assert "Unknown" in call_args  # For missing album
-    assert "No description available" in call_args  # For missing description 
\ No newline at end of file
+    assert "No description available" in call_args  # For missing description 
+
+def test_summarize_info_deadline_exceeded(gemini_service):
+    song = {
+        'name': 'Test Song',
+        'artist': 'Test Artist'
+    }
+    gemini_service.model.generate_content = Mock(side_effect=lambda prompt: time.sleep(5))
+    
+    with pytest.raises(DeadlineExceeded):
+        gemini_service.summarize_info(song, {}, deadline=Deadline(0.6))
+
+def test_summarize_tiered_falls_back_to_faster_model(gemini_service):
+    song = {
+        'name': 'Test Song',
+        'artist': 'Test Artist'
+    }
+    mock_response = Mock()
+    mock_response.text = "Fallback summary"
+    gemini_service.model.generate_content = Mock(side_effect=Exception("API Error"))
+    gemini_service.fallback_model.generate_content = Mock(return_value=mock_response)
+    
+    summary = gemini_service.summarize_tiered(song, {})
+    
+    assert summary == "Fallback summary"
+
+def test_summarize_tiered_uses_local_summary(gemini_service):
+    song = {
+        'name': 'Test Song',
+        'artist': 'Test Artist'
+    }
+    genius_info = {
+        'album': 'Test Album',
+        'release_date': '2024-01-01',
+        'description': 'A test song description',
+        'producer_artists': ['Producer 1'],
+        'genres': ['Rock'],
+        'tags': ['Classic']
+    }
+    gemini_service.model.generate_content = Mock(side_effect=Exception("API Error"))
+    gemini_service.fallback_model.generate_content = Mock(side_effect=Exception("API Error"))
+    
+    summary = gemini_service.summarize_tiered(song, genius_info)
+    
+    assert summary.startswith("Test Song by Test Artist, from Test Album (2024-01-01).")
+    assert "Produced by Producer 1." in summary
+    assert "Genres: Rock." in summary
+    assert "Tags: Classic." in summary
+    assert summary.endswith("A test song description")
+
+def test_summarize_tiered_respects_deadline(gemini_service):
+    song = {
+        'name': 'Test Song',
+        'artist': 'Test Artist'
+    }
+    gemini_service.model.generate_content = Mock(side_effect=lambda prompt: time.sleep(5))
+    gemini_service.fallback_model.generate_content = Mock(side_effect=lambda prompt: time.sleep(5))
+    
+    start = time.perf_counter()
+    summary = gemini_service.summarize_tiered(song, {'description': 'A test song description'}, deadline=Deadline(1.0))
+    
+    assert time.perf_counter() - start < 2
+    assert "A test song description" in summary
+
+def test_local_summary_trims_description():
+    summary = GeminiService.local_summary({'name': 'Test Song', 'artist': 'Test Artist'}, {'description': 'word ' * 500})
+    
+    assert len(summary) < 700
+    assert summary.endswith('…')
+
+def test_prompt_includes_artist_background(gemini_service):
+    song = {'name': 'Test Song', 'artist': 'Test Artist'}
+    
+    enriched = gemini_service._build_prompt(song, {'description': 'About the song', 'artist_bio': 'A band.'})
+    fallback = gemini_service._build_prompt(song, {'description': 'A band.', 'artist_bio': 'A band.'})
+    
+    assert "About the Artist:\nA band." in enriched
+    assert "About the Artist" not in fallback
+
+def test_build_prompt_includes_artist_profile(gemini_service):
+    song = {'name': 'Test Song', 'artist': 'Test Artist'}
+    info = {'description': 'About the song', 'artist_alternate_names': ['T.A.'],
+            'artist_socials': {'instagram': 'testartist'}, 'artist_followers': 1200}
+    
+    prompt = gemini_service._build_prompt(song, info)
+    
+    assert "About the Artist:\nAlso known as: T.A.\nOn social media: Instagram @testartist" in prompt
+    assert "Followers on Genius: 1200" in prompt
+
+def async_model(results):
+    """
+    A model whose async generations finish after the given delays, keyed by song name.
+    """
+    started, cancelled = [], []
+    async def generate(prompt, generation_config=None):
+        name = prompt.split('Title: ', 1)[1].split('\n', 1)[0]
+        started.append(name)
+        delay, outcome = results[name]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Mock(text=outcome)
+    return Mock(generate_content_async=generate), started, cancelled
+
+def ranked(*names):
+    return [({'name': name, 'artist': 'Test Artist'}, {'description': 'A test song description'}) for name in names]
+
+def test_summarize_speculative_prefers_best_ranked(gemini_service):
+    gemini_service.model, started, cancelled = async_model({
+        'First': (0.2, "First summary"), 'Second': (0.0, "Second summary"), 'Third': (5, "Third summary")
+    })
+    
+    assert gemini_service.summarize_speculative(ranked('First', 'Second', 'Third')) == (0, "First summary")
+    assert started == ['First', 'Second', 'Third']
+    time.sleep(0.1)
+    assert cancelled == ['Third']
+
+def test_summarize_speculative_falls_back_to_next_candidate(gemini_service):
+    gemini_service.model, _, cancelled = async_model({
+        'First': (0.0, Exception("API Error")), 'Second': (0.0, "Second summary"), 'Third': (5, "Third summary")
+    })
+    
+    assert gemini_service.summarize_speculative(ranked('First', 'Second', 'Third')) == (1, "Second summary")
+    time.sleep(0.1)
+    assert cancelled == ['Third']
+
+def test_summarize_speculative_stays_within_token_budget(gemini_service):
+    gemini_service.model, started, _ = async_model({'First': (0.0, "First summary"), 'Second': (0.0, "Second summary")})
+    
+    # The top candidate alone is over budget, it is still tried
+    assert gemini_service.summarize_speculative(ranked('First', 'Second'), token_budget=10) == (0, "First summary")
+    assert started == ['First']
+
+def test_summarize_speculative_uses_cached_summary(gemini_service):
+    gemini_service.cache = Cache(':memory:', 'summaries')
+    gemini_service.cache.set(cache_key('Second', 'Test Artist'), "Cached summary")
+    gemini_service.model, started, _ = async_model({'First': (0.0, Exception("API Error"))})
+    
+    assert gemini_service.summarize_speculative(ranked('First', 'Second', 'Third')) == (1, "Cached summary")
+    # Nothing ranked below a cached summary is generated
+    assert started == ['First']
+
+def test_summarize_speculative_all_failing(gemini_service):
+    gemini_service.model, _, _ = async_model({'First': (0.0, Exception("API Error")), 'Second': (5, "Late")})
+    gemini_service.PRIMARY_TIMEOUT = 0.2
+    
+    assert gemini_service.summarize_speculative(ranked('First', 'Second')) is None
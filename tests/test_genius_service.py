@@ -1,7 +1,14 @@
 import pytest
 from unittest.mock import Mock, patch
 import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from src.services.genius_service import GeniusService
+from src.utils.cache import Cache
+from src.utils.deadline import DeadlineExceeded
+from src.utils.hit_stats import HitStats
+from src.utils.metadata_index import MetadataIndex
 
 @pytest.fixture
 def genius_service():
@@ -134,4 +141,186 @@ def test_format_info_empty(genius_service):
     # Test formatting empty info
     formatted = genius_service.format_info(None)
     
-    assert formatted == "No information found on Genius." 
\ No newline at end of file
+    assert formatted == "No information found on Genius." 
+
+@patch('requests.get')
+def test_get_song_info_uses_deadline_timeout(mock_get, genius_service):
+    mock_response = Mock()
+    mock_response.json.return_value = {"response": {"hits": []}}
+    mock_response.raise_for_status = Mock()
+    mock_get.return_value = mock_response
+    deadline = Mock()
+    deadline.remaining.return_value = 30
+    deadline.timeout.return_value = 2.5
+    
+    genius_service.get_song_info("Test Song", "Test Artist", deadline=deadline)
+    
+    assert mock_get.call_args[1]['timeout'] == 2.5
+
+def test_get_song_info_deadline_exceeded(genius_service):
+    deadline = Mock()
+    deadline.remaining.return_value = 30
+    deadline.timeout.side_effect = DeadlineExceeded("no time left")
+    
+    with pytest.raises(DeadlineExceeded):
+        genius_service.get_song_info("Test Song", "Test Artist", deadline=deadline)
+
+def test_get_song_info_uses_cache(genius_service):
+    cache = Mock()
+    cache.get.return_value = {"title": "Cached Song"}
+    genius_service.cache = cache
+    genius_service.session = Mock()
+    
+    result = genius_service.get_song_info("Test Song", "Test Artist")
+    
+    assert result == {"title": "Cached Song"}
+    genius_service.session.get.assert_not_called()
+
+@patch('requests.get')
+def test_get_song_info_caches_misses(mock_get, genius_service):
+    mock_response = Mock()
+    mock_response.json.return_value = {"response": {"hits": []}}
+    mock_response.raise_for_status = Mock()
+    mock_get.return_value = mock_response
+    cache = Mock()
+    cache.get.return_value = None
+    genius_service.cache = cache
+    
+    assert genius_service.get_song_info("Test Song", "Test Artist") is None
+    
+    cache.set.assert_called_once_with("test song|test artist", {}, ttl=GeniusService.MISS_TTL)
+
+@patch('requests.get')
+def test_get_song_info_does_not_cache_errors(mock_get, genius_service):
+    mock_get.side_effect = requests.exceptions.RequestException("API Error")
+    cache = Mock()
+    cache.get.return_value = None
+    genius_service.cache = cache
+    
+    assert genius_service.get_song_info("Test Song", "Test Artist") is None
+    
+    cache.set.assert_not_called()
+
+def test_concurrent_lookups_share_one_request(genius_service):
+    release = threading.Event()
+    
+    def slow_get(url, **kwargs):
+        release.wait()
+        response = Mock()
+        response.json.return_value = {"response": {"hits": []}}
+        return response
+    genius_service.session = Mock()
+    genius_service.session.get.side_effect = slow_get
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(genius_service.get_song_info, "Test Song", " test  artist") for _ in range(4)]
+        while genius_service.single_flight.stats()['saved'] < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [future.result() for future in futures]
+    
+    assert results == [None] * 4
+    assert genius_service.session.get.call_count == 1
+
+@patch('requests.get')
+def test_get_song_info_records_hit_stats(mock_get, genius_service):
+    mock_response = Mock()
+    mock_response.json.return_value = {"response": {"hits": []}}
+    mock_get.return_value = mock_response
+    genius_service.hit_stats = HitStats()
+    song = {'name': 'Test Song', 'artist': 'Test Artist', 'genre': 'jazz', 'popularity': 10}
+    
+    genius_service.get_song_info("Test Song", "Test Artist", song=song)
+    mock_get.side_effect = requests.exceptions.RequestException("API Error")
+    genius_service.get_song_info("Other Song", "Test Artist", song=song)
+    
+    # Only the miss is recorded, the failed lookup says nothing about Genius coverage
+    assert genius_service.hit_stats.genres == {'jazz': [0, 1]}
+
+def test_get_song_info_indexes_fetched_records(genius_service):
+    genius_service.session = Mock()
+    search_response = Mock()
+    search_response.json.return_value = {"response": {"hits": [{"result": {"id": 1}}]}}
+    song_response = Mock()
+    song_response.json.return_value = {"response": {"song": {"title": "Test Song", "tags": [{"name": "Synthwave"}]}}}
+    genius_service.session.get.side_effect = [search_response, song_response]
+    genius_service.index = MetadataIndex(':memory:')
+    song = {'id': '123', 'name': 'Test Song', 'artist': 'Test Artist'}
+    
+    genius_service.get_song_info("Test Song", "Test Artist", song=song)
+    
+    assert genius_service.index.songs('tags:synthwave')[0]['id'] == '123'
+
+def genius_responses(artist_status=200):
+    """
+    A session answering any search with one song by artist 7, and the artist's profile.
+    """
+    def get(url, **kwargs):
+        response = Mock(status_code=200)
+        if url.endswith('/search'):
+            response.json.return_value = {"response": {"hits": [{"result": {"id": len(url)}}]}}
+        elif '/artists/' in url:
+            response.status_code = artist_status
+            response.json.return_value = {"response": {"artist": {
+                "name": "Test Artist",
+                "alternate_names": ["T.A."],
+                "description": {"plain": "An artist from somewhere."},
+                "instagram_name": "testartist",
+                "twitter_name": None,
+                "followers_count": 1200
+            }}}
+        else:
+            response.json.return_value = {"response": {"song": {
+                "title": "Test Song", "primary_artist": {"id": 7, "name": "Test Artist"}
+            }}}
+        return response
+    session = Mock()
+    session.get.side_effect = get
+    return session
+
+def test_get_song_info_merges_artist_profile(genius_service):
+    genius_service.session = genius_responses()
+    
+    result = genius_service.get_song_info("Test Song", "Test Artist")
+    
+    assert result["artist_id"] == 7
+    assert result["artist_bio"] == "An artist from somewhere."
+    assert result["artist_alternate_names"] == ["T.A."]
+    assert result["artist_socials"] == {"instagram": "testartist"}
+    assert result["artist_followers"] == 1200
+
+def test_artist_profile_is_fetched_once_per_artist(genius_service):
+    genius_service.session = genius_responses()
+    genius_service.cache = Cache(':memory:', 'genius')
+    genius_service.artist_cache = Mock(wraps=Cache(':memory:', 'genius_artists'))
+    
+    first = genius_service.get_song_info("Test Song", "Test Artist")
+    second = genius_service.get_song_info("Other Song", "Test Artist")
+    # Cached songs get the artist's profile from its own cache
+    third = genius_service.get_song_info("Test Song", "Test Artist")
+    
+    artist_calls = [call for call in genius_service.session.get.call_args_list if '/artists/' in call[0][0]]
+    assert len(artist_calls) == 1
+    assert first["artist_bio"] == second["artist_bio"] == third["artist_bio"]
+    assert genius_service.artist_cache.set.call_args[1]['ttl'] == GeniusService.ARTIST_TTL
+
+def test_missing_artist_profile_keeps_song_info(genius_service):
+    genius_service.session = genius_responses(artist_status=404)
+    genius_service.artist_cache = Cache(':memory:', 'genius_artists')
+    
+    result = genius_service.get_song_info("Test Song", "Test Artist")
+    
+    assert result["title"] == "Test Song"
+    assert "artist_bio" not in result
+    assert genius_service.artist_cache.get('artists|7') == {}
+
+def test_artist_profile_is_skipped_without_time_left(genius_service):
+    genius_service.session = genius_responses()
+    deadline = Mock()
+    deadline.remaining.return_value = 30
+    deadline.timeout.side_effect = [5, 5, DeadlineExceeded("no time left")]
+    
+    result = genius_service.get_song_info("Test Song", "Test Artist", deadline=deadline)
+    
+    assert result["title"] == "Test Song"
+    assert "artist_bio" not in result
@@ -0,0 +1,91 @@
+import time
+import pytest
+from unittest.mock import Mock
+from src.services.harvest_service import HarvestService
+from src.services.spotify_service import SpotifyService
+from src.utils.cache import Cache
+from src.utils.stand_ins import LatencyModel, OfflineSpotifyClient
+
+@pytest.fixture
+def spotify():
+    return SpotifyService(OfflineSpotifyClient(LatencyModel(0.05, scale=0)))
+
+def test_harvest_uses_every_source(spotify):
+    genres = iter(['rock', 'jazz'])
+    spotify.pick_genre = lambda: next(genres)
+    harvester = HarvestService(spotify, search_pages=2, categories=2, new_release_albums=2, top_track_artists=2)
+    
+    pool = harvester.harvest(pool_size=10000)
+    
+    names = set(pool.names)
+    assert any(name.startswith('New Song') for name in names)
+    assert any(name.startswith('Party Song') for name in names)
+    assert any(name.startswith('Artist') for name in names)
+    assert len(pool) == 2 * 50 + 2 * 10 + 2 * 50 + 2 * 10
+
+def test_harvest_deduplicates_by_id(spotify):
+    # Every search page hits the same offset of the same genre
+    spotify.pick_genre = lambda: 'rock'
+    harvester = HarvestService(spotify, page_size=50, search_pages=4, categories=0,
+                               new_release_albums=0, top_track_artists=0)
+    harvester._sources = lambda deadline=None: [lambda: harvester._search('rock', 0)] * 4
+    
+    pool = harvester.harvest(pool_size=1000)
+    
+    assert len(pool) == 50
+    assert len(set(pool.ids)) == 50
+
+def test_harvest_stops_at_pool_size(spotify):
+    harvester = HarvestService(spotify)
+    
+    pool = harvester.harvest(pool_size=30)
+    
+    assert len(pool) == 30
+    assert all(pool.tempo[i] > 0 for i in range(len(pool)))
+
+def test_harvest_requests_run_concurrently():
+    spotify = SpotifyService(OfflineSpotifyClient(LatencyModel(0.1, sigma=0.01)))
+    harvester = HarvestService(spotify, search_pages=6, categories=0, new_release_albums=0, top_track_artists=0)
+    
+    start = time.perf_counter()
+    harvester.harvest(pool_size=300)
+    
+    # Six pages and one features request, well under six sequential round trips
+    assert time.perf_counter() - start < 0.5
+
+def test_harvest_merges_in_request_order(spotify):
+    harvester = HarvestService(spotify, page_size=50, categories=0, new_release_albums=0, top_track_artists=0)
+    
+    def slow_search(genre, offset):
+        time.sleep(0.05)
+        return harvester._search(genre, offset)
+    # The slow first page still fills the pool, whatever completes first
+    harvester._sources = lambda deadline=None: [lambda: slow_search('rock', 0), lambda: harvester._search('jazz', 0)]
+    
+    pool = harvester.harvest(pool_size=50)
+    
+    assert {pool.genre(i) for i in range(len(pool))} == {'rock'}
+
+def test_harvest_survives_failing_sources(spotify):
+    spotify.sp.new_releases = Mock(side_effect=Exception("API Error"))
+    spotify.sp.categories = Mock(side_effect=Exception("API Error"))
+    harvester = HarvestService(spotify, search_pages=1, top_track_artists=0)
+    
+    assert len(harvester.harvest(pool_size=1000)) == 50
+
+def test_harvest_without_tracks_raises(spotify):
+    harvester = HarvestService(spotify, search_pages=0, categories=0, new_release_albums=0)
+    
+    with pytest.raises(Exception):
+        harvester.harvest()
+
+def test_harvest_is_cached(spotify):
+    spotify.cache = Cache(':memory:', 'spotify')
+    harvester = HarvestService(spotify, search_pages=2, categories=0, new_release_albums=0, top_track_artists=0)
+    first = harvester.harvest(pool_size=60)
+    spotify.sp.search = Mock()
+    
+    second = harvester.harvest(pool_size=60)
+    
+    assert second.ids == first.ids
+    spotify.sp.search.assert_not_called()
@@ -0,0 +1,35 @@
+import pytest
+from src.utils.hit_stats import HitStats
+
+def test_unseen_groups_start_even():
+    stats = HitStats()
+    
+    assert stats.genre_rate('jazz') == 0.5
+    assert stats.expected({'genre': 'jazz', 'popularity': 50}) == pytest.approx(0.5)
+
+def test_popularity_buckets():
+    assert HitStats.popularity_bucket({'popularity': 0}) == '0-19'
+    assert HitStats.popularity_bucket({'popularity': 45}) == '40-59'
+    assert HitStats.popularity_bucket({'popularity': 100}) == '80-99'
+    assert HitStats.popularity_bucket({}) == 'unknown'
+
+def test_expected_follows_observed_hits():
+    stats = HitStats()
+    for _ in range(8):
+        stats.record({'genre': 'pop', 'popularity': 90}, True)
+        stats.record({'genre': 'jazz', 'popularity': 10}, False)
+    
+    popular_pop = stats.expected({'genre': 'pop', 'popularity': 85})
+    obscure_jazz = stats.expected({'genre': 'jazz', 'popularity': 5})
+    
+    assert stats.genre_rate('pop') > stats.genre_rate('jazz')
+    assert popular_pop > 0.5 > obscure_jazz
+
+def test_persists(tmp_path):
+    path = str(tmp_path / 'hit_stats.json')
+    HitStats(path).record({'genre': 'rock', 'popularity': 60}, True)
+    
+    reloaded = HitStats(path)
+    
+    assert reloaded.genres == {'rock': [1, 1]}
+    assert reloaded.popularity == {'60-79': [1, 1]}
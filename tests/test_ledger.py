@@ -0,0 +1,97 @@
+import pytest
+from unittest.mock import Mock
+from src.utils.cache import Cache
+from src.utils.ledger import RunLedger, RunRecord, percentile
+
+@pytest.fixture
+def ledger():
+    return RunLedger(':memory:')
+
+def make_record(run_id, outcome='posted', candidates=1, started=1700000000.0, **stages):
+    record = RunRecord(run_id)
+    record.started = started
+    record.outcome = outcome
+    record.candidates = candidates
+    record.stages = stages
+    record.prompt_chars = 1000
+    record.track = {'id': '123', 'name': 'Test Song', 'artist': 'Test Artist'}
+    return record
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile(list(range(101)), 99) == 99
+
+def test_append_numbers_attempts(ledger):
+    ledger.append(make_record('2024-01-01', outcome='deadline'))
+    ledger.append(make_record('2024-01-01'))
+    ledger.append(make_record('2024-01-02'))
+    
+    runs = ledger.runs()
+    
+    assert [run['attempt'] for run in runs] == [1, 2, 1]
+    assert runs[1]['track'] == 'Test Song by Test Artist'
+
+def test_summary(ledger):
+    for i in range(10):
+        ledger.append(make_record(f'2024-01-{i + 1:02d}', candidates=i % 3 + 1, gemini=float(i)))
+    ledger.append(make_record('2024-01-11', outcome='no_info', candidates=5))
+    
+    summary = ledger.summary()
+    
+    assert summary['runs'] == 11
+    assert summary['outcomes'] == {'posted': 10, 'no_info': 1}
+    assert summary['candidates_per_post'] == 1.9
+    assert summary['latency']['gemini']['p50'] == 4.5
+    assert summary['prompt_chars']['p50'] == 1000
+
+def test_summary_since(ledger):
+    ledger.append(make_record('old', started=1000.0))
+    ledger.append(make_record('new', started=2000.0))
+    
+    assert ledger.summary(since=1500.0)['runs'] == 1
+
+def test_trend(ledger):
+    day = 24 * 60 * 60
+    ledger.append(make_record('a', started=1704067200.0, gemini=1.0))
+    ledger.append(make_record('b', started=1704067200.0 + day, gemini=3.0))
+    ledger.append(make_record('c', started=1704067200.0 + 40 * day, outcome='error', gemini=5.0))
+    
+    trend = ledger.trend('month')
+    
+    assert [row['period'] for row in trend] == ['2024-01', '2024-02']
+    assert trend[0]['latency']['gemini'] == 2.0
+    assert trend[1]['failed'] == 1
+    with pytest.raises(ValueError):
+        ledger.trend('year')
+
+@pytest.fixture
+def main_module():
+    # main configures its clients at import time, so import it once the env is mocked
+    import main
+    return main
+
+def test_daily_song_task_records_run(main_module, ledger):
+    song = {'id': '123', 'name': 'Test Song', 'artist': 'Test Artist'}
+    genius = Mock(cache=Cache(':memory:', 'genius'))
+    genius.get_song_info.side_effect = [None, {'title': 'Test Song'}]
+    spotify = Mock()
+    spotify.get_multiple_songs.return_value = [song, {**song, 'id': '456'}]
+    spotify.order_by_hit_rate.side_effect = lambda songs: songs
+    gemini = Mock()
+    gemini.summarize_tiered.return_value = "Test summary"
+    gemini.prompt_length.return_value = 420
+    services = {'spotify': spotify, 'genius': genius, 'gemini': gemini, 'telegram': Mock(), 'ledger': ledger}
+    genius.cache.get('warm')
+    
+    main_module.daily_song_task(services, deadline=main_module.Deadline(60))
+    
+    run = ledger.runs()[0]
+    assert run['outcome'] == 'posted'
+    assert run['candidates'] == 2
+    assert run['track_id'] == '456'
+    assert run['prompt_chars'] == 420
+    assert set(run['stages']) == {'spotify', 'genius', 'gemini', 'telegram'}
+    # Only lookups made during the run are counted
+    assert run['cache_misses'] == 0
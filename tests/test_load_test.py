@@ -0,0 +1,33 @@
+from src.services.bot_service import SongBotService
+from src.utils.load_test import BotLoadTest
+from src.utils.stand_ins import build_offline_services
+
+def load_test(concurrency=64, latency_scale=0, **kwargs):
+    services = build_offline_services(latency_scale=latency_scale, cached=True)
+    return BotLoadTest(SongBotService(services), concurrency=concurrency, latency_scale=latency_scale, **kwargs)
+
+def test_ramp_reports_every_step():
+    steps = load_test().ramp([20, 50], step_seconds=0.5)
+    
+    assert [step['rate'] for step in steps] == [20, 50]
+    for step in steps:
+        assert step['requests'] > 0
+        assert step['failed'] == 0
+        assert step['throughput'] > 0
+        assert set(step['latency']) == {'p50', 'p90', 'p99'}
+        assert step['memory_per_request'] is None or step['memory_per_request'] > 0
+
+def test_updates_queue_beyond_concurrency():
+    step, = load_test(concurrency=1, latency_scale=0.05, trace_memory=False).ramp([50], step_seconds=0.5)
+    
+    assert step['in_flight'] == 1
+    assert step['queue_depth']['max'] > 0
+    assert step['memory_per_request'] is None
+
+def test_ramp_stops_once_p99_exceeds_limit():
+    steps = load_test(concurrency=1, latency_scale=0.05, trace_memory=False).ramp(
+        [50, 100], step_seconds=0.3, max_p99=0.01
+    )
+    
+    assert len(steps) == 1
+    assert steps[0]['latency']['p99'] > 0.01
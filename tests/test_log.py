@@ -0,0 +1,100 @@
+import asyncio
+import io
+import json
+import logging
+import threading
+import pytest
+from src.utils import log
+
+@pytest.fixture
+def output():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    stream = io.StringIO()
+    log.configure_logging(stream=stream)
+    yield stream
+    log.shutdown_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    log.set_run_id(None, process=True)
+
+def lines(stream):
+    log.shutdown_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_records_are_json_with_run_id(output):
+    log.set_run_id('2026-10-19', process=True)
+    logging.getLogger('test').info("Picked %s by %s", 'Song', 'Artist', extra={'candidates': 3})
+
+    entry, = lines(output)
+    assert entry['msg'] == "Picked Song by Artist"
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'test'
+    assert entry['run_id'] == '2026-10-19'
+    assert entry['candidates'] == 3
+
+def test_formatting_happens_in_listener(output):
+    calls = []
+    class Lazy:
+        def __str__(self):
+            calls.append(threading.current_thread())
+            return 'lazy'
+
+    logging.getLogger('test').info("Value: %s", Lazy())
+
+    entry, = lines(output)
+    assert entry['msg'] == "Value: lazy"
+    assert any(thread is not threading.current_thread() for thread in calls)
+
+def test_disabled_levels_are_not_formatted(output):
+    class Explodes:
+        def __str__(self):
+            raise AssertionError("formatted")
+
+    logging.getLogger('test').debug("Value: %s", Explodes())
+    assert lines(output) == []
+
+def test_pool_threads_fall_back_to_process_run_id(output):
+    log.set_run_id('daily', process=True)
+    log.set_run_id('update-1')
+    worker = threading.Thread(target=lambda: logging.getLogger('test').info("from worker"))
+    worker.start()
+    worker.join()
+    logging.getLogger('test').info("from caller")
+
+    entries = {entry['msg']: entry['run_id'] for entry in lines(output)}
+    assert entries == {'from worker': 'daily', 'from caller': 'update-1'}
+
+def test_tasks_keep_their_own_run_id(output):
+    async def handle(update_id):
+        log.set_run_id(f"update-{update_id}")
+        await asyncio.sleep(0)
+        await asyncio.to_thread(logging.getLogger('test').info, "handled %s", update_id)
+
+    async def serve():
+        await asyncio.gather(handle(1), handle(2))
+    asyncio.run(serve())
+
+    entries = {entry['msg']: entry['run_id'] for entry in lines(output)}
+    assert entries == {'handled 1': 'update-1', 'handled 2': 'update-2'}
+
+def test_exceptions_are_rendered(output):
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger('test').exception("Failed")
+
+    entry, = lines(output)
+    assert 'ValueError: boom' in entry['exception']
+
+def test_reconfiguring_replaces_handlers(output):
+    log.configure_logging(stream=output, json_output=False)
+    log.configure_logging(stream=output, json_output=False)
+    log.set_run_id('daily', process=True)
+    logging.getLogger('test').warning("Only once")
+    log.shutdown_logging()
+
+    assert len(logging.getLogger().handlers) == 1
+    text = output.getvalue()
+    assert text.count("Only once") == 1
+    assert "WARNING - [daily] Only once" in text
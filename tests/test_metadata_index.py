@@ -0,0 +1,74 @@
+import time
+import pytest
+from src.utils.metadata_index import MetadataIndex
+
+def make_info(title, artist, producers=(), tags=(), genres=(), description=''):
+    return {
+        'title': title,
+        'artist': artist,
+        'album': 'Test Album',
+        'release_date': 'Unknown',
+        'genius_url': '',
+        'description': description,
+        'producer_artists': list(producers),
+        'writer_artists': [],
+        'featured_artists': [],
+        'genres': list(genres),
+        'tags': list(tags)
+    }
+
+def make_song(track_id, name, artist):
+    return {'id': track_id, 'name': name, 'artist': artist, 'genre': 'pop', 'popularity': 50}
+
+@pytest.fixture
+def index():
+    index = MetadataIndex(':memory:')
+    index.add('Blinding Lights', 'The Weeknd',
+              make_info('Blinding Lights', 'The Weeknd', producers=['Max Martin', 'Oscar Holter'],
+                        tags=['Synthwave', 'Pop']),
+              make_song('1', 'Blinding Lights', 'The Weeknd'))
+    index.add('So Fresh', 'Björk', make_info('So Fresh', 'Björk', tags=['Ballad'], description='A quiet song'))
+    return index
+
+def test_search_by_column(index):
+    matches = index.search('tags:synthwave')
+    
+    assert [match['info']['title'] for match in matches] == ['Blinding Lights']
+    assert matches[0]['song']['id'] == '1'
+
+def test_find_literal_phrases(index):
+    assert [m['info']['title'] for m in index.find(producers='max martin')] == ['Blinding Lights']
+    assert index.find(producers='martin max') == []
+    assert [m['info']['title'] for m in index.find('quiet')] == ['So Fresh']
+    # Diacritics are folded
+    assert [m['info']['title'] for m in index.find(artist='bjork')] == ['So Fresh']
+
+def test_find_unknown_field(index):
+    with pytest.raises(ValueError):
+        index.find(mood='happy')
+
+def test_invalid_query(index):
+    with pytest.raises(ValueError):
+        index.search('tags:"unterminated')
+
+def test_add_replaces_and_keeps_song(index):
+    index.add('Blinding Lights', 'The Weeknd', make_info('Blinding Lights', 'The Weeknd', tags=['Retro']))
+    
+    assert len(index) == 2
+    assert index.search('tags:synthwave') == []
+    assert index.songs('tags:retro')[0]['id'] == '1'
+
+def test_songs_skip_records_without_tracks(index):
+    assert index.songs('tags:ballad') == []
+
+def test_search_is_fast(tmp_path):
+    index = MetadataIndex(str(tmp_path / 'index.sqlite3'))
+    for i in range(2000):
+        tags = ['Synthwave'] if i % 100 == 0 else ['Rock']
+        index.add(f'Song {i}', f'Artist {i % 50}', make_info(f'Song {i}', f'Artist {i % 50}', tags=tags))
+    
+    start = time.perf_counter()
+    matches = index.search('tags:synthwave', limit=50)
+    
+    assert len(matches) == 20
+    assert time.perf_counter() - start < 0.05
@@ -0,0 +1,42 @@
+import json
+import os
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.deadline import Deadline
+from src.utils.profiling import PipelineProfiler
+
+def build_prompt_like_work():
+    return json.loads(json.dumps({'words': ['word'] * 1000}))
+
+def test_profiler_writes_reports(tmp_path):
+    output_dir = str(tmp_path / 'profile')
+    deadline = Deadline(30)
+    
+    with PipelineProfiler(output_dir, deadline):
+        with deadline.stage('genius'):
+            build_prompt_like_work()
+    
+    assert sorted(os.listdir(output_dir)) == ['allocations.txt', 'profile.pstats', 'profile.txt', 'summary.json']
+    with open(os.path.join(output_dir, 'summary.json')) as f:
+        summary = json.load(f)
+    assert summary['wall_seconds'] >= summary['cpu_seconds'] - 0.01
+    assert set(summary['stages']['genius']) == {'wall', 'cpu', 'blocked'}
+    assert summary['cpu_hotspots']['json_decoding']['calls'] > 0
+    assert 'dumps' not in summary['cpu_hotspots']['json_decoding']['functions']
+
+def test_profiler_covers_worker_threads(tmp_path):
+    output_dir = str(tmp_path / 'profile')
+    
+    with PipelineProfiler(output_dir) as profiler:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            executor.submit(build_prompt_like_work).result()
+    
+    assert profiler.cpu_hotspots()['json_decoding']['calls'] > 0
+
+def test_profiler_does_not_swallow_exit(tmp_path):
+    output_dir = str(tmp_path / 'profile')
+    
+    with pytest.raises(SystemExit):
+        with PipelineProfiler(output_dir):
+            raise SystemExit(1)
+    assert os.path.exists(os.path.join(output_dir, 'summary.json'))
@@ -0,0 +1,90 @@
+import json
+import math
+import sys
+import pytest
+from src.utils.records import GeniusRecord, Track, TrackBatch
+
+song = {
+    'id': '123',
+    'name': 'Test Song',
+    'artist': 'Test Artist',
+    'album': 'Test Album',
+    'release_date': '2024-01-01',
+    'spotify_url': 'https://spotify.com/track/123',
+    'popularity': 80,
+    'duration_ms': 180000,
+    'genre': 'rock',
+    'features': {'energy': 0.7, 'tempo': 120.0},
+    'image_url': 'https://i.scdn.co/image/123'
+}
+
+info = {
+    'title': 'Test Song',
+    'artist': 'Test Artist',
+    'album': 'Test Album',
+    'release_date': 'January 1, 2024',
+    'genius_url': 'https://genius.com/test',
+    'description': 'Test description',
+    'producer_artists': ['Producer 1'],
+    'writer_artists': ['Writer 1'],
+    'featured_artists': [],
+    'genres': ['Rock'],
+    'tags': ['Alternative'],
+    'artist_id': 42
+}
+
+def test_track_round_trip():
+    track = Track.from_dict(song)
+    
+    assert track.to_dict() == song
+    assert Track.from_row(json.loads(json.dumps(track.to_row()))) == track
+
+def test_track_interns_artist_and_genre():
+    first = Track.from_dict({**song, 'artist': ''.join(['Test ', 'Artist'])})
+    second = Track.from_dict(song)
+    
+    assert first.artist is second.artist
+    assert first.genre is sys.intern('rock')
+
+def test_track_has_no_dict():
+    assert not hasattr(Track.from_dict(song), '__dict__')
+
+def test_genius_record_round_trip():
+    record = GeniusRecord.from_dict(info)
+    
+    assert record.to_dict() == info
+    assert GeniusRecord.from_row(json.loads(json.dumps(record.to_row()))) == record
+
+def test_genius_record_loads_rows_without_artist_id():
+    row = GeniusRecord.from_dict(info).to_row()[:-1]
+    
+    assert GeniusRecord.from_row(row).artist_id is None
+
+def test_batch_round_trip():
+    songs = [song, {**song, 'id': '456', 'popularity': None, 'features': {}, 'genre': None, 'image_url': None}]
+    batch = TrackBatch.from_dicts(songs)
+    
+    restored = TrackBatch.from_payload(json.loads(json.dumps(batch.to_payload())))
+    
+    assert len(restored) == 2
+    assert restored.to_dicts() == songs
+    assert math.isnan(restored.energy[1])
+
+def test_batch_stores_repeated_strings_once():
+    batch = TrackBatch.from_dicts({**song, 'id': str(i)} for i in range(100))
+    
+    assert set(batch.artist_codes) == {batch.artist_codes[0]}
+    assert batch.artist(99) == 'Test Artist'
+    assert batch.genre(99) == 'rock'
+
+def test_batch_rejects_other_versions():
+    payload = TrackBatch.from_dicts([song]).to_payload()
+    payload['version'] = 0
+    
+    with pytest.raises(ValueError):
+        TrackBatch.from_payload(payload)
+
+def test_track_reads_rows_without_image():
+    row = Track.from_dict(song).to_row()[:-1]
+    
+    assert Track.from_row(row).image_url is None
@@ -0,0 +1,105 @@
+import time
+import pytest
+from src.services.selection_service import SelectionService
+from src.utils.hit_stats import HitStats
+from src.utils.records import TrackBatch
+
+def make_song(track_id, energy, tempo, popularity, release_date):
+    return {
+        'id': track_id,
+        'name': f'Song {track_id}',
+        'artist': 'Test Artist',
+        'release_date': release_date,
+        'popularity': popularity,
+        'features': {'energy': energy, 'tempo': tempo}
+    }
+
+@pytest.fixture
+def selection_service():
+    return SelectionService(
+        target={'energy': 0.8, 'tempo': 120, 'popularity': 70, 'year': 2010}
+    )
+
+def test_rank_prefers_target_profile(selection_service):
+    close = make_song('close', 0.8, 120, 70, '2010-05-01')
+    far = make_song('far', 0.1, 70, 5, '1960')
+    
+    ranked = selection_service.rank([far, close])
+    
+    assert [song['id'] for song in ranked] == ['close', 'far']
+
+def test_rank_handles_missing_features(selection_service):
+    song = {'id': 'bare', 'name': 'Bare', 'artist': 'Test Artist'}
+    
+    ranked = selection_service.rank([song])
+    
+    assert ranked == [song]
+
+def test_rank_empty(selection_service):
+    assert selection_service.rank([]) == []
+
+def test_record_excludes_and_penalizes_recent(selection_service):
+    posted = make_song('posted', 0.8, 120, 70, '2010')
+    similar = make_song('similar', 0.79, 121, 69, '2010')
+    different = make_song('different', 0.7, 110, 60, '2005')
+    
+    assert selection_service.rank([similar, different])[0]['id'] == 'similar'
+    selection_service.record(posted)
+    ranked = selection_service.rank([posted, similar, different])
+    
+    assert [song['id'] for song in ranked] == ['different', 'similar']
+
+def test_history_persists(tmp_path):
+    history_path = str(tmp_path / 'history.json')
+    service = SelectionService(history_path=history_path)
+    service.record(make_song('posted', 0.5, 100, 50, '1999'))
+    
+    reloaded = SelectionService(history_path=history_path)
+    
+    assert reloaded.history_ids == ['posted']
+    assert reloaded.history.shape == (1, 4)
+
+def test_rank_large_catalog_is_fast(selection_service):
+    for i in range(30):
+        selection_service.record(make_song(f'h{i}', i / 30, 100 + i, 50, '2000'))
+    songs = [make_song(str(i), (i % 100) / 100, 60 + i % 140, i % 100, '1990') for i in range(5000)]
+    
+    start = time.perf_counter()
+    ranked = selection_service.rank(songs, limit=10)
+    
+    assert len(ranked) == 10
+    assert time.perf_counter() - start < 0.5
+
+def test_rank_batch_matches_dicts(selection_service):
+    selection_service.record(make_song('posted', 0.8, 120, 70, '2010'))
+    songs = [make_song(str(i), (i % 10) / 10, 60 + i * 7, i * 5, f'{1960 + i * 3}') for i in range(20)]
+    songs.append({'id': 'bare', 'name': 'Bare', 'artist': 'Test Artist'})
+    batch = TrackBatch.from_dicts(songs)
+    
+    from_dicts = selection_service.rank(songs, limit=5)
+    from_batch = selection_service.rank(batch, limit=5)
+    
+    assert [song['id'] for song in from_batch] == [song['id'] for song in from_dicts]
+
+def hit_stats_favoring_pop():
+    hit_stats = HitStats()
+    for _ in range(20):
+        hit_stats.record({'genre': 'pop', 'popularity': 70}, True)
+        hit_stats.record({'genre': 'jazz', 'popularity': 70}, False)
+    return hit_stats
+
+def test_rank_weighs_in_hit_rates():
+    jazz = {**make_song('jazz', 0.8, 120, 70, '2010'), 'genre': 'jazz'}
+    pop = {**make_song('pop', 0.8, 120, 70, '2010'), 'genre': 'pop'}
+    service = SelectionService(hit_stats=hit_stats_favoring_pop())
+    
+    assert [song['id'] for song in service.rank([jazz, pop])] == ['pop', 'jazz']
+    assert [song['id'] for song in service.rank(TrackBatch.from_dicts([jazz, pop]))] == ['pop', 'jazz']
+
+def test_rank_keeps_profile_ahead_of_hit_rates():
+    target = {'energy': 0.8, 'tempo': 120, 'popularity': 70, 'year': 2010}
+    close = {**make_song('close', 0.8, 120, 70, '2010'), 'genre': 'jazz'}
+    far = {**make_song('far', 0.1, 70, 70, '1960'), 'genre': 'pop'}
+    service = SelectionService(target=target, hit_stats=hit_stats_favoring_pop(), hit_weight=0.1)
+    
+    assert [song['id'] for song in service.rank([far, close])] == ['close', 'far']
@@ -1,7 +1,10 @@
+import threading
+import time
 import pytest
 from unittest.mock import Mock, patch
 from spotipy.exceptions import SpotifyException
 from src.services.spotify_service import SpotifyService
+from src.utils.hit_stats import HitStats
 
 @pytest.fixture
 def mock_spotify_client():
@@ -79,4 +82,107 @@ def test_get_multiple_songs(spotify_service):
     with patch.object(spotify_service, 'get_random_song', return_value=test_song):
         songs = spotify_service.get_multiple_songs()
         assert len(songs) == 1
-        assert songs[0] == test_song 
\ No newline at end of file
+        assert songs[0] == test_song 
+
+def test_get_candidate_songs_attaches_features(mock_spotify_client, spotify_service):
+    mock_track = {
+        'id': 'abc',
+        'name': 'Test Song',
+        'artists': [{'name': 'Test Artist'}],
+        'album': {'name': 'Test Album', 'release_date': '2024-01-01'},
+        'external_urls': {'spotify': 'https://spotify.com/track/abc'},
+        'popularity': 80,
+        'duration_ms': 180000
+    }
+    mock_spotify_client.search.return_value = {'tracks': {'items': [mock_track]}}
+    mock_spotify_client.audio_features.return_value = [{'id': 'abc', 'energy': 0.9, 'tempo': 128.0}]
+    
+    songs = spotify_service.get_candidate_songs()
+    
+    assert len(songs) == 1
+    assert songs[0]['id'] == 'abc'
+    assert songs[0]['features']['energy'] == 0.9
+    assert songs[0]['genre'] in spotify_service.genres
+
+def test_get_candidate_songs_without_features(mock_spotify_client, spotify_service):
+    mock_track = {
+        'id': 'abc',
+        'name': 'Test Song',
+        'artists': [{'name': 'Test Artist'}],
+        'album': {'name': 'Test Album', 'release_date': '2024-01-01'},
+        'external_urls': {'spotify': 'https://spotify.com/track/abc'},
+        'popularity': 80,
+        'duration_ms': 180000
+    }
+    mock_spotify_client.search.return_value = {'tracks': {'items': [mock_track]}}
+    mock_spotify_client.audio_features.side_effect = SpotifyException(http_status=403, msg="Forbidden", code=403)
+    
+    songs = spotify_service.get_candidate_songs()
+    
+    assert songs[0]['features'] == {}
+
+def test_get_candidate_songs_features_bounded_by_deadline(mock_spotify_client, spotify_service):
+    mock_track = {
+        'id': 'abc',
+        'name': 'Test Song',
+        'artists': [{'name': 'Test Artist'}],
+        'album': {'name': 'Test Album', 'release_date': '2024-01-01'},
+        'external_urls': {'spotify': 'https://spotify.com/track/abc'},
+        'popularity': 80,
+        'duration_ms': 180000
+    }
+    mock_spotify_client.search.return_value = {'tracks': {'items': [mock_track]}}
+    release = threading.Event()
+    mock_spotify_client.audio_features.side_effect = lambda ids: release.wait()
+    deadline = Mock()
+    deadline.timeout.return_value = 0.05
+    
+    start = time.monotonic()
+    songs = spotify_service.get_candidate_songs(deadline=deadline)
+    release.set()
+    
+    assert songs[0]['features'] == {}
+    assert time.monotonic() - start < 1
+    assert deadline.timeout.call_args.kwargs['cap'] == SpotifyService.REQUEST_TIMEOUT
+
+def test_order_by_hit_rate(mock_spotify_client):
+    hit_stats = HitStats()
+    for _ in range(5):
+        hit_stats.record({'genre': 'pop', 'popularity': 90}, True)
+        hit_stats.record({'genre': 'jazz', 'popularity': 90}, False)
+    service = SpotifyService(mock_spotify_client, hit_stats=hit_stats)
+    songs = [{'name': 'a', 'genre': 'jazz', 'popularity': 90}, {'name': 'b', 'genre': 'pop', 'popularity': 90}]
+    
+    assert [song['name'] for song in service.order_by_hit_rate(songs)] == ['b', 'a']
+
+def test_order_by_hit_rate_without_stats(spotify_service):
+    songs = [{'name': 'a'}, {'name': 'b'}]
+    
+    assert spotify_service.order_by_hit_rate(songs) == songs
+
+def test_pick_genre_weighted_by_hit_rate(mock_spotify_client):
+    hit_stats = HitStats()
+    service = SpotifyService(mock_spotify_client, hit_stats=hit_stats)
+    for genre in service.genres:
+        for _ in range(50):
+            hit_stats.record({'genre': genre}, genre == 'pop')
+    
+    picks = [service.pick_genre() for _ in range(200)]
+    
+    assert picks.count('pop') > 100
+
+def test_format_song_info_includes_album_art(spotify_service):
+    track = {
+        'id': '123',
+        'name': 'Test Song',
+        'artists': [{'name': 'Test Artist'}],
+        'album': {'name': 'Test Album', 'release_date': '2024-01-01',
+                  'images': [{'url': 'https://i.scdn.co/image/large'}, {'url': 'https://i.scdn.co/image/small'}]},
+        'external_urls': {'spotify': 'https://spotify.com/track/123'},
+        'popularity': 80,
+        'duration_ms': 180000
+    }
+    
+    assert spotify_service._format_song_info(track)['image_url'] == 'https://i.scdn.co/image/large'
+    del track['album']['images']
+    assert spotify_service._format_song_info(track)['image_url'] is None
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from src.utils.stand_ins import ARTISTS, LatencyModel, OfflineMessage, build_offline_services, offline_update
+
+@pytest.fixture
+def services():
+    return build_offline_services(latency_scale=0)
+
+def test_latency_model_is_reproducible():
+    first = [LatencyModel(0.1, seed=7).sample() for _ in range(3)]
+    second = [LatencyModel(0.1, seed=7).sample() for _ in range(3)]
+    
+    assert first == second
+    assert LatencyModel(0.1, scale=0).sample() == 0
+
+def test_offline_catalog_is_deterministic(services):
+    first = services['spotify'].get_candidate_songs(genre='rock')
+    second = services['spotify'].get_candidate_songs(genre='rock')
+    
+    assert [song['id'] for song in first] == [song['id'] for song in second]
+    assert len(first) == 50
+    assert 'energy' in first[0]['features']
+
+def test_offline_picks_are_seeded():
+    def picks(seed):
+        services = build_offline_services(seed=seed, latency_scale=0)
+        genres = [services['spotify'].pick_genre() for _ in range(10)]
+        return genres, services['harvest'].random.randrange(1000)
+    
+    assert picks(3) == picks(3)
+    assert picks(3) != picks(4)
+
+def test_offline_pipeline(services):
+    songs = services['spotify'].get_candidate_songs(genre='jazz')
+    infos = [services['genius'].get_song_info(song['name'], song['artist']) for song in songs]
+    hits = [info for info in infos if info]
+    
+    assert 0 < len(hits) < len(songs)
+    summary = services['gemini'].summarize_tiered(songs[0], hits[0])
+    assert summary.startswith("An offline summary of")
+    
+    services['telegram'].send_song_info(songs[0], hits[0], summary)
+    assert len(services['telegram'].bot.sent) == 1
+
+def test_offline_enrichment_parses_wikipedia(services):
+    bios = [services['wikipedia'].get_artist_info(artist) for artist in ARTISTS]
+    found = [bio for bio in bios if bio]
+    
+    assert 0 < len(found) < len(ARTISTS)
+    assert found[0]['artist_bio'].endswith("shaped its records.")
+    song = next(song for song in services['spotify'].get_candidate_songs(genre='jazz')
+                if services['genius'].get_song_info(song['name'], song['artist']))
+    assert 'description' in services['enrichment'].enrich(song)
+
+def test_offline_update_replies():
+    message = OfflineMessage(LatencyModel(0.1, scale=0), chat_id=7)
+    update, context = offline_update(1, message, ['jazz'])
+    
+    asyncio.run(update.effective_message.reply_text("hello"))
+    
+    assert message.replies == ["hello"]
+    assert context.args == ['jazz']
+    assert update.effective_chat.id == 7
@@ -1,7 +1,10 @@
+import asyncio
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
-from telegram.error import TelegramError
+import requests
+from telegram.error import BadRequest, TelegramError, TimedOut
 from src.services.telegram_service import TelegramService
+from src.utils.cache import Cache
 
 @pytest.fixture
 def telegram_service():
@@ -96,4 +99,100 @@ def test_send_song_info_missing_data(telegram_service):
     assert song['artist'] in call_args
     assert summary in call_args
     # Verify empty strings for missing URLs
-    assert 'href=""' in call_args 
\ No newline at end of file
+    assert 'href=""' in call_args 
+
+def make_photo_message(file_id):
+    return Mock(photo=[Mock(file_id=f"{file_id}-small"), Mock(file_id=file_id)])
+
+@pytest.fixture
+def photo_service(telegram_service):
+    telegram_service.bot = AsyncMock()
+    telegram_service.bot.send_photo.return_value = make_photo_message("file-123")
+    telegram_service.session = Mock()
+    telegram_service.session.get.return_value = Mock(content=b"image bytes")
+    telegram_service.file_cache = Cache(':memory:', 'telegram_files')
+    return telegram_service
+
+photo_song = {
+    'name': 'Test Song',
+    'artist': 'Test Artist',
+    'spotify_url': 'https://spotify.com/track/123',
+    'image_url': 'https://i.scdn.co/image/123'
+}
+
+def test_send_song_info_uploads_once_then_reuses_file_id(photo_service):
+    photo_service.send_song_info(photo_song, {}, "Test summary")
+    photo_service.send_song_info(photo_song, {}, "Test summary")
+    
+    first, second = photo_service.bot.send_photo.call_args_list
+    assert first.kwargs['photo'] == b"image bytes"
+    assert second.kwargs['photo'] == "file-123"
+    assert "Test summary" in second.kwargs['caption']
+    assert photo_service.session.get.call_count == 1
+    photo_service.bot.send_message.assert_not_called()
+
+def test_prefetched_image_is_used(photo_service):
+    photo_service.prefetch_image(photo_song['image_url'])
+    photo_service.send_song_info(photo_song, {}, "Test summary")
+    
+    assert photo_service.session.get.call_count == 1
+    assert photo_service.bot.send_photo.call_args.kwargs['photo'] == b"image bytes"
+
+def test_prefetch_skips_uploaded_images(photo_service):
+    photo_service.file_cache.set(photo_song['image_url'], "file-123")
+    
+    photo_service.prefetch_image(photo_song['image_url'])
+    
+    photo_service.session.get.assert_not_called()
+
+def test_long_post_sends_text_after_photo(photo_service):
+    photo_service.send_song_info(photo_song, {}, "x" * TelegramService.CAPTION_LIMIT)
+    
+    assert photo_service.bot.send_photo.call_args.kwargs['caption'] is None
+    assert "x" * 100 in photo_service.bot.send_message.call_args.kwargs['text']
+
+def test_rejected_file_id_is_uploaded_again(photo_service):
+    photo_service.file_cache.set(photo_song['image_url'], "stale")
+    photo_service.bot.send_photo.side_effect = [BadRequest("Wrong file identifier"), make_photo_message("file-456")]
+    
+    photo_service.send_song_info(photo_song, {}, "Test summary")
+    
+    assert photo_service.file_id(photo_song['image_url']) == "file-456"
+
+def test_caption_rejection_keeps_file_id(photo_service):
+    photo_service.file_cache.set(photo_song['image_url'], "file-123")
+    photo_service.bot.send_photo.side_effect = BadRequest("Can't parse entities")
+    
+    photo_service.send_song_info(photo_song, {}, "Test summary")
+    
+    assert photo_service.file_id(photo_song['image_url']) == "file-123"
+    photo_service.session.get.assert_not_called()
+    assert "Test summary" in photo_service.bot.send_message.call_args.kwargs['text']
+
+def test_sends_share_one_event_loop(photo_service):
+    loops = []
+    async def send_message(**kwargs):
+        loops.append(asyncio.get_running_loop())
+    photo_service.bot.send_message = send_message
+    
+    photo_service.send_message("First")
+    photo_service.send_error_message("Second")
+    
+    assert len(loops) == 2 and loops[0] is loops[1]
+
+def test_image_failure_falls_back_to_text(photo_service):
+    photo_service.session.get.side_effect = requests.exceptions.RequestException("Not found")
+    
+    photo_service.send_song_info(photo_song, {}, "Test summary")
+    
+    photo_service.bot.send_photo.assert_not_called()
+    assert "Test summary" in photo_service.bot.send_message.call_args.kwargs['text']
+
+def test_photo_timeout_is_not_sent_again_as_text(photo_service):
+    # Telegram may have delivered the photo before the request timed out
+    photo_service.bot.send_photo.side_effect = TimedOut()
+    
+    with pytest.raises(TimedOut):
+        photo_service.send_song_info(photo_song, {}, "Test summary")
+    
+    photo_service.bot.send_message.assert_not_called()
@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import Mock
+import requests
+from src.services.wikipedia_service import WikipediaService
+from src.utils.cache import Cache
+
+ARTICLE = """
+<html><body><div class="mw-parser-output">
+<p>  </p>
+<p><b>Test Artist</b> is a band formed in 1990.[1] They play rock.[2]</p>
+<p>Second paragraph.</p>
+</div></body></html>
+"""
+
+def make_response(status_code=200, text=ARTICLE):
+    response = Mock(status_code=status_code, text=text)
+    if status_code >= 400 and status_code != 404:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(f"{status_code}")
+    return response
+
+@pytest.fixture
+def wikipedia_service():
+    return WikipediaService(session=Mock())
+
+def test_get_artist_info(wikipedia_service):
+    wikipedia_service.session.get.return_value = make_response()
+    
+    info = wikipedia_service.get_artist_info("Test Artist")
+    
+    assert info == {
+        'artist_bio': "Test Artist is a band formed in 1990. They play rock.",
+        'wikipedia_url': "https://en.wikipedia.org/wiki/Test_Artist"
+    }
+    assert wikipedia_service.session.get.call_args[1]['timeout'] == WikipediaService.REQUEST_TIMEOUT
+
+def test_get_artist_info_not_found(wikipedia_service):
+    wikipedia_service.session.get.return_value = make_response(404)
+    
+    assert wikipedia_service.get_artist_info("Unknown Artist") is None
+
+def test_get_artist_info_error(wikipedia_service):
+    wikipedia_service.session.get.side_effect = requests.exceptions.RequestException("API Error")
+    
+    assert wikipedia_service.get_artist_info("Test Artist") is None
+
+def test_get_artist_info_caches_hits_and_misses(wikipedia_service):
+    wikipedia_service.cache = Cache(':memory:', 'wikipedia')
+    wikipedia_service.session.get.side_effect = [make_response(), make_response(404)]
+    
+    first = wikipedia_service.get_artist_info("Test Artist")
+    assert wikipedia_service.get_artist_info("test  artist") == first
+    assert wikipedia_service.get_artist_info("Unknown Artist") is None
+    assert wikipedia_service.get_artist_info("Unknown Artist") is None
+    
+    assert wikipedia_service.session.get.call_count == 2
+
+def test_get_artist_info_does_not_cache_errors(wikipedia_service):
+    wikipedia_service.cache = Cache(':memory:', 'wikipedia')
+    wikipedia_service.session.get.side_effect = [requests.exceptions.RequestException("API Error"), make_response()]
+    
+    assert wikipedia_service.get_artist_info("Test Artist") is None
+    assert wikipedia_service.get_artist_info("Test Artist") is not None